@@ -0,0 +1,695 @@
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from typing import Dict, Any, Callable, List, Optional
+
+import numpy as np
+
+from backend.bots import schedule_bot_answer, answer_as_bot
+from backend.constants import BATTLE_ROYALE_MODE
+from backend.game import (
+    next_question as gm_next_question,
+    prefetch_question_candidates,
+    reveal_answers_and_scores as gm_reveal_answers_and_scores,
+    _end_game_internal,
+    build_state_snapshot,
+    rebind_player_sid,
+    invalidate_state_snapshot,
+)
+from backend.log import get_logger
+from backend.journal import export_state
+from backend.payloads import PreEncoded, cached_payload
+from backend.questions import RoundQuestion
+
+log = get_logger(__name__)
+
+# Commands after which GameActor.status is republished; answers, helps and chat leave it as it was
+_STATUS_COMMANDS = frozenset({
+    'start', 'next_question', 'reveal', 'intermission', 'end', 'recover',
+    'spectate', 'unspectate', 'disconnect', 'remove_player', 'resume', 'rejoin',
+})
+
+
+class TimerHandle:
+    """Cancellable handle for a message scheduled on a GameWorker. Cancelled timers are skipped when due."""
+    __slots__ = ('due', 'cancelled')
+
+    def __init__(self, due: float) -> None:
+        self.due = due
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class GameWorker:
+    """
+    One thread that drives any number of GameActors.
+
+    Messages posted from any thread go through a single inbox; delayed messages sit
+    in a monotonic-clock heap owned by the worker thread. Each actor's messages are
+    therefore handled one at a time and in order, so game state needs no locks and
+    nothing ever sleeps on the worker.
+    """
+
+    def __init__(self, name: str = 'game-worker', profiler=None) -> None:
+        self.name = name
+        self.profiler = profiler
+        self._inbox: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._timers: List[tuple] = []  # (due, seq, handle, actor, command, kwargs)
+        self._seq = itertools.count()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._start_lock = threading.Lock()
+        self.processed = 0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if not self._thread.is_alive():
+                self._thread.start()
+
+    def on_worker_thread(self) -> bool:
+        return threading.get_ident() == self._thread.ident
+
+    def post(self, actor, command: str, kwargs: Dict[str, Any]) -> None:
+        self._inbox.put((actor, command, kwargs, None))
+
+    def schedule(self, delay: float, actor, command: str, kwargs: Dict[str, Any]) -> TimerHandle:
+        handle = TimerHandle(time.monotonic() + delay)
+        if self.on_worker_thread():
+            heapq.heappush(self._timers, (handle.due, next(self._seq), handle, actor, command, kwargs))
+        else:
+            self._inbox.put((actor, command, kwargs, handle))
+        return handle
+
+    def purge(self, actor) -> None:
+        """Drop every timer still queued for `actor` (worker thread only), so a finished game is not kept alive by them."""
+        self._timers[:] = [entry for entry in self._timers if entry[3] is not actor]
+        heapq.heapify(self._timers)
+
+    def orphaned_timers(self) -> int:
+        """Timers queued for actors that have already finished (diagnostics; should stay 0)."""
+        return sum(1 for entry in list(self._timers) if getattr(entry[3], 'finished', False))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'name': self.name, 'inbox': self._inbox.qsize(), 'timers': len(self._timers), 'processed': self.processed}
+
+    def timer_snapshot(self) -> Dict[str, Any]:
+        """
+        Pending timers by command, from any thread without stopping the worker: the heap is
+        copied in one step (atomic under the GIL) and everything else works on the copy.
+        """
+        entries = list(self._timers)
+        now = time.monotonic()
+        by_command: Dict[str, int] = {}
+        cancelled = 0
+        next_due = None
+        for due, _, handle, _, command, _ in entries:
+            if handle.cancelled:
+                cancelled += 1
+                continue
+            by_command[command] = by_command.get(command, 0) + 1
+            if next_due is None or due < next_due:
+                next_due = due
+        return {
+            'name': self.name,
+            'pending': len(entries) - cancelled,
+            'cancelled': cancelled,
+            'inbox': self._inbox.qsize(),
+            'next_due_s': round(max(0.0, next_due - now), 3) if next_due is not None else None,
+            'by_command': by_command,
+        }
+
+    def _dispatch(self, actor, command: str, kwargs: Dict[str, Any]) -> None:
+        self.processed += 1
+        tracked = self.profiler.track(f'actor.{command}', getattr(actor, 'game_id', None)) if self.profiler else nullcontext()
+        try:
+            with tracked:
+                actor.handle(command, kwargs)
+        except Exception:
+            log.exception("GameWorker %s: error handling '%s'", self.name, command, extra={'game_id': getattr(actor, 'game_id', None)})
+
+    def _run(self) -> None:
+        while True:
+            timeout = max(0.0, self._timers[0][0] - time.monotonic()) if self._timers else None
+            try:
+                actor, command, kwargs, handle = self._inbox.get(timeout=timeout)
+                if handle is not None:
+                    # Timer scheduled from another thread; adopt it into the heap unless its game is already over
+                    if not getattr(actor, 'finished', False):
+                        heapq.heappush(self._timers, (handle.due, next(self._seq), handle, actor, command, kwargs))
+                else:
+                    self._dispatch(actor, command, kwargs)
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, handle, actor, command, kwargs = heapq.heappop(self._timers)
+                if not handle.cancelled:
+                    self._dispatch(actor, command, kwargs)
+            # Don't keep the last actor (possibly a finished game) referenced while blocked on the inbox
+            actor = kwargs = handle = None
+
+
+class GameWorkerPool:
+    """Fixed set of GameWorkers; a game is pinned to one worker for its whole life."""
+
+    def __init__(self, size: int, profiler=None) -> None:
+        self.workers = [GameWorker(name=f'game-worker-{i}', profiler=profiler) for i in range(max(1, size))]
+
+    def worker_for(self, game_id: str) -> GameWorker:
+        worker = self.workers[zlib.crc32(game_id.encode()) % len(self.workers)]
+        worker.start()
+        return worker
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [w.stats() for w in self.workers]
+
+    def orphaned_timers(self) -> int:
+        return sum(w.orphaned_timers() for w in self.workers)
+
+    def timer_snapshot(self) -> List[Dict[str, Any]]:
+        return [w.timer_snapshot() for w in self.workers]
+
+
+class GameActor:
+    """
+    Owns one game's state dict and mutates it only from its worker thread.
+
+    Socket handlers, timers and the hint pool never touch the game directly; they
+    `tell` the actor a command, which runs as `on_<command>(**kwargs)` on the worker.
+    Phases move question -> results -> intermission -> question via scheduled
+    messages instead of sleeps.
+
+    `status` is a small summary (phase, round, player counts) that the worker
+    replaces with a new dict after every command that can change it, and never
+    mutates in place. Other threads (the admin endpoints) read it without a lock.
+
+    Spectators (outsiders watching, and eliminated battle-royale players) sit in a
+    separate room and never get the per-player events. They receive one coalesced
+    `spectator_update` (question, round summary, top-K standings) at most every
+    SPECTATOR_UPDATE_INTERVAL seconds, encoded once per update for the whole room.
+
+    External dependencies are injected:
+      - socketio: emit target (the outbound queues) and access to `server.enter_room`
+      - calculate_points(elapsed) -> int
+      - get_random_questions(num, diff=None) bound to this game's question bank snapshot
+      - hints: HintService for call-a-friend
+      - latency: LatencyTracker for answer-time compensation
+      - on_finished(actor) -> None, called once after the game is over
+      - journal: optional GameJournal; state transitions are recorded for crash recovery and replay
+      - analytics: optional AnalyticsSink; every revealed round is recorded with one row per player
+    """
+
+    def __init__(
+        self,
+        game: Dict[str, Any],
+        *,
+        worker: GameWorker,
+        socketio,
+        namespace: str,
+        config,
+        calculate_points: Callable[[float], int],
+        get_random_questions: Callable,
+        hints,
+        latency,
+        on_finished: Optional[Callable[['GameActor'], None]] = None,
+        journal=None,
+        analytics=None,
+    ) -> None:
+        self.game = game
+        self.game_id = game['game_id']
+        self.room_name = game['room_name']
+        self.mode = game['mode']
+        self.worker = worker
+        self.socketio = socketio
+        self.namespace = namespace
+        self.config = config
+        self.calculate_points = calculate_points
+        self.get_random_questions = get_random_questions
+        self.hints = hints
+        self.latency = latency
+        self.on_finished = on_finished
+        self.journal = journal
+        self.analytics = analytics
+        self.finished = False
+        game.setdefault('phase', 'starting')
+        game['spectator_room'] = self.spectator_room = f"{game['room_name']}:spectators"
+        self.spectators = set()
+        self._spectator_payload: Optional[PreEncoded] = None
+        self._spectator_dirty = True
+        self._spectator_timer: Optional[TimerHandle] = None
+        self._spectator_next_at = 0.0
+        self._round_summary: Optional[Dict[str, Any]] = None
+        self._answer_elapsed: Dict[str, float] = {}  # This round's compensated answer times, for analytics
+        self._round_helps: Dict[str, List[str]] = {}
+        self.started_at = time.time()
+        self.status: Dict[str, Any] = {}
+        self._publish_status()
+
+    # ----- Messaging -----
+
+    def tell(self, command: str, **kwargs) -> None:
+        self.worker.post(self, command, kwargs)
+
+    def after(self, delay: float, command: str, **kwargs) -> TimerHandle:
+        return self.worker.schedule(delay, self, command, kwargs)
+
+    def handle(self, command: str, kwargs: Dict[str, Any]) -> None:
+        if self.finished:
+            return
+        getattr(self, f'on_{command}')(**kwargs)
+        if command in _STATUS_COMMANDS and self.game:
+            self._publish_status()
+        if not self.game or self.game.get('game_state') != 'in_progress':
+            self._finish()
+
+    def _finish(self) -> None:
+        self.finished = True
+        if self.journal:
+            self.journal.record(self.game_id, 'end', standings=self.game.get('final_standings'))
+            self.journal.close(self.game_id)
+        if self.spectators:
+            self.socketio.server.close_room(self.spectator_room, namespace=self.namespace)
+            self.spectators.clear()
+        # Players stay connected after the game; without this every finished game's room would live on in the server
+        self.socketio.server.close_room(self.room_name, namespace=self.namespace)
+        self.worker.purge(self)
+        if self.on_finished:
+            self.on_finished(self)
+
+    def _publish_status(self) -> None:
+        game = self.game
+        table = game.get('players')
+        if table is None:
+            return
+        slots = table.live_slots()
+        bots = int(np.count_nonzero(table.is_bot[slots]))
+        self.status = {
+            'game_id': self.game_id,
+            'mode': self.mode,
+            'phase': game.get('phase'),
+            'round': self.round + 1,
+            'humans': len(slots) - bots,
+            'bots': bots,
+            'disconnected': int(np.count_nonzero(table.disconnected[slots])),
+            'active': len(game.get('active_player_sids', ())),
+            'spectators': len(self.spectators),
+            'started_at': self.started_at,
+            'updated_at': time.time(),
+        }
+
+    def _record(self, kind: str, **data) -> None:
+        if self.journal:
+            self.journal.record(self.game_id, kind, **data)
+
+    def _emit_to(self, sid: str, event: str, payload: Dict[str, Any]) -> None:
+        self.socketio.emit(event, payload, to=sid, namespace=self.namespace)
+
+    @property
+    def round(self) -> int:
+        return self.game.get('current_question_index', -1)
+
+    # ----- Phase transitions -----
+
+    def on_start(self) -> None:
+        game = self.game
+        if self.journal:
+            self.journal.record(self.game_id, 'created', state=export_state(game))
+        game_start_payload = cached_payload(game, ('game_starting',), lambda: {
+            'game_id': game['game_id'], 'mode': game['mode'],
+            'players': game['players'].records(),
+            'initial_player_count': game.get('initial_player_count')
+        })
+        # Emit to the game room (preferred)
+        self.socketio.emit('game_starting', game_start_payload, room=game['room_name'], namespace=self.namespace)
+        # Fallback: also emit directly to each human sid to ensure delivery even if room join was missed
+        for sid in game['human_player_sids']:
+            self._emit_to(sid, 'game_starting', game_start_payload)
+        self.tell('prefetch')
+        self.after(self.config.GAME_START_DELAY, 'next_question')
+
+    def on_next_question(self) -> None:
+        q_data = gm_next_question(
+            current_game=self.game,
+            socketio=self.socketio,
+            namespace=self.namespace,
+            config=self.config,
+            get_random_questions=self.get_random_questions,
+            calculate_points=self.calculate_points,
+            bot_action=self._schedule_bot,
+        )
+        if q_data is None:
+            return
+        self.game['phase'] = 'question'
+        self.game['question_timer'] = self.after(self.config.QUESTION_DURATION, 'reveal', round=self.round)
+        self._record('question', round=self.round, question=q_data.to_dict(), adaptive_difficulty=self.game['adaptive_difficulty'],
+                     streak=self.game.get('questions_at_current_difficulty_streak'))
+        self._round_summary = None
+        self._answer_elapsed = {}
+        self._round_helps = {}
+        self._spectators_changed()
+
+    def _schedule_bot(self, bot_sid: str, question_data: RoundQuestion) -> None:
+        bot = self.game['players'].get(bot_sid)
+        if not bot or bot.get('is_eliminated'):
+            return
+        q_round = self.round
+        schedule_bot_answer(
+            self.game, bot_sid, question_data,
+            schedule=lambda delay, sid: self.after(delay, 'bot_answer', sid=sid, round=q_round),
+        )
+
+    def on_bot_answer(self, sid: str, round: int) -> None:
+        if self.game.get('phase') != 'question' or round != self.round:
+            return
+        if answer_as_bot(self.game, sid, self.calculate_points) is not None:
+            bot = self.game['players'][sid]
+            self._record('answer', sid=sid, correct=bot['current_answer_correct'], points=bot['potential_points_this_round'], elapsed=None)
+
+    def on_reveal(self, round: int) -> None:
+        if self.game.get('phase') != 'question' or round != self.round:
+            return  # Stale timeout (already revealed early because everyone answered)
+        if self.game.get('question_timer'):
+            self.game['question_timer'].cancel()
+            self.game['question_timer'] = None
+        self.game['phase'] = 'results'
+        players = self.game['players']
+        is_br = self.mode == BATTLE_ROYALE_MODE
+        round_slots = players.slots_for(self.game['active_player_sids']) if is_br else players.live_slots()
+        keep_going = gm_reveal_answers_and_scores(
+            current_game=self.game,
+            socketio=self.socketio,
+            namespace=self.namespace,
+            config=self.config,
+            calculate_points=self.calculate_points,
+        )
+        q_data = self.game['questions'][self.round]
+        eliminated = players.eliminated[round_slots] if is_br else np.zeros(len(round_slots), dtype=bool)
+        if self.journal:
+            self._record('reveal', round=self.round, active_player_sids=self.game.get('active_player_sids', []), rows=[
+                list(row) for row in zip([players.sids[s] for s in round_slots.tolist()], players.answered[round_slots].tolist(),
+                                         (players.correct[round_slots] == 1).tolist(), players.points[round_slots].tolist(),
+                                         players.score[round_slots].tolist(), players.eliminated[round_slots].tolist())
+            ])
+            if (self.round + 1) % self.journal.snapshot_every == 0:
+                self.journal.snapshot(self.game_id, self.game)
+        if self.analytics:
+            self._record_analytics(q_data, round_slots)
+        self._round_summary = {
+            'question_number': self.round + 1,
+            'correct_answer': q_data.correct_answer,
+            'answered': int(np.count_nonzero(players.answered[round_slots])),
+            'correct': int(np.count_nonzero(players.correct[round_slots] == 1)),
+            'eliminated': int(np.count_nonzero(eliminated)) if is_br else None,
+        }
+        # Knocked-out humans stop getting the full game feed and watch like any other spectator
+        # (not those whose connection is gone: their sid can no longer join a room)
+        for slot in round_slots[eliminated & ~players.is_bot[round_slots] & ~players.disconnected[round_slots]].tolist():
+            self._move_to_spectators(players.sids[slot])
+        self._spectators_changed()
+        if keep_going:
+            self.tell('prefetch')
+            self.after(self.config.RESULTS_DISPLAY_TIME, 'intermission')
+        else:
+            self.after(self.config.BR_END_DELAY, 'end')
+
+    def _record_analytics(self, q_data: RoundQuestion, round_slots: np.ndarray) -> None:
+        players = self.game['players']
+        sids = [players.sids[s] for s in round_slots.tolist()]
+        bot_rounds = self.game.get('bot_data_for_round', {})
+        elapsed = np.full(len(sids), np.nan, dtype=np.float32)
+        for i, sid in enumerate(sids):
+            if sid in self._answer_elapsed:
+                elapsed[i] = self._answer_elapsed[sid]
+            elif sid in bot_rounds:
+                elapsed[i] = bot_rounds[sid]['force_params']['delay_for_points']
+        self.analytics.record_round(
+            game_id=self.game_id, mode=self.mode, round=self.round, question=q_data,
+            bank_version=self.game['questions'].bank.version, players=players, slots=round_slots,
+            elapsed=elapsed, helps=['|'.join(self._round_helps.get(sid, ())) for sid in sids],
+            active_after=len(self.game.get('active_player_sids', [])) if self.mode == BATTLE_ROYALE_MODE else len(sids),
+            reveal_after=time.monotonic() - self.game['question_sent_at'],
+        )
+
+    def on_recover(self, delay: float) -> None:
+        """Pick a game rebuilt from its journal back up at the next round boundary."""
+        game = self.game
+        before_question = game.pop('before_question', None)
+        if game.get('phase') == 'question':
+            # The interrupted round was never scored; its slot is served again with a fresh question. Difficulty
+            # and BR streak go back to where they were before it, or next_question would step them a second time.
+            game['current_question_index'] -= 1
+            game.update(before_question or {})
+        game['phase'] = 'intermission'
+        self._record('recovered', round=self.round)
+        log.info("Game recovered from journal; resuming in %ss", delay, extra={'game_id': self.game_id, 'round': self.round + 1})
+        self.after(delay, 'next_question')
+
+    def on_prefetch(self) -> None:
+        # Queued behind the emits of the current phase, so the lookup happens while players read results
+        prefetch_question_candidates(current_game=self.game, config=self.config, get_random_questions=self.get_random_questions)
+
+    def on_intermission(self) -> None:
+        # Results screen is over; clients reset their round state before the next question arrives
+        self.game['phase'] = 'intermission'
+        self.after(self.config.INTERMISSION_TIME, 'next_question')
+
+    def on_end(self) -> None:
+        _end_game_internal(current_game=self.game, socketio=self.socketio, namespace=self.namespace)
+
+    # ----- Spectators -----
+
+    def on_spectate(self, sid: str) -> None:
+        self.spectators.add(sid)
+        self.socketio.server.enter_room(sid, self.spectator_room, namespace=self.namespace)
+        log.debug("Spectator joined", extra={'game_id': self.game_id, 'sid': sid, 'event': 'spectate'})
+        if self._spectator_payload is None or self._spectator_dirty:
+            # Newest state for the newcomer; the room still gets it on the next flush
+            self._emit_to(sid, 'spectator_update', self._build_spectator_payload())
+        else:
+            self._emit_to(sid, 'spectator_update', self._spectator_payload)
+
+    def on_unspectate(self, sid: str) -> None:
+        if sid in self.spectators:
+            self.spectators.discard(sid)
+            self.socketio.server.leave_room(sid, self.spectator_room, namespace=self.namespace)
+
+    def on_spectator_flush(self) -> None:
+        self._spectator_timer = None
+        if not self._spectator_dirty or not self.spectators:
+            return
+        self._spectator_dirty = False
+        self._spectator_next_at = time.monotonic() + self.config.SPECTATOR_UPDATE_INTERVAL
+        self._spectator_payload = self._build_spectator_payload()
+        self.socketio.emit('spectator_update', self._spectator_payload, room=self.spectator_room, namespace=self.namespace)
+
+    def _spectators_changed(self) -> None:
+        """Mark the spectator view stale; at most one flush is pending, no sooner than the rate cap allows."""
+        self._spectator_dirty = True
+        if self._spectator_timer is None and self.spectators:
+            self._spectator_timer = self.after(max(0.0, self._spectator_next_at - time.monotonic()), 'spectator_flush')
+
+    def _move_to_spectators(self, sid: str) -> None:
+        # No direct emit: the caller marks the view stale, so the next flush reaches them with the room
+        self.socketio.server.leave_room(sid, self.game['room_name'], namespace=self.namespace)
+        self.socketio.server.enter_room(sid, self.spectator_room, namespace=self.namespace)
+        self.spectators.add(sid)
+
+    def _build_spectator_payload(self) -> PreEncoded:
+        game = self.game
+        players = game['players']
+        idx = self.round
+        q_data = game['questions'][idx] if 0 <= idx < len(game['questions']) else None
+        is_br = self.mode == BATTLE_ROYALE_MODE
+        top = players.top(self.config.SPECTATOR_TOP_K)
+        return PreEncoded({
+            'game_id': self.game_id,
+            'mode': self.mode,
+            'phase': game.get('phase'),
+            'question_number': idx + 1,
+            # Never the correct answer while the question is open; it arrives with the round summary
+            'question': {'question': q_data.question, 'options': q_data.options} if q_data else None,
+            'round_summary': self._round_summary,
+            'standings': [
+                {'username': players.usernames[s], 'score': score, 'is_bot': is_bot, 'is_eliminated': elim}
+                for s, score, is_bot, elim in zip(top.tolist(), players.score[top].tolist(),
+                                                  players.is_bot[top].tolist(), players.eliminated[top].tolist())
+            ],
+            'player_count': len(players),
+            'active_player_count': len(game.get('active_player_sids', [])) if is_br else None,
+            'spectator_count': len(self.spectators),
+        })
+
+    # ----- Player commands -----
+
+    def on_answer(self, sid: str, answer, received_at: float) -> None:
+        game = self.game
+        p = game['players'].get(sid)
+        if not p:
+            self._emit_to(sid, 'error_message', {'message': 'Not in game.'})
+            return
+        if p['is_bot'] or p.get('answered_this_round') or game.get('phase') != 'question':
+            self._emit_to(sid, 'error_message', {'message': 'Invalid/Already answered.'})
+            return
+        q_d = game['questions'][game['current_question_index']]
+        t_t = self.latency.compensated_elapsed(sid, game['question_sent_at'], received_at)
+        is_c = (answer == q_d.correct_answer)
+        pts = self.calculate_points(t_t) if is_c else 0
+        if is_c and p.get('used_double_score_this_round'):
+            pts *= 2
+            p['used_double_score_this_round'] = False
+        p['answered_this_round'] = True
+        p['current_answer_correct'] = is_c
+        p['potential_points_this_round'] = pts
+        self._answer_elapsed[sid] = t_t
+        self._record('answer', sid=sid, answer=answer, correct=is_c, points=pts, elapsed=round(t_t, 4))
+        self._emit_to(sid, 'answer_receipt', {'message': 'Answer received.'})
+
+        if game['players'].humans_waiting() == 0:
+            self.on_reveal(round=self.round)
+
+    def on_help(self, sid: str, help_type: str) -> None:
+        game = self.game
+        player_obj = game['players'].get(sid)
+        if not player_obj:
+            self._emit_to(sid, 'error_message', {'message': 'Not in game.'})
+            return
+        if player_obj['is_bot'] or not player_obj['helps'].get(help_type) or game.get('phase') != 'question':
+            self._emit_to(sid, 'error_message', {'message': f"Cannot use help: {help_type}."})
+            return
+
+        player_obj['helps'][help_type] = False  # Mark help as used
+        self._round_helps.setdefault(sid, []).append(help_type)
+        self._record('help', sid=sid, help_type=help_type)
+        current_question = game['questions'][game['current_question_index']]
+        response_payload = {'type': help_type, 'helps_remaining': dict(player_obj['helps'])}
+
+        if help_type == 'fifty_fifty':
+            correct_ans = current_question.correct_answer
+            options = current_question.options
+            incorrect_opts = [opt for opt in options if opt != correct_ans]
+            # Ensure there's at least one incorrect option to choose from for the 50/50
+            if incorrect_opts:
+                options_for_5050 = [correct_ans, random.choice(incorrect_opts)]
+            else:
+                # Fallback: should not happen with 3 wrong answers, but as a safeguard
+                options_for_5050 = [correct_ans, options[0] if options[0] != correct_ans else options[1]]
+            random.shuffle(options_for_5050)
+            response_payload['options'] = options_for_5050
+            log.debug("50/50 help used", extra={'game_id': self.game_id, 'sid': sid, 'event': 'help_fifty_fifty', 'sampled': True})
+            self._emit_to(sid, 'help_result', response_payload)
+
+        elif help_type == 'call_friend':
+            # The LLM call runs on the hint pool; the result comes back to this actor as a message
+            self.hints.submit(
+                current_question.question, current_question.options,
+                lambda advice: self.tell('hint_ready', sid=sid, payload=response_payload, advice=advice),
+            )
+            log.debug("Call a friend help requested", extra={'game_id': self.game_id, 'sid': sid, 'event': 'help_call_friend', 'sampled': True})
+
+        elif help_type == 'double_score':
+            player_obj['used_double_score_this_round'] = True  # Flag for server-side score calculation
+            response_payload['message'] = 'Score for this question will be doubled if correct!'
+            log.debug("Double score help activated", extra={'game_id': self.game_id, 'sid': sid, 'event': 'help_double_score', 'sampled': True})
+            self._emit_to(sid, 'help_result', response_payload)
+
+        # Notify other players that a help was used (without revealing specifics like 50/50 options)
+        self.socketio.emit('player_used_help', {
+            'username': player_obj['username'],
+            'help_type': help_type.replace('_', ' ').title()
+        }, room=game['room_name'], skip_sid=sid, namespace=self.namespace)
+
+    def on_hint_ready(self, sid: str, payload: Dict[str, Any], advice: str) -> None:
+        if sid not in self.game['players']:
+            return
+        payload['advice'] = advice
+        log.debug("Call a friend advice delivered", extra={'game_id': self.game_id, 'sid': sid, 'event': 'hint_ready', 'sampled': True})
+        self._emit_to(sid, 'help_result', payload)
+
+    def on_chat(self, sid: str, text: str, emoji) -> None:
+        p = self.game['players'].get(sid)
+        if not p:
+            self._emit_to(sid, 'error_message', {'message': 'Chat only in game.'})
+            return
+        chat_p = {'sender_sid': sid, 'sender_name': p['username'], 'is_bot': p['is_bot']}
+        if text:
+            chat_p['text'] = text
+        if emoji:
+            chat_p['emoji'] = emoji
+        self.socketio.emit('new_chat_message', chat_p, room=self.game['room_name'], namespace=self.namespace)
+
+    # ----- Membership -----
+
+    def on_disconnect(self, sid: str, hold_slot: bool) -> None:
+        self.spectators.discard(sid)
+        p_d = self.game['players'].get(sid)
+        if not p_d:
+            return
+        if hold_slot and not p_d['is_bot']:
+            # Keep the slot through the grace period; the session reaper removes it if they never return
+            p_d['disconnected'] = True
+            log.info("Player disconnected; holding slot for %ss", self.config.SESSION_GRACE_PERIOD,
+                     extra={'game_id': self.game_id, 'sid': sid, 'username': p_d['username']})
+        else:
+            self.on_remove_player(sid)
+
+    def on_remove_player(self, sid: str) -> None:
+        game = self.game
+        self.spectators.discard(sid)
+        if sid not in game.get('players', {}):
+            return
+        p_d = game['players'][sid]
+        p_name_left = p_d['username']
+        log.info("Player left game", extra={'game_id': self.game_id, 'sid': sid, 'username': p_name_left})
+        if not p_d['is_bot']:
+            if sid in game['human_player_sids']:
+                game['human_player_sids'].remove(sid)
+            self.socketio.emit('player_left', {'sid': sid, 'username': p_name_left, 'players': game['players'].records(exclude=sid)}, room=game['room_name'], namespace=self.namespace)
+        del game['players'][sid]
+        invalidate_state_snapshot(game)
+        self._record('leave', sid=sid)
+        if not p_d['is_bot'] and not game['human_player_sids'] and game['game_state'] == 'in_progress':
+            self.on_end()
+
+    def on_resume(self, old_sid: str, new_sid: str) -> None:
+        """Reattach a reconnected socket to the player slot it held before the drop."""
+        game = self.game
+        if not rebind_player_sid(game, old_sid, new_sid):
+            return
+        self._record('rebind', old_sid=old_sid, new_sid=new_sid)
+        player = game['players'][new_sid]
+        if player['is_eliminated']:
+            self.spectators.discard(old_sid)
+            self.on_spectate(new_sid)
+        else:
+            self.socketio.server.enter_room(new_sid, game['room_name'], namespace=self.namespace)
+        log.info("Player resumed session (previous sid %s)", old_sid, extra={'game_id': self.game_id, 'sid': new_sid, 'username': player['username']})
+        self.socketio.emit('player_rejoined', {'old_sid': old_sid, 'sid': new_sid, 'username': player['username']},
+                           room=game['room_name'], skip_sid=new_sid, namespace=self.namespace)
+        self._emit_to(new_sid, 'game_state_snapshot', build_state_snapshot(current_game=game, sid=new_sid, config=self.config))
+
+    def on_rejoin(self, sid: str) -> None:
+        """Same-socket rejoin from the lobby screen: resend the full game state."""
+        game = self.game
+        if sid not in game['players']:
+            return
+        log.info("Player rejoining active game", extra={'game_id': self.game_id, 'sid': sid, 'username': game['players'][sid]['username']})
+        if game['players'][sid]['is_eliminated']:
+            self.on_spectate(sid)
+        else:
+            self.socketio.server.enter_room(sid, game['room_name'], namespace=self.namespace)
+        self._emit_to(sid, 'game_starting', cached_payload(game, ('rejoin', game.get('current_question_index', -1)), lambda: {
+            'game_id': game['game_id'],
+            'mode': game['mode'],
+            'players': game['players'].records(),
+            'initial_player_count': game.get('initial_player_count'),
+            'current_question_data': game['questions'][game['current_question_index']].public() if game.get('current_question_index', -1) >= 0 else None,
+            'question_number': game.get('current_question_index', -1) + 1,
+            'is_rejoin': True,
+            'active_player_sids': game.get('active_player_sids', []),
+        }))
@@ -0,0 +1,322 @@
+import hmac
+import time
+from collections import Counter
+from functools import wraps
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from . import config
+from . import payloads
+from .constants import CLASSIC_MODE, BATTLE_ROYALE_MODE
+from .questions import get_question_bank, reload_questions
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+def admin_required(view):
+    """Reject requests unless ADMIN_TOKEN is configured and sent as X-Admin-Token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token', '')
+        if not config.ADMIN_TOKEN or not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+            return jsonify({'error': 'forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# ----- Live state -----
+# Everything below is read without taking the lobby lock or messaging the game workers: each actor
+# publishes an immutable `status` dict, and registries are copied in one step before being walked.
+# That keeps these endpoints cheap enough to poll every second.
+
+def _game_statuses():
+    return [actor.status for actor in list(current_app.extensions['games'].values())]
+
+
+def _games_summary(statuses):
+    by_phase, by_mode = Counter(), Counter()
+    for status in statuses:
+        by_phase[status['phase']] += 1
+        by_mode[status['mode']] += 1
+    return {
+        'active': len(statuses),
+        'by_phase': dict(by_phase),
+        'by_mode': dict(by_mode),
+        'humans': sum(s['humans'] for s in statuses),
+        'bots': sum(s['bots'] for s in statuses),
+        'spectators': sum(s['spectators'] for s in statuses),
+    }
+
+
+def _timers_summary(workers):
+    by_command = Counter()
+    for worker in workers:
+        by_command.update(worker['by_command'])
+    return {'pending': sum(w['pending'] for w in workers), 'inbox': sum(w['inbox'] for w in workers),
+            'by_command': dict(by_command)}
+
+
+@admin_bp.route('/games', methods=['GET'])
+@admin_required
+def active_games():
+    """Running games, oldest first; ?mode= and ?phase= filter, ?limit= caps the list (the summary counts every game)."""
+    statuses = _game_statuses()
+    games = [s for s in statuses
+             if request.args.get('mode') in (None, s['mode']) and request.args.get('phase') in (None, s['phase'])]
+    games.sort(key=lambda s: s['started_at'])
+    limit = request.args.get('limit', type=int)
+    return jsonify({'summary': _games_summary(statuses), 'games': games[:limit] if limit is not None else games})
+
+
+@admin_bp.route('/games/<game_id>', methods=['GET'])
+@admin_required
+def game_status(game_id):
+    actor = current_app.extensions['games'].get(game_id)
+    if actor is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(actor.status)
+
+
+@admin_bp.route('/timers', methods=['GET'])
+@admin_required
+def pending_timers():
+    workers = current_app.extensions['game_workers'].timer_snapshot()
+    return jsonify(dict(_timers_summary(workers), workers=workers))
+
+
+@admin_bp.route('/hints', methods=['GET'])
+@admin_required
+def hint_queue():
+    return jsonify(current_app.extensions['hints'].stats())
+
+
+@admin_bp.route('/overview', methods=['GET'])
+@admin_required
+def overview():
+    """Games, lobbies, timers, hints and the question bank in one snapshot, with what it cost to take."""
+    started = time.perf_counter()
+    lobbies = current_app.extensions['lobbies'].stats()
+    bank = get_question_bank()
+    result = {
+        'games': _games_summary(_game_statuses()),
+        'lobbies': {'waiting': lobbies['waiting'], 'open': len(lobbies['lobbies'])},
+        'timers': _timers_summary(current_app.extensions['game_workers'].timer_snapshot()),
+        'hints': current_app.extensions['hints'].stats(),
+        'questions': {'version': bank.version, 'rows': len(bank), 'loaded_at': bank.loaded_at,
+                      'rows_by_difficulty': {d: len(p) for d, p in sorted(bank.by_difficulty.items())}},
+    }
+    result['snapshot_us'] = round((time.perf_counter() - started) * 1e6)
+    return jsonify(result)
+
+
+@admin_bp.route('/questions', methods=['GET'])
+@admin_required
+def question_bank_stats():
+    return jsonify(get_question_bank().stats())
+
+
+@admin_bp.route('/questions/reload', methods=['POST'])
+@admin_required
+def question_bank_reload():
+    started = reload_questions()
+    return jsonify({'started': started, 'current_version': get_question_bank().version}), 202 if started else 409
+
+
+@admin_bp.route('/outbound', methods=['GET'])
+@admin_required
+def outbound_queue_stats():
+    return jsonify(current_app.extensions['outbound_queues'].stats())
+
+
+@admin_bp.route('/admission', methods=['GET'])
+@admin_required
+def admission_stats():
+    return jsonify(current_app.extensions['admission'].stats())
+
+
+@admin_bp.route('/latency', methods=['GET'])
+@admin_required
+def latency_stats():
+    return jsonify(current_app.extensions['latency_tracker'].stats())
+
+
+@admin_bp.route('/payloads', methods=['GET'])
+@admin_required
+def payload_stats():
+    """Payload encodes vs cache hits and spliced packets, to confirm serialization savings."""
+    return jsonify(payloads.stats())
+
+
+@admin_bp.route('/lobbies', methods=['GET'])
+@admin_required
+def lobby_stats():
+    return jsonify(current_app.extensions['lobbies'].stats())
+
+
+@admin_bp.route('/matchmaking', methods=['GET'])
+@admin_required
+def matchmaking_stats():
+    return jsonify(current_app.extensions['matchmaker'].stats())
+
+
+@admin_bp.route('/tournaments', methods=['GET'])
+@admin_required
+def tournament_stats():
+    return jsonify(current_app.extensions['tournaments'].stats())
+
+
+@admin_bp.route('/tournaments', methods=['POST'])
+@admin_required
+def tournament_create():
+    """Open registration: JSON {mode, name, match_size, advance, bot_difficulty}, all optional."""
+    body = request.get_json(silent=True) or {}
+    mode = body.get('mode', CLASSIC_MODE)
+    if mode not in (CLASSIC_MODE, BATTLE_ROYALE_MODE):
+        return jsonify({'error': f"unknown mode {mode!r}"}), 400
+    bot_difficulty = body.get('bot_difficulty', config.DEFAULT_BOT_DIFFICULTY)
+    if bot_difficulty not in config.BOT_DIFFICULTY_SETTINGS:
+        return jsonify({'error': f"unknown bot difficulty {bot_difficulty!r}"}), 400
+    try:
+        tournament = current_app.extensions['tournaments'].create(
+            name=body.get('name', ''), mode=mode, bot_difficulty=bot_difficulty,
+            match_size=int(body.get('match_size', config.TOURNAMENT_MATCH_SIZE)),
+            advance=int(body.get('advance', config.TOURNAMENT_ADVANCE)),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(tournament.summary()), 201
+
+
+@admin_bp.route('/tournaments/<tournament_id>', methods=['GET'])
+@admin_required
+def tournament_standings(tournament_id):
+    tournament = current_app.extensions['tournaments'].get(tournament_id)
+    if tournament is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(dict(tournament.summary(), standings=tournament.standings()))
+
+
+@admin_bp.route('/tournaments/<tournament_id>/start', methods=['POST'])
+@admin_required
+def tournament_start(tournament_id):
+    error = current_app.extensions['tournaments'].start(tournament_id)
+    if error:
+        return jsonify({'error': error}), 409
+    return jsonify(current_app.extensions['tournaments'].get(tournament_id).summary()), 202
+
+
+@admin_bp.route('/shows', methods=['GET'])
+@admin_required
+def show_list():
+    return jsonify(current_app.extensions['shows'].stats())
+
+
+@admin_bp.route('/shows', methods=['POST'])
+@admin_required
+def show_create():
+    """Schedule a live show: JSON {name, starts_in, questions, question_duration, elimination}, all optional."""
+    body = request.get_json(silent=True) or {}
+    try:
+        show = current_app.extensions['shows'].create(
+            name=body.get('name', ''),
+            starts_in=float(body.get('starts_in', config.SHOW_DEFAULT_LEAD)),
+            questions=int(body.get('questions', config.SHOW_QUESTIONS)),
+            question_duration=float(body.get('question_duration', config.SHOW_QUESTION_DURATION)),
+            elimination=bool(body.get('elimination', config.SHOW_ELIMINATION)),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(show.summary()), 201
+
+
+@admin_bp.route('/shows/<show_id>', methods=['GET'])
+@admin_required
+def show_detail(show_id):
+    shows = current_app.extensions['shows']
+    show = shows.get(show_id)
+    if show is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(shows.show_stats(show))
+
+
+@admin_bp.route('/shows/<show_id>/start', methods=['POST'])
+@admin_required
+def show_start(show_id):
+    error = current_app.extensions['shows'].start_now(show_id)
+    if error:
+        return jsonify({'error': error}), 409
+    return jsonify(current_app.extensions['shows'].get(show_id).summary()), 202
+
+
+@admin_bp.route('/journal', methods=['GET'])
+@admin_required
+def journal_stats():
+    journal = current_app.extensions.get('journal')
+    return jsonify(journal.stats() if journal else {'enabled': False})
+
+
+@admin_bp.route('/analytics', methods=['GET'])
+@admin_required
+def analytics_stats():
+    analytics = current_app.extensions.get('analytics')
+    return jsonify(analytics.stats() if analytics else {'enabled': False})
+
+
+@admin_bp.route('/diagnostics', methods=['GET'])
+@admin_required
+def diagnostics_stats():
+    diagnostics = current_app.extensions.get('diagnostics')
+    return jsonify(diagnostics.stats() if diagnostics else {'enabled': False})
+
+
+@admin_bp.route('/diagnostics/check', methods=['POST'])
+@admin_required
+def diagnostics_check():
+    """Run a leak check now; ?grace=0 also checks games that only just finished."""
+    diagnostics = current_app.extensions.get('diagnostics')
+    if not diagnostics:
+        return jsonify({'enabled': False}), 409
+    result = diagnostics.check(grace=request.args.get('grace', type=float))
+    return jsonify(dict(result, stats=diagnostics.stats()))
+
+
+@admin_bp.route('/profile', methods=['GET'])
+@admin_required
+def profile_stats():
+    return jsonify(current_app.extensions['profiler'].stats())
+
+
+@admin_bp.route('/profile/start', methods=['POST'])
+@admin_required
+def profile_start():
+    """Start sampling globally, or for one game with ?game_id=..."""
+    profiler = current_app.extensions['profiler']
+    profiler.start(request.args.get('game_id'))
+    return jsonify(profiler.stats()['sampling'])
+
+
+@admin_bp.route('/profile/stop', methods=['POST'])
+@admin_required
+def profile_stop():
+    profiler = current_app.extensions['profiler']
+    profiler.stop(request.args.get('game_id'))
+    return jsonify(profiler.stats()['sampling'])
+
+
+@admin_bp.route('/profile/reset', methods=['POST'])
+@admin_required
+def profile_reset():
+    current_app.extensions['profiler'].reset()
+    return jsonify({'reset': True})
+
+
+@admin_bp.route('/profile/folded', methods=['GET'])
+@admin_required
+def profile_folded():
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    return Response(current_app.extensions['profiler'].folded(), mimetype='text/plain')
+
+
+@admin_bp.route('/profile/slow', methods=['GET'])
+@admin_required
+def profile_slow_calls():
+    return jsonify(current_app.extensions['profiler'].slow_calls())
@@ -0,0 +1,226 @@
+import time
+from collections import deque
+from functools import wraps
+from threading import Lock
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from flask import request
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+# Event priorities under overload. Critical events are only ever rate limited;
+# LOW is shed as soon as the server is overloaded, NORMAL once it is badly overloaded.
+CRITICAL, NORMAL, LOW = 'critical', 'normal', 'low'
+_SHED_AT = {LOW: 1, NORMAL: 2}  # Overload level at which each priority starts being shed
+
+REJECT_SID, REJECT_IP, REJECT_SHED = 'rate_limited_sid', 'rate_limited_ip', 'shed'
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`. Refilled lazily when checked."""
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst: float, now: float) -> None:
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class AdmissionController:
+    """
+    Decides whether an incoming Socket.IO event is handled at all.
+
+    Two independent checks run before a handler:
+      - Rate limits: a token bucket per (event, sid) and a looser one per
+        (event, client IP) so a client cannot dodge its limit by reconnecting.
+        Limits come from `limits` as {event: (rate_per_second, burst)}; the IP
+        bucket gets `ip_multiplier` times both (several players can share a NAT).
+      - Overload shedding: handler latency (an EWMA over guarded handlers) and
+        `queue_depth()` (the game worker inboxes) are checked every
+        `check_interval`. Crossing either threshold is overload level 1 and sheds
+        LOW events (chat, emoji, lobby re-joins); twice the threshold is level 2 and
+        sheds NORMAL ones too. CRITICAL events (answers) are never shed.
+
+    Rejected events are dropped without a reply and counted per event and reason;
+    `stats()` reports the counts, the overload state and recent overload episodes.
+    """
+
+    def __init__(
+        self,
+        *,
+        limits: Dict[str, Tuple[float, float]],
+        ip_multiplier: float,
+        overload_latency: float,
+        overload_queue_depth: int,
+        queue_depth: Callable[[], int],
+        check_interval: float = 0.5,
+        latency_alpha: float = 0.2,
+        history: int = 20,
+    ) -> None:
+        self.limits = dict(limits)
+        self.ip_multiplier = ip_multiplier
+        self.overload_latency = overload_latency
+        self.overload_queue_depth = overload_queue_depth
+        self.queue_depth = queue_depth
+        self.check_interval = check_interval
+        self.latency_alpha = latency_alpha
+        self.lock = Lock()
+        # Keyed by client first, so dropping a disconnected sid is one pop
+        self._sid_buckets: Dict[str, Dict[str, TokenBucket]] = {}  # sid -> event -> bucket
+        self._ip_buckets: Dict[str, Dict[str, TokenBucket]] = {}  # ip -> event -> bucket
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._latency_ewma = 0.0
+        self._latency_samples = 0
+        self._last_depth = 0
+        self._next_check = 0.0
+        self._next_sweep = 0.0
+        self.level = 0
+        self._episode: Optional[Dict[str, Any]] = None
+        self._episodes = deque(maxlen=history)
+
+    # ----- Admission -----
+
+    def admit(self, event: str, sid: str, ip: Optional[str], priority: str = NORMAL) -> Optional[str]:
+        """None when the event may be handled, otherwise the reason it was rejected."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._check_overload(now)
+        with self.lock:
+            counts = self._counts.get(event)
+            if counts is None:
+                counts = self._counts[event] = {'admitted': 0, REJECT_SID: 0, REJECT_IP: 0, REJECT_SHED: 0}
+            reason = None
+            if priority != CRITICAL and self.level >= _SHED_AT[priority]:
+                reason = REJECT_SHED
+            elif event in self.limits:
+                rate, burst = self.limits[event]
+                reason = self._take(self._sid_buckets, sid, event, rate, burst, now, REJECT_SID)
+                if reason is None and ip:
+                    reason = self._take(self._ip_buckets, ip, event, rate * self.ip_multiplier,
+                                        burst * self.ip_multiplier, now, REJECT_IP)
+            if reason is None:
+                counts['admitted'] += 1
+            else:
+                counts[reason] += 1
+                if self._episode is not None:
+                    shed = self._episode['rejected']
+                    shed[event] = shed.get(event, 0) + 1
+            if now >= self._next_sweep:
+                self._sweep(now)
+            return reason
+
+    @staticmethod
+    def _take(buckets, owner: str, event: str, rate: float, burst: float, now: float, reason: str) -> Optional[str]:
+        owned = buckets.get(owner)
+        if owned is None:
+            owned = buckets[owner] = {}
+        bucket = owned.get(event)
+        if bucket is None:
+            bucket = owned[event] = TokenBucket(burst, now)
+        return None if bucket.take(rate, burst, now) else reason
+
+    def _sweep(self, now: float) -> None:
+        """Drop buckets that have refilled completely; they behave exactly like new ones."""
+        self._next_sweep = now + 60.0
+        for buckets in (self._sid_buckets, self._ip_buckets):
+            for owner in list(buckets):
+                owned = buckets[owner]
+                # Rate and burst scale together for IP buckets, so the refill time is the same
+                for event in [e for e, b in owned.items() if (now - b.updated) * self.limits[e][0] >= self.limits[e][1]]:
+                    del owned[event]
+                if not owned:
+                    del buckets[owner]
+
+    def forget(self, sid: str) -> None:
+        with self.lock:
+            self._sid_buckets.pop(sid, None)
+
+    # ----- Overload detection -----
+
+    def record_latency(self, seconds: float) -> None:
+        self._latency_ewma += self.latency_alpha * (seconds - self._latency_ewma)
+        self._latency_samples += 1
+
+    def _check_overload(self, now: float) -> None:
+        with self.lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            if not self._latency_samples:
+                # Nothing ran since the last check (everything may be shed): let the estimate decay
+                self._latency_ewma *= 1 - self.latency_alpha
+            self._latency_samples = 0
+        try:
+            depth = self.queue_depth()
+        except Exception:
+            log.exception("Admission queue-depth probe failed")
+            depth = 0
+        self._last_depth = depth
+        pressure = max(self._latency_ewma / self.overload_latency if self.overload_latency > 0 else 0.0,
+                       depth / self.overload_queue_depth if self.overload_queue_depth > 0 else 0.0)
+        level = 2 if pressure >= 2 else 1 if pressure >= 1 else 0
+        with self.lock:
+            if level == self.level:
+                return
+            previous, self.level = self.level, level
+            if previous == 0:
+                self._episode = {'started_at': time.time(), 'max_level': level, 'rejected': {}}
+                log.warning("Overload level %d: handler latency %.0fms, queue depth %d; shedding %s events",
+                            level, self._latency_ewma * 1000, depth, 'low-priority' if level == 1 else 'non-critical')
+            elif level == 0:
+                episode, self._episode = self._episode, None
+                episode['duration_s'] = round(time.time() - episode['started_at'], 1)
+                self._episodes.append(episode)
+                log.warning("Overload cleared after %.1fs; rejected during it: %s", episode['duration_s'], episode['rejected'])
+            else:
+                self._episode['max_level'] = max(self._episode['max_level'], level)
+                log.warning("Overload level %d (was %d)", level, previous)
+
+    # ----- Socket handler integration -----
+
+    def guard(self, event: str, priority=NORMAL):
+        """
+        Decorator for a Socket.IO handler: admit the event for `request.sid` and the
+        client's IP first, and feed the handler's duration into the latency estimate.
+        `priority` may be a callable taking the event data, for events whose
+        priority depends on what they ask for.
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                prio = priority(args[0] if args else None) if callable(priority) else priority
+                reason = self.admit(event, request.sid, request.remote_addr, prio)
+                if reason is not None:
+                    log.debug("Rejected %s (%s)", event, reason, extra={'sid': request.sid, 'event': event})
+                    return None
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record_latency(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'overload_level': self.level,
+                'handler_latency_ms': round(self._latency_ewma * 1000, 2),
+                'queue_depth': self._last_depth,
+                'thresholds': {'handler_latency_ms': self.overload_latency * 1000, 'queue_depth': self.overload_queue_depth},
+                'limits': {event: {'rate': rate, 'burst': burst} for event, (rate, burst) in self.limits.items()},
+                'ip_multiplier': self.ip_multiplier,
+                'events': {event: dict(c) for event, c in self._counts.items()},
+                'current_episode': dict(self._episode, rejected=dict(self._episode['rejected'])) if self._episode else None,
+                'recent_episodes': list(self._episodes),
+                'tracked_clients': {'sid': len(self._sid_buckets), 'ip': len(self._ip_buckets)},
+            }
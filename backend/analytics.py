@@ -0,0 +1,341 @@
+import atexit
+import glob
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Column name -> numpy dtype ('U' columns are strings). One row per player per round.
+ANSWER_COLUMNS = {
+    'ts': np.float64, 'game_id': 'U', 'mode': 'U', 'round': np.int32, 'question_id': np.int32,
+    'bank_version': np.int32, 'question': 'U', 'difficulty': np.int8, 'player': 'U', 'is_bot': np.bool_,
+    'answered': np.bool_, 'correct': np.bool_, 'points': np.int32, 'elapsed': np.float32,  # NaN when unanswered
+    'helps': 'U',  # Helps used this round, '|'-joined
+    'eliminated': np.bool_,
+}
+# One row per round
+ROUND_COLUMNS = {
+    'ts': np.float64, 'game_id': 'U', 'mode': 'U', 'round': np.int32, 'question_id': np.int32,
+    'bank_version': np.int32, 'question': 'U', 'difficulty': np.int8, 'players': np.int32, 'answered': np.int32,
+    'correct': np.int32, 'eliminated': np.int32, 'active_after': np.int32, 'helps_used': np.int32,
+    'reveal_after': np.float32,  # Seconds from serving the question to the reveal
+}
+TABLES = {'answers': ANSWER_COLUMNS, 'rounds': ROUND_COLUMNS}
+
+
+class ColumnBuffer:
+    """Rows appended as per-column numpy chunks; `drain()` concatenates them into one array per column."""
+
+    def __init__(self, columns: Dict[str, Any]) -> None:
+        self.columns = columns
+        self._chunks: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+        self.rows = 0
+
+    def append(self, n: int, values: Dict[str, Any]) -> None:
+        """Add `n` rows; scalars are repeated, arrays must have length `n`."""
+        for name, dtype in self.columns.items():
+            chunk = np.asarray(values[name], dtype=str if dtype == 'U' else dtype)
+            self._chunks[name].append(np.repeat(chunk, n) if chunk.ndim == 0 else chunk)
+        self.rows += n
+
+    def drain(self) -> Dict[str, np.ndarray]:
+        out = {name: np.concatenate(chunks) if chunks else np.empty(0, dtype=str if dt == 'U' else dt)
+               for (name, chunks), dt in zip(self._chunks.items(), self.columns.values())}
+        self._chunks = {name: [] for name in self.columns}
+        self.rows = 0
+        return out
+
+
+class AnalyticsSink:
+    """
+    Buffers per-round and per-answer records in memory, column by column, and
+    flushes them to compressed columnar files under `directory/<table>/`.
+
+    Actors call `record_round` from their worker threads with whole PlayerTable
+    columns, so a round costs a few array copies, not a dict per player. A
+    background thread writes the buffers every `flush_interval` seconds, or sooner
+    once `max_rows` are held. Files are Parquet when pyarrow is installed and
+    compressed NumPy archives (.npz) otherwise; `load_table` reads either.
+    """
+
+    def __init__(self, *, directory: str, flush_interval: float, max_rows: int, compression: str = 'zstd') -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.compression = compression
+        self.format = 'parquet' if pq is not None else 'npz'
+        self.lock = threading.Lock()
+        self._buffers = {name: ColumnBuffer(columns) for name, columns in TABLES.items()}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self.rows_written = {name: 0 for name in TABLES}
+        self.files_written = 0
+        self.last_flush: Optional[float] = None
+
+    def start(self) -> None:
+        with self.lock:
+            if self._thread is not None:
+                return
+            for table in TABLES:
+                os.makedirs(os.path.join(self.directory, table), exist_ok=True)
+            if self.format == 'npz':
+                log.warning("pyarrow is not installed; analytics will be written as .npz instead of Parquet.")
+            self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    # ----- Producer side (actor threads) -----
+
+    def record_round(self, *, game_id: str, mode: str, round: int, question, bank_version: int, players, slots: np.ndarray,
+                     elapsed: np.ndarray, helps: List[str], active_after: int, reveal_after: float) -> None:
+        """One round's outcome: a 'rounds' row plus an 'answers' row for every player in `slots`."""
+        now = time.time()
+        n = len(slots)
+        answered = players.answered[slots]
+        correct = players.correct[slots] == 1
+        eliminated = players.eliminated[slots]
+        shared = {'ts': now, 'game_id': game_id, 'mode': mode, 'round': round + 1, 'question_id': question.id,
+                  'bank_version': bank_version, 'question': question.question, 'difficulty': question.difficulty}
+        with self.lock:
+            self._buffers['answers'].append(n, dict(
+                shared, player=[players.usernames[s] for s in slots.tolist()], is_bot=players.is_bot[slots],
+                answered=answered, correct=correct, points=players.points[slots], elapsed=elapsed, helps=helps,
+                eliminated=eliminated,
+            ))
+            self._buffers['rounds'].append(1, dict(
+                shared, players=n, answered=int(np.count_nonzero(answered)), correct=int(np.count_nonzero(correct)),
+                eliminated=int(np.count_nonzero(eliminated)), active_after=active_after,
+                helps_used=sum(len(h.split('|')) for h in helps if h), reveal_after=reveal_after,
+            ))
+            full = self._buffers['answers'].rows >= self.max_rows
+        if full:
+            self._wake.set()
+
+    # ----- Writer -----
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Analytics flush failed")
+
+    def flush(self) -> int:
+        """Write whatever is buffered. Returns the number of rows written."""
+        with self.lock:
+            drained = {name: (buf.rows, buf.drain()) for name, buf in self._buffers.items() if buf.rows}
+            self._seq += 1
+            seq = self._seq
+        written = 0
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        for table, (rows, columns) in drained.items():
+            path = os.path.join(self.directory, table, f"{table}-{stamp}-{os.getpid()}-{seq:05d}.{self.format}")
+            tmp = path + '.tmp'
+            if self.format == 'parquet':
+                pq.write_table(pa.table(columns), tmp, compression=self.compression)
+            else:
+                with open(tmp, 'wb') as f:
+                    np.savez_compressed(f, **columns)
+            os.replace(tmp, path)  # Readers never see a half-written file
+            self.rows_written[table] += rows
+            self.files_written += 1
+            written += rows
+        if drained:
+            self.last_flush = time.time()
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            buffered = {name: buf.rows for name, buf in self._buffers.items()}
+        return {
+            'directory': self.directory,
+            'format': self.format,
+            'buffered_rows': buffered,
+            'rows_written': dict(self.rows_written),
+            'files_written': self.files_written,
+            'last_flush': self.last_flush,
+        }
+
+
+# --- Reading and querying ---
+
+def load_table(directory: str, table: str, since: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """All flushed files of `table` as one array per column (rows before `since`, a timestamp, dropped)."""
+    columns = TABLES[table]
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+    for path in sorted(glob.glob(os.path.join(directory, table, f"{table}-*.parquet")) +
+                       glob.glob(os.path.join(directory, table, f"{table}-*.npz"))):
+        if path.endswith('.parquet'):
+            if pq is None:
+                log.warning("Skipping %s: pyarrow is needed to read Parquet files.", path)
+                continue
+            data = pq.read_table(path)
+            chunk = {name: data.column(name).to_numpy() for name in columns if name in data.column_names}
+        else:
+            with np.load(path) as data:
+                chunk = {name: data[name] for name in columns if name in data.files}
+        n = len(next(iter(chunk.values()), []))
+        for name, dtype in columns.items():
+            # Columns added after a file was written read back as empty / zero
+            parts[name].append(chunk.get(name, np.zeros(n, dtype=str if dtype == 'U' else dtype)))
+    out = {name: np.concatenate(p).astype(str) if columns[name] == 'U' and p else np.concatenate(p) if p
+           else np.empty(0, dtype=str if columns[name] == 'U' else columns[name]) for name, p in parts.items()}
+    if since is not None and len(out['ts']):
+        keep = out['ts'] >= since
+        out = {name: col[keep] for name, col in out.items()}
+    return out
+
+
+def _filter(table: Dict[str, np.ndarray], *, mode: Optional[str] = None, humans_only: bool = False) -> Dict[str, np.ndarray]:
+    keep = np.ones(len(table['ts']), dtype=bool)
+    if mode:
+        keep &= table['mode'] == mode
+    if humans_only and 'is_bot' in table:
+        keep &= ~table['is_bot']
+    return {name: col[keep] for name, col in table.items()}
+
+
+def _group(keys: np.ndarray):
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    return uniques, inverse, np.bincount(inverse, minlength=len(uniques))
+
+
+def summary(answers: Dict[str, np.ndarray], rounds: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    answered = answers['answered']
+    elapsed = answers['elapsed'][answered & ~np.isnan(answers['elapsed'])]
+    return {
+        'games': int(len(np.unique(rounds['game_id']))),
+        'rounds': int(len(rounds['ts'])),
+        'answer_rows': int(len(answers['ts'])),
+        'answered': int(np.count_nonzero(answered)),
+        'accuracy': round(float(np.mean(answers['correct'][answered])), 3) if answered.any() else None,
+        'median_answer_s': round(float(np.median(elapsed)), 3) if len(elapsed) else None,
+        'helps_used': int(np.sum(rounds['helps_used'])),
+    }
+
+
+def question_accuracy(answers: Dict[str, np.ndarray], min_answers: int = 5, limit: int = 20) -> List[Dict[str, Any]]:
+    """Hardest questions first: accuracy and mean answer time per question text."""
+    answered = answers['answered']
+    questions, inverse, _ = _group(answers['question'][answered])
+    count = np.bincount(inverse, minlength=len(questions))
+    correct = np.bincount(inverse, weights=answers['correct'][answered], minlength=len(questions))
+    elapsed = np.nan_to_num(answers['elapsed'][answered].astype(np.float64))
+    total_time = np.bincount(inverse, weights=elapsed, minlength=len(questions))
+    enough = count >= min_answers
+    accuracy = np.divide(correct, count, out=np.zeros(len(questions)), where=count > 0)
+    order = np.flatnonzero(enough)[np.argsort(accuracy[enough], kind='stable')][:limit]
+    return [{'question': str(questions[i]), 'answers': int(count[i]), 'accuracy': round(float(accuracy[i]), 3),
+             'mean_answer_s': round(float(total_time[i] / count[i]), 2)} for i in order]
+
+
+def help_usage(answers: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Per help type: how often it was used and the accuracy of answers given with and without it."""
+    from .players import HELP_TYPES
+    answered = answers['answered']
+    rows = []
+    for help_type in HELP_TYPES:
+        used = np.char.find(answers['helps'].astype(str), help_type) >= 0
+        with_help = answered & used
+        without = answered & ~used
+        rows.append({
+            'help': help_type,
+            'used': int(np.count_nonzero(used)),
+            'accuracy_with': round(float(np.mean(answers['correct'][with_help])), 3) if with_help.any() else None,
+            'accuracy_without': round(float(np.mean(answers['correct'][without])), 3) if without.any() else None,
+        })
+    return rows
+
+
+def elimination_curve(rounds: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Battle royale: average share of the starting field still standing after each round."""
+    rounds = _filter(rounds, mode='battle_royale')
+    if not len(rounds['ts']):
+        return []
+    games, game_idx, _ = _group(rounds['game_id'])
+    first = rounds['round'] == 1
+    starting = np.zeros(len(games))
+    starting[game_idx[first]] = rounds['players'][first]
+    field = starting[game_idx]
+    valid = field > 0
+    numbers, inverse, count = _group(rounds['round'][valid])
+    surviving = np.bincount(inverse, weights=rounds['active_after'][valid] / field[valid], minlength=len(numbers))
+    eliminated = np.bincount(inverse, weights=rounds['eliminated'][valid], minlength=len(numbers))
+    return [{'round': int(r), 'games': int(c), 'surviving_share': round(float(s / c), 3),
+             'mean_eliminated': round(float(e / c), 2)} for r, c, s, e in zip(numbers, count, surviving, eliminated)]
+
+
+def answer_times(answers: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Answer-time percentiles per question difficulty."""
+    has_time = answers['answered'] & ~np.isnan(answers['elapsed'])
+    difficulty = answers['difficulty'][has_time]
+    elapsed = answers['elapsed'][has_time]
+    order = np.argsort(difficulty, kind='stable')
+    difficulty, elapsed = difficulty[order], elapsed[order]
+    levels, starts = np.unique(difficulty, return_index=True)
+    rows = []
+    for level, group in zip(levels, np.split(elapsed, starts[1:])):
+        p50, p90 = np.percentile(group, [50, 90])
+        rows.append({'difficulty': int(level), 'answers': int(len(group)), 'p50_s': round(float(p50), 2),
+                     'p90_s': round(float(p90), 2), 'max_s': round(float(group.max()), 2)})
+    return rows
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    from . import config
+
+    parser = argparse.ArgumentParser(description="Aggregate the analytics files written by the game servers.")
+    parser.add_argument('query', choices=('summary', 'questions', 'helps', 'eliminations', 'times'))
+    parser.add_argument('--dir', default=config.ANALYTICS_DIR or 'analytics')
+    parser.add_argument('--mode', choices=('classic', 'battle_royale'), default=None)
+    parser.add_argument('--hours', type=float, default=None, help="Only rows from the last N hours")
+    parser.add_argument('--include-bots', action='store_true', help="Count bot answers too (default: humans only)")
+    parser.add_argument('--min-answers', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    answers = _filter(load_table(args.dir, 'answers', since), mode=args.mode, humans_only=not args.include_bots)
+    rounds = _filter(load_table(args.dir, 'rounds', since), mode=args.mode)
+    if args.query == 'summary':
+        result = summary(answers, rounds)
+    elif args.query == 'questions':
+        result = question_accuracy(answers, args.min_answers, args.limit)
+    elif args.query == 'helps':
+        result = help_usage(answers)
+    elif args.query == 'eliminations':
+        result = elimination_curve(rounds)
+    else:
+        result = answer_times(answers)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            print(f"{key:<18} {value}")
+    else:
+        if result:
+            keys = list(result[0])
+            print('  '.join(f"{k:>16}" if k != 'question' else f"{k:<60}" for k in keys))
+            for row in result:
+                print('  '.join(f"{str(row[k])[:60]:<60}" if k == 'question' else f"{str(row[k]):>16}" for k in keys))
+        else:
+            print("No matching rows.")
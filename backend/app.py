@@ -2,7 +2,8 @@ import os
 import time
 import random
 import uuid
-from threading import RLock, Timer as ThreadingTimer
+from functools import partial
+from threading import RLock
 
 from flask import Flask, request  # request will be None in timer threads
 from flask_socketio import SocketIO, emit, join_room, leave_room
@@ -10,13 +11,96 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 # Import refactored modules
 from backend import config
 from backend.constants import CLASSIC_MODE, BATTLE_ROYALE_MODE
-from backend.questions import get_random_questions
-from backend.llm import get_gemini_model, get_llm_advice
+from backend.questions import get_random_questions, get_question_bank, QuestionBankWatcher, GameQuestions
+from backend.llm import get_gemini_model, HintService
+from backend.admin import admin_bp
+from backend.sessions import SessionManager
+from backend.outbound import OutboundQueues
+from backend.latency import LatencyTracker
+from backend.actor import GameActor, GameWorkerPool
+from backend.matchmaking import RatingStore, Matchmaker
+from backend.profiling import Profiler, install_signal_toggle
+from backend.log import get_logger
+from backend.payloads import PacketJSON
+from backend.players import PlayerTable
+from backend.categories import normalize_topics
+from backend.journal import GameJournal
+from backend.analytics import AnalyticsSink
+from backend.admission import AdmissionController, CRITICAL, NORMAL, LOW
+from backend.tournament import TournamentManager
+from backend.show import ShowManager
+from backend.diagnostics import LeakDetector
+
+log = get_logger(__name__)
 
 # Flask/SocketIO initialization using config
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.SECRET_KEY
-socketio = SocketIO(app, cors_allowed_origins=config.CORS_ALLOWED_ORIGINS, async_mode=config.ASYNC_MODE)
+# PacketJSON splices pre-encoded payloads (backend.payloads.PreEncoded) into packets instead of re-serializing them
+socketio = SocketIO(app, cors_allowed_origins=config.CORS_ALLOWED_ORIGINS, async_mode=config.ASYNC_MODE, json=PacketJSON)
+app.register_blueprint(admin_bp)
+# All server-initiated emits go through per-client outbound queues (backpressure for slow clients)
+outbound = OutboundQueues(
+    socketio,
+    max_events=config.OUTBOUND_MAX_EVENTS,
+    max_bytes=config.OUTBOUND_MAX_BYTES,
+    transport_high_water=config.OUTBOUND_TRANSPORT_HIGH_WATER,
+    overflow_grace=config.OUTBOUND_OVERFLOW_GRACE,
+    drain_interval=config.OUTBOUND_DRAIN_INTERVAL,
+)
+app.extensions['outbound_queues'] = outbound
+latency = LatencyTracker(max_one_way=config.LATENCY_MAX_COMPENSATION)
+app.extensions['latency_tracker'] = latency
+profiler = Profiler(
+    sample_interval=config.PROFILE_SAMPLE_INTERVAL,
+    slow_threshold=config.SLOW_CALL_THRESHOLD,
+    history=config.SLOW_CALL_HISTORY,
+)
+app.extensions['profiler'] = profiler
+game_workers = GameWorkerPool(config.GAME_WORKER_THREADS, profiler=profiler)
+hints = HintService(max_workers=config.HINT_WORKERS, profiler=profiler)
+app.extensions['game_workers'] = game_workers
+app.extensions['hints'] = hints
+admission = AdmissionController(
+    limits=config.ADMISSION_LIMITS,
+    ip_multiplier=config.ADMISSION_IP_MULTIPLIER,
+    overload_latency=config.OVERLOAD_HANDLER_LATENCY,
+    overload_queue_depth=config.OVERLOAD_QUEUE_DEPTH,
+    queue_depth=lambda: sum(w['inbox'] for w in game_workers.stats()) + shows.intake_depth(),
+    check_interval=config.OVERLOAD_CHECK_INTERVAL,
+)
+app.extensions['admission'] = admission
+journal = None
+if config.JOURNAL_DIR:
+    journal = GameJournal(
+        directory=config.JOURNAL_DIR,
+        fsync_interval=config.JOURNAL_FSYNC_INTERVAL,
+        snapshot_every=config.JOURNAL_SNAPSHOT_EVERY,
+    )
+    journal.start()
+    app.extensions['journal'] = journal
+analytics = None
+if config.ANALYTICS_DIR:
+    analytics = AnalyticsSink(
+        directory=config.ANALYTICS_DIR,
+        flush_interval=config.ANALYTICS_FLUSH_INTERVAL,
+        max_rows=config.ANALYTICS_MAX_BUFFER_ROWS,
+        compression=config.ANALYTICS_COMPRESSION,
+    )
+    analytics.start()
+    app.extensions['analytics'] = analytics
+diagnostics = None
+if config.LEAK_DIAGNOSTICS:
+    diagnostics = LeakDetector(
+        grace=config.LEAK_CHECK_GRACE,
+        worker_stats=game_workers.stats,
+        orphaned_timers=game_workers.orphaned_timers,
+        tracemalloc_frames=config.LEAK_TRACEMALLOC_FRAMES,
+        snapshot_every=config.LEAK_SNAPSHOT_EVERY,
+    )
+    diagnostics.start()
+    diagnostics.start_checker(socketio, config.LEAK_CHECK_INTERVAL)
+    app.extensions['diagnostics'] = diagnostics
 
 # Local aliases to config values (to minimize code churn)
 LOBBY_WAIT_TIME = config.LOBBY_WAIT_TIME
@@ -40,90 +124,134 @@ try:
 except FileNotFoundError:
     bot_names_list = ["BotAlpha", "BotBeta", "BotGamma"]
 
-# --- SINGLE GAME STATE MANAGEMENT ---
-current_game = None  # Will hold game data: { ..., 'mode': CLASSIC_MODE | BATTLE_ROYALE_MODE, ... }
+# --- GAME STATE MANAGEMENT ---
+# Each running game is owned by a GameActor; only the actor's worker thread touches the game dict.
+games = {}  # { game_id: GameActor }
+player_games = {}  # { sid: game_id } for humans currently in a game
+spectators = {}  # { sid: game_id } for outsiders watching a game
+app.extensions['games'] = games
 lobby_players = {}  # { sid: {'username': string, 'desired_mode': string} }
 lobby_lock = RLock()
 
 # Lobby managed via LobbyManager
 # Helper: ensure game creation happens within Flask app context when called from background threads
 
-def _create_game_from_lobby_with_context(mode):
+def _create_game_from_lobby_with_context(mode, players):
     with app.app_context():
-        create_game_from_lobby(mode)
+        create_game_from_lobby(mode, players)
 
 from backend.lobby import LobbyManager
 lobby_manager = LobbyManager(
-    socketio=socketio,
+    socketio=outbound,
     namespace=config.DEFAULT_NAMESPACE,
     wait_time=LOBBY_WAIT_TIME,
+    max_players={CLASSIC_MODE: config.LOBBY_MAX_PLAYERS_CLASSIC, BATTLE_ROYALE_MODE: config.LOBBY_MAX_PLAYERS_BATTLE_ROYALE},
     lock=lobby_lock,
-    get_players_for_mode=lambda mode: {sid: p for sid, p in lobby_players.items() if p.get('desired_mode') == mode},
-    is_game_active=lambda: current_game is not None,
-    on_countdown_finished=lambda mode: _create_game_from_lobby_with_context(mode),
+    on_countdown_finished=_create_game_from_lobby_with_context,
 )
+app.extensions['lobbies'] = lobby_manager
 
 DEFAULT_NAMESPACE = config.DEFAULT_NAMESPACE  # Define for clarity
 
-from backend.game import next_question as gm_next_question, reveal_answers_and_scores as gm_reveal_answers_and_scores, end_game as gm_end_game
+def _create_game_for_match_with_context(mode, players, bot_difficulty):
+    with app.app_context():
+        create_game(mode, players, bot_difficulty)
+
+ratings = RatingStore(
+    initial=config.RATING_INITIAL,
+    k_factor=config.RATING_K_FACTOR,
+    bot_ratings=config.BOT_RATINGS,
+    path=config.RATINGS_FILE or None,
+    save_interval=config.RATINGS_SAVE_INTERVAL,
+)
+ratings.start()
+matchmaker = Matchmaker(
+    socketio=outbound,
+    namespace=DEFAULT_NAMESPACE,
+    ratings=ratings,
+    match_sizes={CLASSIC_MODE: config.MATCH_SIZE_CLASSIC, BATTLE_ROYALE_MODE: config.MATCH_SIZE_BATTLE_ROYALE},
+    max_wait=config.MATCH_MAX_WAIT,
+    band_width=config.RATING_BAND_WIDTH,
+    on_match=_create_game_for_match_with_context,
+)
+app.extensions['matchmaker'] = matchmaker
+
+def _create_game_for_tournament_with_context(mode, players, bot_difficulty, tag):
+    with app.app_context():
+        return create_game(mode, players, bot_difficulty, tournament=tag)
+
+tournaments = TournamentManager(
+    socketio=outbound,
+    namespace=DEFAULT_NAMESPACE,
+    ratings=ratings,
+    create_match=_create_game_for_tournament_with_context,
+    stagger=config.TOURNAMENT_STAGGER_INTERVAL,
+    max_concurrent=config.TOURNAMENT_MAX_CONCURRENT_MATCHES,
+    round_break=config.TOURNAMENT_ROUND_BREAK,
+)
+app.extensions['tournaments'] = tournaments
+shows = ShowManager(
+    socketio=outbound,
+    namespace=DEFAULT_NAMESPACE,
+    latency=latency,
+    draw_questions=lambda n: get_random_questions(n, bank=get_question_bank()),
+    points_base=POINTS_BASE,
+    question_duration=config.SHOW_QUESTION_DURATION,
+    results_time=config.SHOW_RESULTS_TIME,
+    tally_interval=config.SHOW_TALLY_INTERVAL,
+    elimination=config.SHOW_ELIMINATION,
+    winners_listed=config.SHOW_WINNERS_LISTED,
+    finished_kept=config.SHOW_FINISHED_KEPT,
+    intake_workers=config.SHOW_INTAKE_WORKERS,
+    intake_capacity=config.SHOW_INTAKE_CAPACITY,
+)
+app.extensions['shows'] = shows
+USE_MATCHMAKING = config.LOBBY_STRATEGY == 'matchmaking'
+
+
+def _questions_for_game(game):
+    # Games keep the bank snapshot they started with, so a hot reload never changes a running game
+    return partial(get_random_questions, bank=game.get('question_bank'), topics=game.get('topics', ()))
+
+def _topics_for_game(players_to_move, bank):
+    """Union of the topics the humans asked for; no filter if nobody chose or the bank is too thin for them."""
+    topics = sorted({t for p in players_to_move.values() for t in p.get('topics', ())})
+    if topics and bank.topic_size(topics) < QUESTIONS_PER_GAME:
+        log.warning("Only %d questions for topics %s; using the whole bank.", bank.topic_size(topics), ','.join(topics))
+        return ()
+    return tuple(topics)
 
 def calculate_points(t):
     return int(POINTS_BASE * max(0.1, (QUESTION_DURATION - t) / QUESTION_DURATION))
 
-def _stop_lobby_countdown_sequence(emit_update=False): # Renamed emit_update for clarity
-    global lobby_countdown_timer_obj, lobby_countdown_active, lobby_current_time_remaining, lobby_mode_in_countdown
-
-    if lobby_countdown_timer_obj and lobby_countdown_timer_obj.is_alive():
-        lobby_countdown_timer_obj.cancel(); lobby_countdown_timer_obj = None
-
-    was_active = lobby_countdown_active
-    stopped_mode_for_emit = lobby_mode_in_countdown # Capture before reset
-
-    lobby_countdown_active = False
-    lobby_mode_in_countdown = None # Reset
-    lobby_current_time_remaining = LOBBY_WAIT_TIME
-
-    if was_active and emit_update and stopped_mode_for_emit: # Ensure there was a mode to report as stopped
-        print(f"{stopped_mode_for_emit.capitalize()} lobby countdown stopped and reset.")
-        # Players still in lobby_players waiting for this mode (if any, e.g., if stopped early by admin)
-        remaining_players_for_stopped_mode = [p for p in lobby_players.values() if p.get('desired_mode') == stopped_mode_for_emit]
-
-        context_needed = not request and hasattr(app, 'app_context')
-        if context_needed:
-            with app.app_context():
-                socketio.emit('lobby_countdown_update', {
-                    'mode': stopped_mode_for_emit, # Send the mode that was stopped
-                    'time_remaining': lobby_current_time_remaining,
-                    'players': remaining_players_for_stopped_mode,
-                    'is_active': False
-                    }, namespace=DEFAULT_NAMESPACE)
-        elif hasattr(socketio, 'emit'):
-             socketio.emit('lobby_countdown_update', {
-                'mode': stopped_mode_for_emit, # Send the mode
-                'time_remaining': lobby_current_time_remaining,
-                'players': remaining_players_for_stopped_mode,
-                'is_active': False
-                }, namespace=DEFAULT_NAMESPACE)
-
-    if was_active:  # Only trigger if a countdown was actually running and now stopped
-        lobby_manager.trigger_next_waiting_lobby_if_any([CLASSIC_MODE, BATTLE_ROYALE_MODE])
-
-def create_game_from_lobby(mode_being_created): # Takes mode as argument now
-    global lobby_players, current_game
+def _actor_for_sid(sid):
+    game_id = player_games.get(sid)
+    return games.get(game_id) if game_id else None
+
+def _on_game_end(actor):
+    # Runs on the game's worker thread once the actor has finished
+    games.pop(actor.game_id, None)
+    for sid in [s for s, gid in list(player_games.items()) if gid == actor.game_id]:
+        player_games.pop(sid, None)
+    for sid in [s for s, gid in list(spectators.items()) if gid == actor.game_id]:
+        spectators.pop(sid, None)
+    if actor.game.get('final_standings'):
+        ratings.record_game(actor.game['final_standings'], actor.game.get('bot_difficulty', DEFAULT_BOT_DIFFICULTY))
+    tournaments.on_game_end(actor.game_id, actor.game.get('final_standings') or [])
+    if diagnostics:
+        diagnostics.game_finished(actor.game_id)
+
+def create_game_from_lobby(mode_being_created, lobby_members):
+    global lobby_players
 
-    game_id = f"{mode_being_created}_{uuid.uuid4()}"
-    game_players_data = {}
-    human_sids_in_game = []
     game_effective_bot_difficulty = DEFAULT_BOT_DIFFICULTY # Default for the game
 
     with lobby_lock:
-        if current_game is not None:
-            print(f"Create_game ({mode_being_created}): Game already active ({current_game['game_id']}). Aborting creation.");
-            return
-
-        players_to_move = {sid: p_data for sid, p_data in lobby_players.items() if p_data.get('desired_mode') == mode_being_created}
+        # Only those still waiting; anyone who left or switched mode since the lobby closed stays out
+        players_to_move = {sid: lobby_players[sid] for sid in lobby_members
+                           if sid in lobby_players and lobby_players[sid].get('desired_mode') == mode_being_created}
         if not players_to_move:
-            print(f"Create_game ({mode_being_created}): No players found for this mode in lobby. Aborting creation.");
+            log.info("Create_game (%s): No players found for this mode in lobby. Aborting creation.", mode_being_created)
             return
 
         # Determine game's bot difficulty from the first human player initiating this game
@@ -131,19 +259,34 @@ def create_game_from_lobby(mode_being_created): # Takes mode as argument now
         for sid, p_data in players_to_move.items():
             if not p_data.get('is_bot', False): # Check if it's a human's preference
                 game_effective_bot_difficulty = p_data.get('bot_difficulty_pref', DEFAULT_BOT_DIFFICULTY)
-                print(f"Game bot difficulty set to '{game_effective_bot_difficulty}' based on player {p_data['username']}.")
+                log.debug("Game bot difficulty set to '%s' based on player %s.", game_effective_bot_difficulty, p_data['username'])
                 first_human_processed_for_difficulty = True
                 break
         if not first_human_processed_for_difficulty and players_to_move: # Fallback if somehow no human preference was found among movers
-             print("Warning: No human player found to set game bot difficulty from players_to_move, using default.")
+             log.warning("No human player found to set game bot difficulty from players_to_move, using default.")
 
 
         # Remove moved players from the global lobby_players list
         for sid in players_to_move.keys():
             if sid in lobby_players:
                 del lobby_players[sid]
+    # ...and from any lobby they re-joined meanwhile; outside the lock, since leaving may emit
+    for sid in players_to_move.keys():
+        lobby_manager.leave(sid)
 
-        print(f"Starting {mode_being_created} game {game_id}. Moving {len(players_to_move)} players.")
+    create_game(mode_being_created, players_to_move, game_effective_bot_difficulty)
+
+def create_game(mode_being_created, players_to_move, game_effective_bot_difficulty, tournament=None):
+    """
+    Start a game for an explicit set of human players ({sid: {'username', ...}}), filling with bots.
+    `tournament` tags a tournament match ({'tournament_id', 'round', 'match'}). Returns the game id, or None.
+    """
+    game_id = f"{mode_being_created}_{uuid.uuid4()}"
+    game_players_data = {}
+    human_sids_in_game = []
+
+    with lobby_lock:
+        log.info("Starting %s game with %d players", mode_being_created, len(players_to_move), extra={'game_id': game_id, 'mode': mode_being_created})
         for sid, player_info in players_to_move.items():
             game_players_data[sid] = {
                 'username': player_info['username'], 'score': 0, 'is_bot': False,
@@ -154,17 +297,16 @@ def create_game_from_lobby(mode_being_created): # Takes mode as argument now
             human_sids_in_game.append(sid)
 
     if not human_sids_in_game:
-        print(f"Error: No human players were actually processed for game {game_id}. Aborting.")
-        current_game = None
+        log.error("No human players were actually processed. Aborting.", extra={'game_id': game_id})
         return
 
     num_bots_to_add_final = 0
-    print(f"DEBUG: Bot addition logic for mode: {mode_being_created}, humans: {len(human_sids_in_game)}")
+    log.debug("Bot addition logic for mode %s, humans: %d", mode_being_created, len(human_sids_in_game), extra={'game_id': game_id})
 
     if mode_being_created == CLASSIC_MODE:
         if len(human_sids_in_game) == 1:
             num_bots_to_add_final = random.randint(MIN_BOTS, MAX_BOTS)
-            print(f"Classic (1 human): Adding random {num_bots_to_add_final} bots.")
+            log.debug("Classic (1 human): Adding random %d bots.", num_bots_to_add_final, extra={'game_id': game_id})
         # else: 0 bots for classic if >1 human or 0 humans (though 0 humans is handled earlier)
 
     elif mode_being_created == BATTLE_ROYALE_MODE:
@@ -172,19 +314,20 @@ def create_game_from_lobby(mode_being_created): # Takes mode as argument now
 
         if len(human_sids_in_game) == 0:  # Should have been caught earlier, but defensive
             num_bots_to_add_final = 0  # Cannot start BR with 0 humans typically
-            print("BR: No humans, no bots added.")
+            log.debug("BR: No humans, no bots added.", extra={'game_id': game_id})
         elif len(human_sids_in_game) < MIN_TOTAL_ENTITIES_FOR_BR:
             potential_random_bots = random.randint(MIN_BOTS, MAX_BOTS)
             needed_to_reach_min_total = MIN_TOTAL_ENTITIES_FOR_BR - len(human_sids_in_game)
             if potential_random_bots < needed_to_reach_min_total:
                 num_bots_to_add_final = min(needed_to_reach_min_total, MAX_BOTS)
-                print(f"BR ({len(human_sids_in_game)} humans): Random bots ({potential_random_bots}) too few. Adding {num_bots_to_add_final} to meet min total {MIN_TOTAL_ENTITIES_FOR_BR}.")
+                log.debug("BR (%d humans): Random bots (%d) too few. Adding %d to meet min total %d.", len(human_sids_in_game),
+                          potential_random_bots, num_bots_to_add_final, MIN_TOTAL_ENTITIES_FOR_BR, extra={'game_id': game_id})
             else:
                 num_bots_to_add_final = min(potential_random_bots, MAX_BOTS)
-                print(f"BR ({len(human_sids_in_game)} humans): Adding random {num_bots_to_add_final} bots (capped by MAX_BOTS if needed).")
+                log.debug("BR (%d humans): Adding random %d bots (capped by MAX_BOTS if needed).", len(human_sids_in_game), num_bots_to_add_final, extra={'game_id': game_id})
         else:
             num_bots_to_add_final = 0
-            print(f"BR ({len(human_sids_in_game)} humans): Sufficient players, no bots added.")
+            log.debug("BR (%d humans): Sufficient players, no bots added.", len(human_sids_in_game), extra={'game_id': game_id})
 
     # The rest of your bot instantiation code remains the same:
     if num_bots_to_add_final > 0:
@@ -205,23 +348,25 @@ def create_game_from_lobby(mode_being_created): # Takes mode as argument now
             }
             actual_bots_added_count +=1
         if actual_bots_added_count > 0:
-             print(f"Successfully added {actual_bots_added_count} bots to {mode_being_created} game {game_id}.")
+             log.debug("Added %d bots", actual_bots_added_count, extra={'game_id': game_id})
     initial_active_sids = list(human_sids_in_game)
     initial_active_sids.extend([sid for sid, p_data in game_players_data.items() if p_data['is_bot']])
 
     initial_game_difficulty = 5 # Default for classic
     if mode_being_created == BATTLE_ROYALE_MODE:
         initial_game_difficulty = 1  # BR starts at difficulty 1
-        print(f"Battle Royale game {game_id} starting at difficulty {initial_game_difficulty}.")
+        log.debug("Battle Royale game starting at difficulty %d.", initial_game_difficulty, extra={'game_id': game_id})
 
-    current_game = {
+    question_bank = get_question_bank()
+    topics = _topics_for_game(players_to_move, question_bank)
+    game = {
         'game_id': game_id,
         'mode': mode_being_created,
-        'players': game_players_data,
-        'questions': get_random_questions(
-            QUESTIONS_PER_GAME if mode_being_created == CLASSIC_MODE else config.BR_INITIAL_QUESTIONS_BATCH,  # Initial batch size
-            diff=initial_game_difficulty  # Use the determined initial difficulty
-        ),
+        'players': PlayerTable.from_records(game_players_data),
+        'question_bank': question_bank,
+        # One (question id, option order) slot per round; each round draws its question when it is served
+        'questions': GameQuestions(question_bank, QUESTIONS_PER_GAME if mode_being_created == CLASSIC_MODE else config.BR_INITIAL_QUESTIONS_BATCH),
+        'topics': topics,
         'current_question_index': -1,
         'game_state': 'in_progress',
         'adaptive_difficulty': initial_game_difficulty, # Store the game's current difficulty level
@@ -230,152 +375,151 @@ def create_game_from_lobby(mode_being_created): # Takes mode as argument now
         'room_name': game_id,
         'initial_player_count': len(initial_active_sids),
         'bot_difficulty': game_effective_bot_difficulty,
+        # Journaled so clients can resume their slots after a server restart
+        'session_tokens': {sid: sessions.token_for_sid(sid) for sid in human_sids_in_game if sessions.token_for_sid(sid)},
         # For BR difficulty progression
-        'questions_at_current_difficulty_streak': 0 if mode_being_created == BATTLE_ROYALE_MODE else -1 # -1 for classic (no streak)
+        'questions_at_current_difficulty_streak': 0 if mode_being_created == BATTLE_ROYALE_MODE else -1, # -1 for classic (no streak)
+        'tournament': tournament,
     }
 
-    print(f"Game {current_game['game_id']} ({current_game['mode']}) created with bot difficulty '{current_game['bot_difficulty']}'. Initial Active: {len(initial_active_sids)}")
-    game_start_payload = {
-        'game_id': current_game['game_id'], 'mode': current_game['mode'],
-        'players': list(current_game['players'].values()),
-        'initial_player_count': current_game.get('initial_player_count')
-    }
-    # Emit to the game room (preferred)
-    socketio.emit('game_starting', game_start_payload, room=current_game['room_name'], namespace=DEFAULT_NAMESPACE)
-    # Fallback: also emit directly to each human sid to ensure delivery even if room join was missed
-    for sid in human_sids_in_game:
-        socketio.emit('game_starting', game_start_payload, room=sid, namespace=DEFAULT_NAMESPACE)
-    socketio.sleep(2)
-    # Delegate to game manager function wrapper
-    gm_next_question(
-        current_game=current_game,
-        socketio=socketio,
-        namespace=DEFAULT_NAMESPACE,
-        config=config,
-        get_random_questions=get_random_questions,
-        calculate_points=calculate_points,
-        bot_action=bot_action,
-    )
-    # Wire the question timer now using the same closure over current_game
-    if current_game and current_game.get('game_state') == 'in_progress':
-        if current_game.get('question_timer'):
-            current_game['question_timer'].cancel()
-        current_game['question_timer'] = ThreadingTimer(QUESTION_DURATION, lambda: gm_reveal_answers_and_scores(
-            current_game=current_game,
-            socketio=socketio,
-            namespace=DEFAULT_NAMESPACE,
-            app=app,
-            config=config,
-            calculate_points=calculate_points,
-            get_llm_advice=get_llm_advice,
-        ))
-        current_game['question_timer'].start()
-
-# next_question delegated to backend.game.gm_next_question wrapper during game creation
-
-def reveal_answers_and_scores():
-    global current_game
-    gm_reveal_answers_and_scores(
-        current_game=current_game,
-        socketio=socketio,
+    log.info("Game created with bot difficulty '%s' and %d players", game['bot_difficulty'], len(initial_active_sids),
+             extra={'game_id': game_id, 'mode': game['mode'], 'event': 'game_created'})
+    actor = _start_actor(game)
+    actor.tell('start')
+    return game_id
+
+def _start_actor(game):
+    actor = GameActor(
+        game,
+        worker=game_workers.worker_for(game['game_id']),
+        socketio=outbound,
         namespace=DEFAULT_NAMESPACE,
-        app=app,
         config=config,
         calculate_points=calculate_points,
-        get_llm_advice=get_llm_advice,
+        get_random_questions=_questions_for_game(game),
+        hints=hints,
+        latency=latency,
+        on_finished=_on_game_end,
+        journal=journal,
+        analytics=analytics,
     )
-    # After reveal, brief pause to let clients render results and reset local round state
-    if current_game and current_game.get('game_state') == 'in_progress':
-        socketio.sleep(2)
-        gm_next_question(
-            current_game=current_game,
-            socketio=socketio,
-            namespace=DEFAULT_NAMESPACE,
-            config=config,
-            get_random_questions=get_random_questions,
-            calculate_points=calculate_points,
-            bot_action=bot_action,
-        )
-        # Re-arm the question timer for the next reveal
-        if current_game and current_game.get('game_state') == 'in_progress':
-            if current_game.get('question_timer'):
-                current_game['question_timer'].cancel()
-            current_game['question_timer'] = ThreadingTimer(QUESTION_DURATION, reveal_answers_and_scores)
-            current_game['question_timer'].start()
-    return
-
-# This is the timer function that will call bot_thinks_and_answers
-from backend.bots import schedule_bot_answer
-
-def bot_action(bot_sid, question_data):
-    global current_game
-    if not current_game or bot_sid not in current_game['players']:
-        return
-    bot_player_initial_data = current_game['players'][bot_sid]
-    if bot_player_initial_data.get('is_eliminated'):
-        return
-    schedule_bot_answer(current_game, bot_sid, question_data, calculate_points)
-def end_game():
-    global current_game
-    gm_end_game(current_game=current_game, socketio=socketio, namespace=DEFAULT_NAMESPACE, lobby_manager=lobby_manager)
-    current_game = None
+    games[game['game_id']] = actor
+    for sid in game['human_player_sids']:
+        player_games[sid] = game['game_id']
+    if diagnostics:
+        diagnostics.track_game(actor)
+    return actor
+
+def recover_games():
+    """Rebuild the games that were running when the process stopped, from their journals."""
+    if not journal:
+        return 0
+    states = journal.recover()
+    for state in states:
+        players = state.pop('players')
+        for p in players.values():
+            if not p['is_bot']:
+                p['disconnected'] = True  # Nobody is connected yet; resumes clear this
+        bank = get_question_bank()
+        game = dict(state, players=PlayerTable.from_records(players), question_bank=bank, game_state='in_progress',
+                    questions=GameQuestions.from_state(bank, state.get('questions', [])), topics=tuple(state.get('topics', ())))
+        actor = _start_actor(game)
+        for sid, token in game.get('session_tokens', {}).items():
+            sessions.adopt(token, sid)
+        actor.tell('recover', delay=config.JOURNAL_RECOVERY_DELAY)
+    if states:
+        log.info("Recovered %d game(s) from the journal", len(states))
+        sessions.start_reaper(socketio)
+    return len(states)
+
+def _on_session_expired(token, last_sid):
+    log.info("Session expired after %ss grace period", config.SESSION_GRACE_PERIOD, extra={'sid': last_sid})
+    tournaments.withdraw(last_sid)
+    shows.leave(last_sid)
+    actor = _actor_for_sid(last_sid)
+    if actor:
+        player_games.pop(last_sid, None)
+        actor.tell('remove_player', sid=last_sid)
+
+sessions = SessionManager(grace_period=config.SESSION_GRACE_PERIOD, on_expire=_on_session_expired)
+
+def _resume_game_slot(old_sid, new_sid):
+    """Hand a reconnected socket the game slot its session held. Returns True if there was one."""
+    actor = _actor_for_sid(old_sid)
+    if not actor:
+        return False
+    player_games[new_sid] = player_games.pop(old_sid)
+    actor.tell('resume', old_sid=old_sid, new_sid=new_sid)
+    return True
 
 @socketio.on('connect')
-def handle_connect():
-    sid = request.sid; print(f"Client connected: {sid}")
-    with lobby_lock:
-        is_active = lobby_manager.countdown_active and current_game is None
-        time_if_active = lobby_manager.time_remaining if is_active else LOBBY_WAIT_TIME
-        players_if_active = list(lobby_players.values()) if is_active else []
-        mode_if_active = lobby_manager.mode_in_countdown if is_active else None
-        emit('connection_ack', {
-            'sid': sid,
-            'message': 'Connected!',
-            'lobby_status': {
-                'mode': mode_if_active,
-                'time_remaining': time_if_active,
-                'players': players_if_active,
-                'is_active': is_active
-            }
-        })
+@profiler.timed('connect')
+def handle_connect(auth=None):
+    sid = request.sid; log.debug("Client connected", extra={'sid': sid, 'event': 'connect'})
+    sessions.start_reaper(socketio)
+    latency.start_pinger(outbound, interval=config.LATENCY_PING_INTERVAL, namespace=DEFAULT_NAMESPACE)
+    session_token = auth.get('session_token') if isinstance(auth, dict) else None
+    old_sid = sessions.resume(session_token, sid) if session_token else None
+    if old_sid is None:
+        session_token = sessions.issue(sid)
+    emit('connection_ack', {
+        'sid': sid,
+        'session_token': session_token,
+        'resumed': old_sid is not None,
+        'message': 'Connected!',
+        'lobby_status': lobby_manager.status(sid) or {
+            'mode': None,
+            'time_remaining': LOBBY_WAIT_TIME,
+            'players': [],
+            'is_active': False
+        }
+    })
+    if old_sid is not None:
+        tournaments.rebind(old_sid, sid)
+        shows.rebind(old_sid, sid)
+        _resume_game_slot(old_sid, sid)
 
 @socketio.on('disconnect')
+@profiler.timed('disconnect')
 def handle_disconnect():
-    global current_game
-    sid = request.sid; print(f"Client disconnected: {sid}")
+    sid = request.sid; log.debug("Client disconnected", extra={'sid': sid, 'event': 'disconnect'})
+    outbound.forget(sid, DEFAULT_NAMESPACE)
+    latency.forget(sid)
+    admission.forget(sid)
     p_name_left = "Unknown"
-    if current_game and sid in current_game['players']:
-        p_d = current_game['players'][sid]; p_name_left = p_d['username']
-        print(f"Player {p_name_left}({sid}) disconnected from game {current_game['game_id']}.")
-        if not p_d['is_bot']:
-            current_game['human_player_sids'].remove(sid)
-            socketio.emit('player_left',{'sid':sid,'username':p_name_left,'players':[p for ps,p in current_game['players'].items() if ps!=sid]}, room=current_game['room_name'], namespace=DEFAULT_NAMESPACE) # ADDED NAMESPACE
-        del current_game['players'][sid]
-        if not p_d['is_bot'] and not current_game['human_player_sids'] and current_game['game_state']=='in_progress':
-            if current_game.get('question_timer'): current_game['question_timer'].cancel()
-            end_game()
+    _stop_spectating(sid)
+    session_token = sessions.park(sid)
+    if not session_token and tournaments.withdraw(sid):
+        log.debug("Player withdrawn from tournament", extra={'sid': sid})
+    if not session_token and shows.leave(sid):
+        log.debug("Player left the show", extra={'sid': sid})
+    actor = _actor_for_sid(sid)
+    if actor:
+        if not session_token:
+            player_games.pop(sid, None)
+        actor.tell('disconnect', sid=sid, hold_slot=bool(session_token))
+        return
+    if session_token:
+        sessions.discard(session_token)
+    if matchmaker.remove(sid):
+        log.debug("Player removed from matchmaking queue", extra={'sid': sid})
         return
     with lobby_lock:
-        if sid in lobby_players:
-            p_name_left = lobby_players[sid]['username']; del lobby_players[sid]
-            print(f"Player {p_name_left}({sid}) removed from lobby.")
-            if not lobby_players and lobby_manager.countdown_active:
-                lobby_manager.stop(emit_update=True)
-            elif lobby_manager.countdown_active:
-                # Re-emit current state for this lobby
-                mode = lobby_manager.mode_in_countdown
-                players_for_mode = [p for p in lobby_players.values() if p.get('desired_mode') == mode]
-                socketio.emit('lobby_countdown_update', {
-                    'mode': mode,
-                    'time_remaining': lobby_manager.time_remaining,
-                    'players': players_for_mode,
-                    'is_active': True
-                }, namespace=DEFAULT_NAMESPACE)
-        # else: print(f"SID {sid} not in game or lobby.") # Already covered by specific logs
+        left_lobby = lobby_players.pop(sid, None)
+    if left_lobby:
+        log.debug("Player removed from lobby", extra={'sid': sid, 'username': left_lobby['username']})
+        lobby_manager.leave(sid)  # The rest of their lobby gets the updated player list; sent outside the lobby lock
+    # else: SID not in game or lobby; already covered by specific logs
+
+def _join_priority(data):
+    # Re-sending a join while already queued only refreshes preferences; shed it first
+    return LOW if request.sid in lobby_players or matchmaker.is_waiting(request.sid) else NORMAL
 
 @socketio.on('join_lobby_request')
+@profiler.timed('join_lobby_request')
+@admission.guard('join_lobby_request', priority=_join_priority)
 def on_join_lobby_request(data):
-    global current_game, lobby_players
+    global lobby_players
     sid = request.sid
     username = data.get('username', f'Player_{sid[:4]}').strip()
     desired_mode = data.get('mode', CLASSIC_MODE)
@@ -384,6 +528,7 @@ def on_join_lobby_request(data):
     player_bot_difficulty_pref = data.get('bot_difficulty', DEFAULT_BOT_DIFFICULTY).lower()
     if player_bot_difficulty_pref not in config.BOT_DIFFICULTY_SETTINGS:
         player_bot_difficulty_pref = DEFAULT_BOT_DIFFICULTY
+    topics = normalize_topics(data.get('topics'))
 
     if desired_mode not in [CLASSIC_MODE, BATTLE_ROYALE_MODE]:
         emit('error_message', {'message': 'Invalid game mode.'})
@@ -392,181 +537,196 @@ def on_join_lobby_request(data):
         emit('error_message', {'message': 'Username cannot be empty.'})
         return
 
-    if current_game:
-        if sid in current_game['players'] and current_game['mode'] == desired_mode:
-            print(f"Player {username} rejoining active {desired_mode} game {current_game['game_id']}.")
-            join_room(current_game['room_name'], sid=sid, namespace=DEFAULT_NAMESPACE)
-            # Send comprehensive game state for rejoin
-            emit('game_starting', {
-                'game_id': current_game['game_id'],
-                'mode': current_game['mode'],
-                'players': list(current_game['players'].values()),
-                'initial_player_count': current_game.get('initial_player_count'),
-                'current_question_data': current_game['questions'][current_game['current_question_index']] if current_game.get('current_question_index', -1) >=0 else None,
-                'question_number': current_game.get('current_question_index', -1) + 1,
-                'is_rejoin': True,
-                'active_player_sids': current_game.get('active_player_sids', [])
-            }, room=sid) # Only to this player
-            return
-        else:
-            emit('error_message', {'message': f"A {current_game['mode']} game is in progress. Please wait."})
+    _stop_spectating(sid)
+    actor = _actor_for_sid(sid)
+    session_token = data.get('session_token')
+    if not actor and session_token:
+        old_sid = sessions.resume(session_token, sid)
+        if old_sid not in (None, sid) and _resume_game_slot(old_sid, sid):
             return
+    if actor and actor.mode == desired_mode:
+        # Send comprehensive game state for rejoin
+        actor.tell('rejoin', sid=sid)
+        return
+    if tournaments.is_registered(sid):
+        emit('error_message', {'message': 'You are registered for a tournament; your matches start automatically.'})
+        return
+    if shows.is_joined(sid):
+        emit('error_message', {'message': 'You have joined a live show; leave it to play a game.'})
+        return
+    if actor:
+        emit('error_message', {'message': f"You are already in a {actor.mode} game."})
+        return
+    if USE_MATCHMAKING:
+        matchmaker.start_ticker(socketio)
+        matchmaker.enqueue(sid, username=username, mode=desired_mode, bot_difficulty=player_bot_difficulty_pref, topics=topics)
+        log.debug("Player queued for matchmaking", extra={'sid': sid, 'username': username, 'mode': desired_mode, 'event': 'mm_enqueue'})
+        return
 
     with lobby_lock:
-        if sid in lobby_players: # Player is already in the system
-            old_player_data = lobby_players[sid]
-            lobby_players[sid]['username'] = username # Update username
-            lobby_players[sid]['bot_difficulty_pref'] = player_bot_difficulty_pref # Update bot difficulty preference
-
-            if old_player_data.get('desired_mode') != desired_mode:
-                # Player is switching their desired mode
-                print(f"Player {username} switching desired mode from {old_player_data.get('desired_mode')} to {desired_mode}")
-                lobby_players[sid]['desired_mode'] = desired_mode
-
-                if lobby_countdown_active and lobby_mode_in_countdown == old_player_data.get('desired_mode'):
-                    # They were in the active countdown lobby and want to switch out
-                    players_still_in_old_mode_countdown = [p for p in lobby_players.values() if p.get('desired_mode') == old_player_data.get('desired_mode')]
-                    if not players_still_in_old_mode_countdown:
-                        print(f"Last player left {old_player_data.get('desired_mode')} countdown due to mode switch. Stopping.")
-                        _stop_lobby_countdown_sequence(emit_update_if_stopped_early=True) # This will try to trigger next
-                    else:
-                        socketio.emit('lobby_countdown_update', {
-                            'mode': old_player_data.get('desired_mode'),
-                            'time_remaining': lobby_current_time_remaining,
-                            'players': players_still_in_old_mode_countdown,
-                            'is_active': True
-                        }, namespace=DEFAULT_NAMESPACE)
-                # Try to see if their NEW desired mode can start a lobby or if they should just wait
-                # This will be handled by the logic block below.
-            # else: Player just updated username or re-clicked join for same mode.
-
-        else: # New player to the system
-            lobby_players[sid] = {
-                'sid': sid,
-                'username': username,
-                'desired_mode': desired_mode,
-                'bot_difficulty_pref': player_bot_difficulty_pref # Store preference
-            }
-            print(f"Player {username}({sid}) added to lobby_players for mode: {desired_mode}, bot diff pref: {player_bot_difficulty_pref}.")
-
-        # Logic for starting/joining/waiting for a lobby for THEIR desired_mode
-        # This section determines if a new countdown starts, or if player joins existing, or waits.
-        if not lobby_manager.countdown_active and current_game is None:
-            print(f"No active countdown. Player {username} wants {desired_mode}. Setting this as active lobby mode.")
-            lobby_manager.start(desired_mode)
-        elif lobby_manager.countdown_active and lobby_manager.mode_in_countdown == desired_mode:
-            players_for_this_countdown = [p for p in lobby_players.values() if p.get('desired_mode') == desired_mode]
-            print(f"Player {username} joining active {desired_mode} countdown.")
-            # Broadcast to update player list for everyone in that lobby
-            socketio.emit('lobby_countdown_update', {
-                'mode': desired_mode,
-                'time_remaining': lobby_manager.time_remaining,
-                'players': players_for_this_countdown,
-                'is_active': True
-            }, namespace=DEFAULT_NAMESPACE)
-        elif lobby_manager.countdown_active and lobby_manager.mode_in_countdown != desired_mode:
-            players_waiting_for_their_mode = [p for p in lobby_players.values() if p.get('desired_mode') == desired_mode]
-            print(f"Player {username} wants {desired_mode}, but {lobby_manager.mode_in_countdown} is active. Player will wait.")
-            emit('lobby_countdown_update', {
-                'mode': desired_mode,
-                'time_remaining': LOBBY_WAIT_TIME,
-                'players': players_waiting_for_their_mode,
-                'is_active': False # Their desired lobby is not the one counting down
-            }, room=sid) # Inform only this player about their specific waiting queue
-            emit('error_message', {'message': f"A {lobby_manager.mode_in_countdown} lobby is active. You've been added to the queue for {desired_mode}."})
-        elif not lobby_manager.countdown_active and current_game is None and any(p.get('desired_mode') == desired_mode for p in lobby_players.values()):
-            # This case handles if trigger_next_waiting_lobby_if_any might have been missed or conditions changed.
-            # If no countdown, no game, and there are players for this mode, try to start.
-            print(f"No active countdown, but players for {desired_mode} exist. Attempting to start.")
-            lobby_manager.start(desired_mode)
+        old_player_data = lobby_players.get(sid)
+        unchanged_rejoin = old_player_data is not None and (
+            old_player_data.get('username'), old_player_data.get('desired_mode'), old_player_data.get('bot_difficulty_pref'),
+            old_player_data.get('topics')) == (username, desired_mode, player_bot_difficulty_pref, topics)
+        if old_player_data and old_player_data.get('desired_mode') != desired_mode:
+            log.debug("Player switching desired mode from %s", old_player_data.get('desired_mode'), extra={'sid': sid, 'username': username, 'mode': desired_mode})
+        player = lobby_players[sid] = {
+            'sid': sid,
+            'username': username,
+            'desired_mode': desired_mode,
+            'bot_difficulty_pref': player_bot_difficulty_pref, # Store preference
+            'topics': topics,
+        }
+    # Stays in its lobby for the same mode, otherwise goes to the fullest open lobby for the new one.
+    # A repeated join that changed nothing only refreshes the sender, so it cannot fan out to the lobby.
+    # Called outside the lobby lock: the manager takes it itself and emits after releasing it.
+    lobby_manager.join(sid, player, quiet=unchanged_rejoin)
+    if old_player_data is None:
+        log.debug("Player joined lobby (bot difficulty pref %s)", player_bot_difficulty_pref,
+                  extra={'sid': sid, 'username': username, 'mode': desired_mode, 'event': 'lobby_join'})
+    lobby_manager.start_ticker(socketio)
+
+def _stop_spectating(sid):
+    game_id = spectators.pop(sid, None)
+    actor = games.get(game_id) if game_id else None
+    if actor:
+        actor.tell('unspectate', sid=sid)
+
+@socketio.on('spectate_request')
+@profiler.timed('spectate_request')
+@admission.guard('spectate_request', priority=NORMAL)
+def on_spectate_request(data):
+    sid = request.sid
+    if _actor_for_sid(sid):
+        emit('error_message', {'message': 'You are already in a game.'})
+        return
+    game_id = (data or {}).get('game_id')
+    # Without an explicit game, watch the longest-running one
+    actor = games.get(game_id) if game_id else next(iter(games.values()), None)
+    if not actor:
+        emit('error_message', {'message': 'No game to watch right now.'})
+        return
+    if spectators.get(sid) == actor.game_id:
+        return
+    _stop_spectating(sid)
+    spectators[sid] = actor.game_id
+    actor.tell('spectate', sid=sid)
+
+@socketio.on('tournament_register')
+@profiler.timed('tournament_register')
+@admission.guard('tournament_register', priority=NORMAL)
+def on_tournament_register(data):
+    sid = request.sid
+    data = data or {}
+    username = (data.get('username') or f'Player_{sid[:4]}').strip()
+    if _actor_for_sid(sid) or sid in lobby_players or matchmaker.is_waiting(sid) or shows.is_joined(sid):
+        emit('error_message', {'message': 'Leave your current game or queue before registering.'})
+        return
+    error = tournaments.register(data.get('tournament_id'), sid, username)
+    if error:
+        emit('error_message', {'message': error})
+
+@socketio.on('tournament_leave')
+@profiler.timed('tournament_leave')
+def on_tournament_leave(data=None):
+    tournaments.withdraw(request.sid)
+
+@socketio.on('show_join')
+@profiler.timed('show_join')
+@admission.guard('show_join', priority=NORMAL)
+def on_show_join(data):
+    sid = request.sid
+    data = data or {}
+    username = (data.get('username') or f'Player_{sid[:4]}').strip()
+    if _actor_for_sid(sid) or sid in lobby_players or matchmaker.is_waiting(sid) or tournaments.is_registered(sid):
+        emit('error_message', {'message': 'Leave your current game or queue before joining a show.'})
+        return
+    error = shows.join(data.get('show_id'), sid, username)
+    if error:
+        emit('error_message', {'message': error})
+
+@socketio.on('show_leave')
+@profiler.timed('show_leave')
+def on_show_leave(data=None):
+    shows.leave(request.sid)
+
+def _intercept_show_answers(server):
+    """
+    Take `show_answer` events where the Socket.IO server dispatches them, before it starts a
+    thread for the event. The answer is stamped on arrival, admitted, and queued for the
+    show's answer workers, so a burst of answers neither spawns a thread each nor has its
+    queueing time counted against the players. Every other event is dispatched as usual.
+    """
+    dispatch = server._handle_event
+
+    def _handle_event(eio_sid, namespace, id, data):
+        if not data or data[0] != 'show_answer':
+            return dispatch(eio_sid, namespace, id, data)
+        received_at = time.monotonic()
+        namespace = namespace or DEFAULT_NAMESPACE
+        sid = server.manager.sid_from_eio_sid(eio_sid, namespace)
+        if sid is None or not server.manager.is_connected(sid, namespace):
+            return
+        with profiler.track('show_answer'):
+            ip = (server.environ.get(eio_sid) or {}).get('REMOTE_ADDR')
+            reason = admission.admit('show_answer', sid, ip, CRITICAL)
+            if reason is not None:
+                log.debug("Rejected show_answer (%s)", reason, extra={'sid': sid, 'event': 'show_answer'})
+                return
+            payload = data[1] if len(data) > 1 else None
+            error = shows.submit(sid, payload.get('answer') if isinstance(payload, dict) else None, received_at)
+            if error:
+                outbound.emit('error_message', {'message': error}, room=sid, namespace=namespace)
+
+    server._handle_event = _handle_event
+
+_intercept_show_answers(socketio.server)
+
+@socketio.on('latency_pong')
+@profiler.timed('latency_pong')
+def handle_latency_pong(data):
+    if isinstance(data, dict):
+        latency.record_pong(request.sid, data.get('seq'))
 
 @socketio.on('submit_answer')
+@profiler.timed('submit_answer')
+@admission.guard('submit_answer', priority=CRITICAL)
 def handle_answer(data):
-    global current_game
+    received_at=time.monotonic()
     sid=request.sid
-    if not current_game or sid not in current_game['players']: emit('error_message',{'message':'Not in game.'});return
-    p=current_game['players'][sid]
-    if p['is_bot'] or p.get('answered_this_round'): emit('error_message',{'message':'Invalid/Already answered.'});return
-    ans=data.get('answer'); q_d=current_game['questions'][current_game['current_question_index']]
-    t_t=time.time()-current_game['question_start_time']; is_c=(ans==q_d['correct_answer'])
-    pts=0
-    if is_c: pts=calculate_points(t_t)
-    if is_c and p.get('used_double_score_this_round'): pts*=2; p['used_double_score_this_round']=False
-    p['answered_this_round']=True; p['current_answer_correct']=is_c; p['potential_points_this_round']=pts
-    emit('answer_receipt',{'message':'Answer received.'})
-    all_h_ans=True
-    for h_sid in current_game['human_player_sids']:
-        if h_sid in current_game['players'] and not current_game['players'][h_sid].get('answered_this_round'): all_h_ans=False;break
-    if all_h_ans and current_game.get('question_timer'):
-        current_game['question_timer'].cancel();current_game['question_timer']=None
-        reveal_answers_and_scores()
+    actor=_actor_for_sid(sid)
+    if not actor: emit('error_message',{'message':'Not in game.'});return
+    actor.tell('answer', sid=sid, answer=data.get('answer'), received_at=received_at)
 
 @socketio.on('use_help')
+@profiler.timed('use_help')
+@admission.guard('use_help', priority=NORMAL)
 def handle_use_help(data):
-    global current_game
     sid=request.sid
-    if not current_game or sid not in current_game['players']:
+    actor=_actor_for_sid(sid)
+    if not actor:
         emit('error_message',{'message':'Not in game.'}); return
-
-    player_obj = current_game['players'][sid] # Use a clearer variable name like player_obj or p
-    help_type_requested = data.get('type')
-
-    if player_obj['is_bot'] or not player_obj['helps'].get(help_type_requested):
-        emit('error_message',{'message':f"Cannot use help: {help_type_requested}."}); return
-
-    player_obj['helps'][help_type_requested] = False # Mark help as used
-    current_question = current_game['questions'][current_game['current_question_index']]
-
-    response_payload = {'type': help_type_requested, 'helps_remaining': player_obj['helps']} # Initialize with common fields
-
-    if help_type_requested == 'fifty_fifty':
-        correct_ans = current_question['correct_answer']
-        incorrect_opts = [opt for opt in current_question['options'] if opt != correct_ans]
-
-        # Ensure there's at least one incorrect option to choose from for the 50/50
-        if incorrect_opts:
-            chosen_incorrect = random.choice(incorrect_opts)
-            options_for_5050 = [correct_ans, chosen_incorrect]
-        else:
-            # Fallback: should not happen with 3 wrong answers, but as a safeguard
-            options_for_5050 = [correct_ans, current_question['options'][0] if current_question['options'][0] != correct_ans else current_question['options'][1]]
-
-        random.shuffle(options_for_5050)
-        response_payload['options'] = options_for_5050
-        print(f"DEBUG: 50/50 help for {player_obj['username']}. Options sent: {response_payload['options']}")
-
-    elif help_type_requested == 'call_friend':
-        response_payload['advice'] = get_llm_advice(current_question['question'], current_question['options'])
-        print(f"DEBUG: Call a friend help for {player_obj['username']}. Advice: {response_payload['advice']}")
-
-    elif help_type_requested == 'double_score':
-        player_obj['used_double_score_this_round'] = True # Flag for server-side score calculation
-        response_payload['message'] = 'Score for this question will be doubled if correct!' # <<< MOVED INSIDE
-        print(f"DEBUG: Double score help activated for {player_obj['username']}.")
-
-    emit('help_result', response_payload) # To single user (the requester)
-
-    # Notify other players that a help was used (without revealing specifics like 50/50 options)
-    socketio.emit('player_used_help', {
-        'username': player_obj['username'],
-        'help_type': help_type_requested.replace('_',' ').title()
-    }, room=current_game['room_name'], skip_sid=sid, namespace=DEFAULT_NAMESPACE)
+    actor.tell('help', sid=sid, help_type=data.get('type'))
 
 @socketio.on('send_chat_message')
+@profiler.timed('send_chat_message')
+@admission.guard('send_chat_message', priority=LOW)
 def handle_chat_message(data):
-    global current_game
     sid=request.sid
-    if not current_game or sid not in current_game['players']: emit('error_message',{'message':'Chat only in game.'});return
-    p=current_game['players'][sid]; msg_txt=data.get('message','').strip(); msg_emoji=data.get('emoji')
+    actor=_actor_for_sid(sid)
+    if not actor: emit('error_message',{'message':'Chat only in game.'});return
+    msg_txt=data.get('message','').strip(); msg_emoji=data.get('emoji')
     if not msg_txt and not msg_emoji: return
-    chat_p={'sender_sid':sid,'sender_name':p['username'],'is_bot':p['is_bot']}
-    if msg_txt: chat_p['text']=msg_txt
-    if msg_emoji: chat_p['emoji']=msg_emoji
-    socketio.emit('new_chat_message',chat_p,room=current_game['room_name'], namespace=DEFAULT_NAMESPACE) # ADDED NAMESPACE
+    actor.tell('chat', sid=sid, text=msg_txt, emoji=msg_emoji)
 
 if __name__ == '__main__':
-    print("Starting Flask-SocketIO server (Single Game Model)...")
+    log.info("Starting Flask-SocketIO server...")
     get_gemini_model()
+    if config.QUESTION_BANK_WATCH:
+        QuestionBankWatcher().start()
+    if config.PROFILE_SIGNAL:
+        install_signal_toggle(profiler, config.PROFILE_SIGNAL)
+    recover_games()
     socketio.run(
         app,
         host=config.BACKEND_HOST,
@@ -1,12 +1,15 @@
 import random
 import uuid
-from threading import Timer as ThreadingTimer
 from . import config
 
 
-def schedule_bot_answer(current_game, bot_sid, question_data, calculate_points):
-    """Schedules (and stores) a bot's answer timer and data in current_game.
-    Returns the created timer.
+def schedule_bot_answer(current_game, bot_sid, question_data, schedule):
+    """Plans a bot's answer for the current round and schedules it.
+
+    The answer parameters are stored in current_game['bot_data_for_round'] so the
+    reveal can force the same decision if the bot has not answered yet.
+    `schedule(delay, bot_sid)` arranges for `answer_as_bot` to run after `delay`
+    seconds and returns a cancellable handle, which is also stored.
     """
     game_bot_difficulty_str = current_game.get('bot_difficulty', config.DEFAULT_BOT_DIFFICULTY)
     difficulty_params = config.BOT_DIFFICULTY_SETTINGS.get(
@@ -20,42 +23,6 @@ def schedule_bot_answer(current_game, bot_sid, question_data, calculate_points):
         max_delay = min_delay + 0.1
     answer_delay = random.uniform(min_delay, max_delay)
 
-    def bot_thinks_and_answers_internal(was_forced=False, forced_params_from_reveal=None):
-        if not current_game or current_game.get('game_state') != 'in_progress' or bot_sid not in current_game['players']:
-            return
-        bot_player_current_data = current_game['players'][bot_sid]
-        if bot_player_current_data.get('is_eliminated'):
-            return
-        if bot_player_current_data.get('answered_this_round') and not was_forced:
-            return
-
-        current_target_accuracy_for_roll = (
-            forced_params_from_reveal['accuracy'] if was_forced and forced_params_from_reveal else target_bot_accuracy
-        )
-        current_question_data_for_decision = (
-            forced_params_from_reveal['question_data'] if was_forced and forced_params_from_reveal else question_data
-        )
-        delay_for_points_calculation = (
-            forced_params_from_reveal['delay_for_points'] if was_forced and forced_params_from_reveal else answer_delay
-        )
-
-        is_correct_this_time = random.random() < current_target_accuracy_for_roll
-        chosen_answer = (
-            current_question_data_for_decision['correct_answer']
-            if is_correct_this_time
-            else random.choice(
-                [opt for opt in current_question_data_for_decision['options'] if opt != current_question_data_for_decision['correct_answer']]
-            )
-            if current_question_data_for_decision['options']
-            else None
-        )
-
-        current_game['players'][bot_sid]['answered_this_round'] = True
-        current_game['players'][bot_sid]['current_answer_correct'] = is_correct_this_time
-        current_game['players'][bot_sid]['potential_points_this_round'] = (
-            calculate_points(delay_for_points_calculation) if is_correct_this_time else 0
-        )
-
     # Store per-round data for possible forcing
     current_game.setdefault('bot_data_for_round', {})[bot_sid] = {
         'force_params': {
@@ -63,20 +30,46 @@ def schedule_bot_answer(current_game, bot_sid, question_data, calculate_points):
             'question_data': question_data,
             'delay_for_points': answer_delay,
         },
-        'timer_function_ref': bot_thinks_and_answers_internal,
     }
 
     # Timer management
     current_game.setdefault('bot_answer_timers', {})
-    if bot_sid in current_game['bot_answer_timers'] and current_game['bot_answer_timers'][bot_sid].is_alive():
+    if bot_sid in current_game['bot_answer_timers']:
         current_game['bot_answer_timers'][bot_sid].cancel()
 
-    timer = ThreadingTimer(answer_delay, bot_thinks_and_answers_internal, kwargs={'was_forced': False, 'forced_params_from_reveal': None})
+    timer = schedule(answer_delay, bot_sid)
     current_game['bot_answer_timers'][bot_sid] = timer
-    timer.start()
     return timer
 
 
+def answer_as_bot(current_game, bot_sid, calculate_points, was_forced=False):
+    """Makes the bot's decision for this round using the parameters stored by schedule_bot_answer."""
+    if not current_game or current_game.get('game_state') != 'in_progress' or bot_sid not in current_game['players']:
+        return
+    bot_player_current_data = current_game['players'][bot_sid]
+    if bot_player_current_data.get('is_eliminated'):
+        return
+    if bot_player_current_data.get('answered_this_round') and not was_forced:
+        return
+    stored_record = current_game.get('bot_data_for_round', {}).get(bot_sid)
+    if not stored_record:
+        return
+    params = stored_record['force_params']
+
+    is_correct_this_time = random.random() < params['accuracy']
+    question_data = params['question_data']
+    # answers[0] is the correct one; the display order does not matter to a bot
+    answers = question_data.record.answers
+    chosen_answer = answers[0] if is_correct_this_time else random.choice(answers[1:]) if len(answers) > 1 else None
+
+    bot_player_current_data['answered_this_round'] = True
+    bot_player_current_data['current_answer_correct'] = is_correct_this_time
+    bot_player_current_data['potential_points_this_round'] = (
+        calculate_points(params['delay_for_points']) if is_correct_this_time else 0
+    )
+    return chosen_answer
+
+
 def create_bots(num_bots_to_add_final, bot_names_list):
     bots = {}
     available_bot_names = (
@@ -97,4 +90,3 @@ def create_bots(num_bots_to_add_final, bot_names_list):
             'place': 0,
         }
     return bots
-
@@ -0,0 +1,85 @@
+import re
+from typing import Dict, List, Iterable
+
+# Topic categories players can pick. 'general' holds questions no rule matched.
+CATEGORIES = (
+    'geography', 'history', 'science', 'nature', 'arts_literature',
+    'entertainment', 'sports', 'food_drink', 'math', 'general',
+)
+CATEGORY_SEPARATOR = '|'
+MAX_CATEGORIES_PER_QUESTION = 2
+
+# Keyword heuristics, matched on whole words against the question and its correct answer
+_KEYWORDS: Dict[str, Iterable[str]] = {
+    'geography': (
+        'capital', 'country', 'countries', 'continent', 'continents', 'ocean', 'river', 'mountain', 'desert',
+        'island', 'city', 'largest lake', 'border', 'populous', 'population', 'currency', 'flag', 'located',
+        'equator', 'hemisphere', 'volcano', 'sea', 'strait', 'peninsula', 'rising sun', 'spoken',
+    ),
+    'history': (
+        'war', 'president', 'king', 'queen', 'emperor', 'empire', 'revolution', 'ancient', 'century',
+        'in what year', 'in which year', 'dynasty', 'treaty', 'battle', 'pharaoh', 'independence',
+        'first person', 'assassinated', 'civilization', 'medieval', 'colony', 'explorer',
+    ),
+    'science': (
+        'chemical', 'element', 'atomic', 'symbol for', 'planet', 'gas', 'atmosphere', 'physics', 'scientist',
+        'theory', 'relativity', 'discovered', 'invented', 'molecule', 'cell', 'dna', 'organ', 'body',
+        'bone', 'blood', 'freezing point', 'boiling point', 'speed of light', 'gravity', 'solar system',
+        'moon', 'sun', 'star', 'galaxy', 'energy', 'electric', 'penicillin', 'vitamin', 'hardest', 'substance',
+    ),
+    'nature': (
+        'animal', 'animals', 'bird', 'fish', 'mammal', 'reptile', 'insect', 'plant', 'plants', 'tree',
+        'flower', 'species', 'jungle', 'dragon', 'whale', 'shark', 'lion', 'forest', 'habitat',
+    ),
+    'arts_literature': (
+        'painted', 'painter', 'painting', 'artist', 'wrote', 'author', 'novel', 'poem', 'poet', 'play',
+        'sculpture', 'museum', 'mona lisa', 'sistine', 'shakespeare', 'hamlet', 'literature', 'book',
+        'mythology', 'composer', 'symphony', 'art of', 'origami',
+    ),
+    'entertainment': (
+        'movie', 'film', 'actor', 'actress', 'character', 'tv', 'television', 'series', 'band', 'song',
+        'singer', 'album', 'cartoon', 'video game', 'disney', 'oscar', 'hollywood', 'superhero',
+    ),
+    'sports': (
+        'sport', 'sports', 'team', 'olympic', 'olympics', 'football', 'soccer', 'basketball', 'baseball',
+        'tennis', 'golf', 'cricket', 'wimbledon', 'world cup', 'championship', 'medal', 'athlete', 'marathon',
+    ),
+    'food_drink': (
+        'food', 'dish', 'ingredient', 'cuisine', 'fruit', 'vegetable', 'cheese', 'wine', 'beer', 'drink',
+        'guacamole', 'sushi', 'pasta', 'bread', 'spice', 'coffee', 'tea', 'chocolate',
+    ),
+    'math': (
+        'square root', 'prime number', 'sides', 'triangle', 'hexagon', 'angle', 'equation',
+        'sum', 'multiply', 'divided', 'percent', 'pi', 'geometry', 'squared', 'roman numeral',
+    ),
+}
+_PATTERNS = {
+    category: re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) + r')\b')
+    for category, keywords in _KEYWORDS.items()
+}
+
+
+def classify(question: str, answer: str = '') -> List[str]:
+    """Best-matching categories for a question (most keyword hits first), or ['general']."""
+    text = f"{question} {answer}".lower()
+    hits = []
+    for category, pattern in _PATTERNS.items():
+        count = len(pattern.findall(text))
+        if count:
+            hits.append((count, category))
+    if not hits:
+        return ['general']
+    hits.sort(key=lambda h: -h[0])
+    return [category for _, category in hits[:MAX_CATEGORIES_PER_QUESTION]]
+
+
+def parse_categories(value: str) -> List[str]:
+    """'science|nature' -> ['science', 'nature'], dropping unknown names."""
+    return [c for c in (part.strip().lower() for part in str(value).split(CATEGORY_SEPARATOR)) if c in CATEGORIES]
+
+
+def normalize_topics(topics) -> List[str]:
+    """Validated, de-duplicated topic list from a client request ([] means no filter)."""
+    if not isinstance(topics, (list, tuple)):
+        return []
+    return sorted({t.strip().lower() for t in topics if isinstance(t, str) and t.strip().lower() in CATEGORIES})
@@ -19,8 +19,17 @@ BACKEND_PORT = int(os.getenv('BACKEND_PORT', '5001'))
 DEBUG = os.getenv('DEBUG', 'true').lower() in ('1', 'true', 'yes', 'y')
 ALLOW_UNSAFE_WERKZEUG = os.getenv('ALLOW_UNSAFE_WERKZEUG', 'true').lower() in ('1', 'true', 'yes', 'y')
 
+# Logging
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')  # Per-module overrides, e.g. "backend.game=DEBUG,backend.app=WARNING"
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()  # text or json
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.05'))  # Fraction of per-round debug records kept
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # Records buffered before new ones are dropped
+
 # Game configuration
 LOBBY_WAIT_TIME = int(os.getenv('LOBBY_WAIT_TIME', '30'))
+LOBBY_MAX_PLAYERS_CLASSIC = int(os.getenv('LOBBY_MAX_PLAYERS_CLASSIC', '10'))  # Players per lobby; a full lobby opens the next one
+LOBBY_MAX_PLAYERS_BATTLE_ROYALE = int(os.getenv('LOBBY_MAX_PLAYERS_BATTLE_ROYALE', '50'))
 QUESTIONS_PER_GAME = int(os.getenv('QUESTIONS_PER_GAME', '10'))
 QUESTION_DURATION = int(os.getenv('QUESTION_DURATION', '20'))
 POINTS_BASE = int(os.getenv('POINTS_BASE', '1000'))
@@ -29,13 +38,117 @@ MAX_BOTS = int(os.getenv('MAX_BOTS', '9'))
 BR_MIN_TOTAL_ENTITIES = int(os.getenv('BR_MIN_TOTAL_ENTITIES', '3'))  # Min total players for BR
 BR_DIFFICULTY_STEP_QUESTIONS = int(os.getenv('BR_DIFFICULTY_STEP_QUESTIONS', '5'))  # Increase difficulty every N questions in BR
 BR_INITIAL_QUESTIONS_BATCH = int(os.getenv('BR_INITIAL_QUESTIONS_BATCH', '30'))  # Initial question batch for BR
+GAME_START_DELAY = float(os.getenv('GAME_START_DELAY', '2'))  # Seconds between game_starting and the first question
+RESULTS_DISPLAY_TIME = float(os.getenv('RESULTS_DISPLAY_TIME', '5'))  # Seconds the round results are shown
+INTERMISSION_TIME = float(os.getenv('INTERMISSION_TIME', '2'))  # Seconds between results and the next question
+BR_END_DELAY = float(os.getenv('BR_END_DELAY', '3'))  # Seconds between the final BR results and game_over
+SESSION_GRACE_PERIOD = float(os.getenv('SESSION_GRACE_PERIOD', '60'))  # Seconds a disconnected player's slot is held for resume
+SPECTATOR_UPDATE_INTERVAL = float(os.getenv('SPECTATOR_UPDATE_INTERVAL', '1'))  # Min seconds between spectator_update emits per game
+SPECTATOR_TOP_K = int(os.getenv('SPECTATOR_TOP_K', '10'))  # Standings rows sent to spectators
 
 # Files (default to backend directory)
 BOT_NAMES_FILE = os.getenv('BOT_NAMES_FILE') or os.path.join(BASE_DIR, 'bot_names.txt')
 QUESTIONS_CSV_FILE = os.getenv('QUESTIONS_CSV_FILE') or os.path.join(BASE_DIR, 'trivia_questions_filtered.csv')
 
+# Question bank loading / hot reload
+QUESTION_BANK_CHUNK_SIZE = int(os.getenv('QUESTION_BANK_CHUNK_SIZE', '50000'))  # Rows per CSV chunk while streaming
+QUESTION_BANK_WATCH = os.getenv('QUESTION_BANK_WATCH', 'false').lower() in ('1', 'true', 'yes', 'y')
+QUESTION_BANK_WATCH_INTERVAL = float(os.getenv('QUESTION_BANK_WATCH_INTERVAL', '5'))  # Seconds between file polls
+
+# Per-client outbound queues (backpressure)
+OUTBOUND_MAX_EVENTS = int(os.getenv('OUTBOUND_MAX_EVENTS', '200'))  # Held events per client before non-critical ones are dropped
+OUTBOUND_MAX_BYTES = int(os.getenv('OUTBOUND_MAX_BYTES', str(256 * 1024)))  # Held bytes per client
+OUTBOUND_TRANSPORT_HIGH_WATER = int(os.getenv('OUTBOUND_TRANSPORT_HIGH_WATER', '64'))  # Engine.IO packets pending before a client counts as slow
+OUTBOUND_OVERFLOW_GRACE = float(os.getenv('OUTBOUND_OVERFLOW_GRACE', '10'))  # Seconds over the limit before disconnecting
+OUTBOUND_DRAIN_INTERVAL = float(os.getenv('OUTBOUND_DRAIN_INTERVAL', '0.25'))
+
+# Game workers (each game is an actor pinned to one worker thread)
+GAME_WORKER_THREADS = int(os.getenv('GAME_WORKER_THREADS', '1'))
+HINT_WORKERS = int(os.getenv('HINT_WORKERS', '4'))  # Threads for call-a-friend LLM requests
+
+# Latency measurement / answer-time compensation
+LATENCY_PING_INTERVAL = float(os.getenv('LATENCY_PING_INTERVAL', '5'))  # Seconds between RTT pings
+LATENCY_MAX_COMPENSATION = float(os.getenv('LATENCY_MAX_COMPENSATION', '0.5'))  # Max one-way delay credited per leg (seconds)
+
+# Matchmaking ('countdown' = first-come lobbies, 'matchmaking' = skill-rated buckets)
+LOBBY_STRATEGY = os.getenv('LOBBY_STRATEGY', 'countdown').lower()
+MATCH_SIZE_CLASSIC = int(os.getenv('MATCH_SIZE_CLASSIC', '4'))  # Humans per classic match once a bucket fills
+MATCH_SIZE_BATTLE_ROYALE = int(os.getenv('MATCH_SIZE_BATTLE_ROYALE', '10'))
+MATCH_MAX_WAIT = float(os.getenv('MATCH_MAX_WAIT', str(LOBBY_WAIT_TIME)))  # Seconds before a partial bucket starts with bots
+RATING_BAND_WIDTH = float(os.getenv('RATING_BAND_WIDTH', '200'))
+RATING_INITIAL = float(os.getenv('RATING_INITIAL', '1200'))
+RATING_K_FACTOR = float(os.getenv('RATING_K_FACTOR', '32'))
+RATINGS_FILE = os.getenv('RATINGS_FILE', '')  # Empty keeps ratings in memory only
+RATINGS_SAVE_INTERVAL = float(os.getenv('RATINGS_SAVE_INTERVAL', '5'))  # Seconds between ratings file writes (only when changed)
+BOT_RATINGS = {'easy': 1000.0, 'advanced': 1300.0, 'expert': 1600.0}
+
+# Tournaments (created through the admin API)
+TOURNAMENT_MATCH_SIZE = int(os.getenv('TOURNAMENT_MATCH_SIZE', '8'))  # Default players per match
+TOURNAMENT_ADVANCE = int(os.getenv('TOURNAMENT_ADVANCE', '2'))  # Default humans going through from each match
+TOURNAMENT_STAGGER_INTERVAL = float(os.getenv('TOURNAMENT_STAGGER_INTERVAL', '2'))  # Seconds between match starts
+TOURNAMENT_MAX_CONCURRENT_MATCHES = int(os.getenv('TOURNAMENT_MAX_CONCURRENT_MATCHES', '0'))  # 0 = no cap
+TOURNAMENT_ROUND_BREAK = float(os.getenv('TOURNAMENT_ROUND_BREAK', '15'))  # Seconds between a round ending and the next starting
+
+# Live shows: one question at a time broadcast to every player of the show
+SHOW_QUESTIONS = int(os.getenv('SHOW_QUESTIONS', '12'))
+SHOW_QUESTION_DURATION = float(os.getenv('SHOW_QUESTION_DURATION', '10'))
+SHOW_RESULTS_TIME = float(os.getenv('SHOW_RESULTS_TIME', '5'))  # Seconds between a reveal and the next question
+SHOW_TALLY_INTERVAL = float(os.getenv('SHOW_TALLY_INTERVAL', '0.25'))  # Seconds between live answer-count broadcasts
+SHOW_ELIMINATION = os.getenv('SHOW_ELIMINATION', 'true').lower() in ('1', 'true', 'yes', 'y')  # A wrong or missing answer knocks a player out
+SHOW_WINNERS_LISTED = int(os.getenv('SHOW_WINNERS_LISTED', '100'))  # Winners named in show_over
+SHOW_FINISHED_KEPT = int(os.getenv('SHOW_FINISHED_KEPT', '20'))  # Finished shows still listed (summary and winners only)
+SHOW_INTAKE_WORKERS = int(os.getenv('SHOW_INTAKE_WORKERS', '4'))  # Threads writing show answers; each owns a share of the player slots
+SHOW_INTAKE_CAPACITY = int(os.getenv('SHOW_INTAKE_CAPACITY', '100000'))  # Show answers queued before new ones are refused as busy
+SHOW_DEFAULT_LEAD = float(os.getenv('SHOW_DEFAULT_LEAD', '300'))  # Seconds until a new show starts, unless the admin says otherwise
+
+# Profiling
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.01'))  # Seconds between stack samples while sampling is on
+SLOW_CALL_THRESHOLD = float(os.getenv('SLOW_CALL_THRESHOLD', '0.25'))  # Handlers/actor commands slower than this are recorded with their stack
+SLOW_CALL_HISTORY = int(os.getenv('SLOW_CALL_HISTORY', '100'))
+PROFILE_SIGNAL = os.getenv('PROFILE_SIGNAL', 'SIGUSR2')  # Toggles global sampling; empty disables
+
+# Game journal / crash recovery (disabled unless a directory is set)
+JOURNAL_DIR = os.getenv('JOURNAL_DIR', '')
+JOURNAL_FSYNC_INTERVAL = float(os.getenv('JOURNAL_FSYNC_INTERVAL', '0.2'))  # Seconds between batched fsyncs
+JOURNAL_SNAPSHOT_EVERY = int(os.getenv('JOURNAL_SNAPSHOT_EVERY', '5'))  # Rounds between state snapshots
+JOURNAL_RECOVERY_DELAY = float(os.getenv('JOURNAL_RECOVERY_DELAY', '10'))  # Seconds for clients to reconnect before a recovered game resumes
+
+# Round / answer analytics (disabled unless a directory is set)
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR', '')
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', '30'))  # Seconds between file writes
+ANALYTICS_MAX_BUFFER_ROWS = int(os.getenv('ANALYTICS_MAX_BUFFER_ROWS', '50000'))  # Answer rows held before an early flush
+ANALYTICS_COMPRESSION = os.getenv('ANALYTICS_COMPRESSION', 'zstd')  # Parquet codec (ignored for the .npz fallback)
+
+# Leak diagnostics: check that finished games, their timers and threads are released
+LEAK_DIAGNOSTICS = os.getenv('LEAK_DIAGNOSTICS', 'false').lower() in ('1', 'true', 'yes', 'y')
+LEAK_CHECK_GRACE = float(os.getenv('LEAK_CHECK_GRACE', '30'))  # Seconds after a game ends before it must be collectable
+LEAK_CHECK_INTERVAL = float(os.getenv('LEAK_CHECK_INTERVAL', '60'))
+LEAK_TRACEMALLOC_FRAMES = int(os.getenv('LEAK_TRACEMALLOC_FRAMES', '0'))  # >0 also traces allocations (slows the server down)
+LEAK_SNAPSHOT_EVERY = int(os.getenv('LEAK_SNAPSHOT_EVERY', '100'))  # Finished games between allocation snapshots
+
+# Admission control: per-event token buckets (rate per second, burst) per sid; per-IP buckets get ADMISSION_IP_MULTIPLIER times both
+ADMISSION_LIMITS = {
+    'join_lobby_request': (float(os.getenv('RATE_JOIN_LOBBY', '0.5')), float(os.getenv('BURST_JOIN_LOBBY', '3'))),
+    'submit_answer': (float(os.getenv('RATE_SUBMIT_ANSWER', '2')), float(os.getenv('BURST_SUBMIT_ANSWER', '5'))),
+    'use_help': (float(os.getenv('RATE_USE_HELP', '1')), float(os.getenv('BURST_USE_HELP', '3'))),
+    'send_chat_message': (float(os.getenv('RATE_CHAT', '1')), float(os.getenv('BURST_CHAT', '5'))),
+    'spectate_request': (float(os.getenv('RATE_SPECTATE', '0.5')), float(os.getenv('BURST_SPECTATE', '3'))),
+    'tournament_register': (float(os.getenv('RATE_TOURNAMENT_REGISTER', '0.5')), float(os.getenv('BURST_TOURNAMENT_REGISTER', '3'))),
+    'show_join': (float(os.getenv('RATE_SHOW_JOIN', '0.5')), float(os.getenv('BURST_SHOW_JOIN', '3'))),
+    'show_answer': (float(os.getenv('RATE_SHOW_ANSWER', '2')), float(os.getenv('BURST_SHOW_ANSWER', '5'))),
+}
+ADMISSION_IP_MULTIPLIER = float(os.getenv('ADMISSION_IP_MULTIPLIER', '10'))  # Players sharing one address (NAT, venue Wi-Fi)
+OVERLOAD_HANDLER_LATENCY = float(os.getenv('OVERLOAD_HANDLER_LATENCY', '0.1'))  # Smoothed handler seconds that count as overload
+OVERLOAD_QUEUE_DEPTH = int(os.getenv('OVERLOAD_QUEUE_DEPTH', '500'))  # Queued game-worker messages that count as overload
+OVERLOAD_CHECK_INTERVAL = float(os.getenv('OVERLOAD_CHECK_INTERVAL', '0.5'))
+
+# Admin endpoints (disabled unless a token is set)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
 # LLM / Gemini
 LLM_MODEL_TO_USE = os.getenv('LLM_MODEL_TO_USE', 'gemini-1.5-flash-latest')
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT', '')  # e.g. http://127.0.0.1:8765 for the local stand-in (backend/fake_gemini.py)
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '10'))  # Seconds before a hint request is abandoned
 
 # Bot behavior
 DEFAULT_BOT_DIFFICULTY = os.getenv('DEFAULT_BOT_DIFFICULTY', 'easy')
@@ -0,0 +1,239 @@
+import gc
+import re
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter, deque
+from typing import Dict, Any, Callable, List, Optional
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+_THREAD_NUMBER = re.compile(r'[-_ ]?\(?\d+\)?$')  # "game-worker-3", "Thread-12 (_tick)" -> group by base name
+
+
+def thread_census() -> Counter:
+    """Live threads by base name; `threading.Timer`s are counted under 'Timer'."""
+    counts = Counter()
+    for t in threading.enumerate():
+        if isinstance(t, threading.Timer):
+            counts['Timer'] += 1
+        else:
+            counts[_THREAD_NUMBER.sub('', t.name.split(' (')[0]) or t.name] += 1
+    return counts
+
+
+class LeakDetector:
+    """
+    Checks that finished games are actually released.
+
+    Every game's actor, PlayerTable and GameQuestions are tracked through weak
+    references from `track_game` on. Once a game has been finished for `grace`
+    seconds (long enough for in-flight hint replies and queued messages to drain),
+    `check` runs a full collection: if any of them is still alive the game counts as
+    leaked and the types holding on to it are recorded. It also reports:
+      - threads by name against the census taken at `start` (any threading.Timer
+        shows up as 'Timer'),
+      - worker timers still queued for finished actors (`orphaned_timers()`),
+      - with `tracemalloc_frames` > 0, traced memory and the allocation sites that
+        grew most since the baseline snapshot, re-taken every `snapshot_every`
+        finished games (taken by the next `check`).
+
+    `assert_clean` is the strict form for soak tests: it raises AssertionError if any
+    finished game, worker timer or extra thread is left over.
+    """
+
+    def __init__(
+        self,
+        *,
+        grace: float,
+        worker_stats: Optional[Callable[[], List[Dict[str, Any]]]] = None,
+        orphaned_timers: Optional[Callable[[], int]] = None,
+        tracemalloc_frames: int = 0,
+        snapshot_every: int = 100,
+        history: int = 50,
+    ) -> None:
+        self.grace = grace
+        self.worker_stats = worker_stats
+        self.orphaned_timers = orphaned_timers
+        self.tracemalloc_frames = tracemalloc_frames
+        self.snapshot_every = max(1, snapshot_every)
+        self.lock = threading.Lock()
+        self._games: Dict[str, Dict[str, Any]] = {}  # game_id -> {'refs', 'started', 'finished'}
+        self._leaks = deque(maxlen=history)
+        self._baseline_threads: Counter = Counter()
+        self._baseline_snapshot = None
+        self._growth: List[Dict[str, Any]] = []
+        self._snapshot_due = False
+        self._checker_started = False
+        self.games_tracked = 0
+        self.games_finished = 0
+        self.games_released = 0
+        self.games_leaked = 0
+        self.checks = 0
+
+    def start(self) -> None:
+        if self.tracemalloc_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        self.reset_baseline()
+        log.info("Leak diagnostics on (grace %ss, tracemalloc %s)", self.grace,
+                 f"{self.tracemalloc_frames} frames" if tracemalloc.is_tracing() else 'off')
+
+    def reset_baseline(self) -> None:
+        """Take the thread census and allocation snapshot later growth is measured against (e.g. after warm-up)."""
+        self._baseline_threads = thread_census()
+        if tracemalloc.is_tracing():
+            self._baseline_snapshot = self._snapshot()
+        with self.lock:
+            self._growth = []
+
+    def start_checker(self, socketio, interval: float) -> None:
+        with self.lock:
+            if self._checker_started:
+                return
+            self._checker_started = True
+
+        def _loop():
+            while True:
+                socketio.sleep(interval)
+                try:
+                    self.check()
+                except Exception:
+                    log.exception("Leak check failed")
+
+        socketio.start_background_task(_loop)
+
+    # ----- Game lifecycle -----
+
+    def track_game(self, actor) -> None:
+        game = actor.game
+        refs = [weakref.ref(actor)]
+        for key in ('players', 'questions'):
+            if game.get(key) is not None:
+                refs.append(weakref.ref(game[key]))
+        with self.lock:
+            self._games[actor.game_id] = {'refs': refs, 'started': time.monotonic(), 'finished': None}
+            self.games_tracked += 1
+
+    def game_finished(self, game_id: str) -> None:
+        with self.lock:
+            entry = self._games.get(game_id)
+            if entry is None or entry['finished'] is not None:
+                return
+            entry['finished'] = time.monotonic()
+            self.games_finished += 1
+            # Taken by the next check, not here: a snapshot can take seconds and this runs on a game worker
+            if self._baseline_snapshot is not None and self.games_finished % self.snapshot_every == 0:
+                self._snapshot_due = True
+
+    def check(self, *, grace: Optional[float] = None) -> Dict[str, int]:
+        """Classify games finished at least `grace` seconds ago (default: the configured grace) as released or leaked."""
+        grace = self.grace if grace is None else grace
+        if self._snapshot_due:
+            self._snapshot_due = False
+            self._record_growth()
+        now = time.monotonic()
+        with self.lock:
+            due = [(gid, e) for gid, e in self._games.items() if e['finished'] is not None and now - e['finished'] >= grace]
+        if not due:
+            return {'released': 0, 'leaked': 0}
+        gc.collect()
+        released = leaked = 0
+        for game_id, entry in due:
+            alive = [obj for obj in (ref() for ref in entry['refs']) if obj is not None]
+            if alive:
+                leaked += 1
+                leak = {
+                    'game_id': game_id,
+                    'finished_s_ago': round(now - entry['finished'], 1),
+                    'alive': [type(obj).__name__ for obj in alive],
+                    'held_by': self._referrers(alive),
+                }
+                self._leaks.append(leak)
+                log.warning("Finished game still referenced: %s", leak, extra={'game_id': game_id})
+            else:
+                released += 1
+            del alive
+        with self.lock:
+            for game_id, _ in due:
+                self._games.pop(game_id, None)
+            self.games_released += released
+            self.games_leaked += leaked
+            self.checks += 1
+        return {'released': released, 'leaked': leaked}
+
+    @staticmethod
+    def _referrers(objects: List[Any]) -> Dict[str, int]:
+        """Types of whatever still points at the leaked objects (besides each other and this frame)."""
+        ids = {id(o) for o in objects}
+        holders = Counter()
+        for obj in objects:
+            for ref in gc.get_referrers(obj):
+                if id(ref) in ids or ref is objects or type(ref).__name__ == 'frame':
+                    continue
+                holders[type(ref).__name__] += 1
+        return dict(holders)
+
+    # ----- Threads / memory -----
+
+    def thread_growth(self) -> Dict[str, int]:
+        now = thread_census()
+        return {name: now[name] - self._baseline_threads.get(name, 0)
+                for name in now if now[name] > self._baseline_threads.get(name, 0)}
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+
+    def _record_growth(self, top: int = 10) -> None:
+        snapshot = self._snapshot()
+        growth = [{'site': str(stat.traceback[0]), 'size_diff_kb': round(stat.size_diff / 1024, 1), 'count_diff': stat.count_diff}
+                  for stat in snapshot.compare_to(self._baseline_snapshot, 'lineno')[:top] if stat.size_diff > 0]
+        with self.lock:
+            self._growth = growth
+
+    # ----- Reporting -----
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            in_progress = sum(1 for e in self._games.values() if e['finished'] is None)
+            awaiting_check = len(self._games) - in_progress
+            result = {
+                'games': {'tracked': self.games_tracked, 'finished': self.games_finished, 'released': self.games_released,
+                          'leaked': self.games_leaked, 'in_progress': in_progress, 'awaiting_check': awaiting_check},
+                'recent_leaks': list(self._leaks),
+                'checks': self.checks,
+                'grace_s': self.grace,
+                'allocation_growth': list(self._growth),
+            }
+        result['threads'] = dict(thread_census())
+        result['thread_growth'] = self.thread_growth()
+        if self.worker_stats:
+            result['worker_timers'] = sum(w['timers'] for w in self.worker_stats())
+        if self.orphaned_timers:
+            result['orphaned_timers'] = self.orphaned_timers()
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            result['traced_memory_kb'] = {'current': current // 1024, 'peak': peak // 1024}
+        return result
+
+    def assert_clean(self, *, thread_slack: int = 0) -> None:
+        """Check every finished game now and fail if anything outlived the games it belonged to."""
+        self.check(grace=0)
+        problems = []
+        with self.lock:
+            if self.games_leaked:
+                problems.append(f"{self.games_leaked} finished game(s) still referenced: {list(self._leaks)[-3:]}")
+        orphaned = self.orphaned_timers() if self.orphaned_timers else 0
+        if orphaned:
+            problems.append(f"{orphaned} worker timer(s) queued for finished games")
+        growth = {name: n for name, n in self.thread_growth().items() if n > thread_slack}
+        if growth:
+            problems.append(f"threads above baseline: {growth}")
+        if problems:
+            raise AssertionError('; '.join(problems))
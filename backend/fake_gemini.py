@@ -0,0 +1,227 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+from .categories import CATEGORIES, CATEGORY_SEPARATOR
+from .log import get_logger
+
+log = get_logger(__name__)
+
+# Routes the Gemini REST API exposes for a model ("/v1beta/models/<model>:generateContent")
+_GENERATE_PATH = re.compile(r'^/v1(?:beta)?/models/(?P<model>[^:/]+):generateContent$')
+_QUESTION_HEADER = re.compile(r'^Question \d+:', re.MULTILINE)
+_NUMBERED_LINE = re.compile(r'^\d+\. ', re.MULTILINE)
+
+DEFAULT_BEHAVIOUR = {
+    'latency_ms': 400.0,      # Median response latency
+    'latency_sigma': 0.5,     # Log-normal spread around the median (0 = fixed latency)
+    'error_rate': 0.0,        # Share of requests answered with an HTTP error
+    'error_status': 503,      # Status used for those errors (429 to mimic rate limiting)
+    'block_rate': 0.0,        # Share answered with promptFeedback.blockReason and no candidates
+    'malformed_rate': 0.0,    # Share of batch prompts answered with the wrong line count or bad letters
+    'empty_rate': 0.0,        # Share answered with a candidate whose text is empty
+}
+
+_HINTS = (
+    "Think about where you'd most likely see this in everyday life.",
+    "One of these sounds right but is a classic mix-up - trust the less obvious pick.",
+    "Picture a map or a timeline; the answer sits closer than you'd expect.",
+    "If you've ever read the label on it, you already know this one.",
+)
+
+
+class FakeGemini:
+    """
+    Local stand-in for the Gemini `generateContent` REST endpoint.
+
+    Point the backend and the offline scripts at it with
+    GEMINI_API_ENDPOINT=http://127.0.0.1:<port>; the SDK then talks plain HTTP
+    to this server instead of Google. Responses are shaped like the real API and
+    follow the prompt: batch answer prompts get one letter per question,
+    categorization prompts one category line per question, anything else a
+    short hint. Latency, HTTP errors, safety blocks, empty replies and malformed
+    batch output are drawn per request from `behaviour`, which can be changed
+    while running (POST /config). GET /stats reports request and outcome counts.
+    """
+
+    def __init__(self, *, host: str = '127.0.0.1', port: int = 0, seed: Optional[int] = None, **behaviour) -> None:
+        unknown = set(behaviour) - set(DEFAULT_BEHAVIOUR)
+        if unknown:
+            raise ValueError(f"Unknown behaviour settings: {', '.join(sorted(unknown))}")
+        self.behaviour = dict(DEFAULT_BEHAVIOUR, **behaviour)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {'requests': 0, 'ok': 0, 'error': 0, 'blocked': 0, 'malformed': 0, 'empty': 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeGemini':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-gemini', daemon=True)
+        self._thread.start()
+        log.info("Fake Gemini listening on %s", self.endpoint)
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def configure(self, **behaviour) -> None:
+        unknown = set(behaviour) - set(DEFAULT_BEHAVIOUR)
+        if unknown:
+            raise ValueError(f"Unknown behaviour settings: {', '.join(sorted(unknown))}")
+        with self._lock:
+            self.behaviour.update({k: float(v) if k != 'error_status' else int(v) for k, v in behaviour.items()})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'endpoint': self.endpoint, 'behaviour': dict(self.behaviour), 'counts': dict(self.counts)}
+
+    # ----- Response generation -----
+
+    def _draw(self) -> Tuple[float, str]:
+        """Latency in seconds and the outcome for one request."""
+        with self._lock:
+            b = self.behaviour
+            rng = self._rng
+            latency = b['latency_ms'] / 1000.0
+            if b['latency_sigma'] > 0:
+                latency *= rng.lognormvariate(0.0, b['latency_sigma'])
+            roll = rng.random()
+            outcome = 'ok'
+            for name, key in (('error', 'error_rate'), ('blocked', 'block_rate'), ('empty', 'empty_rate')):
+                if roll < b[key]:
+                    outcome = name
+                    break
+                roll -= b[key]
+            if outcome == 'ok' and rng.random() < b['malformed_rate']:
+                outcome = 'malformed'
+            self.counts['requests'] += 1
+            return latency, outcome
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _reply_text(self, prompt: str, malformed: bool) -> Tuple[str, bool]:
+        """Text for a prompt; the flag is False when a malformed reply was asked for but the prompt is not a batch."""
+        rng = self._rng
+        questions = len(_QUESTION_HEADER.findall(prompt))
+        if questions:
+            letters = [rng.choice('ABCD') for _ in range(questions)]
+            if malformed:
+                if rng.random() < 0.5:
+                    letters = letters[:-1] if questions > 1 else letters + ['B']
+                else:
+                    letters[rng.randrange(questions)] = rng.choice(('The answer is C', 'Z', 'A or B'))
+            return '\n'.join(letters), malformed
+        if 'Classify each trivia question' in prompt:
+            count = len(_NUMBERED_LINE.findall(prompt))
+            lines = [CATEGORY_SEPARATOR.join(rng.sample(CATEGORIES[:-1], rng.choice((1, 2)))) for _ in range(count)]
+            if malformed and lines:
+                lines.pop()
+            return '\n'.join(lines), malformed
+        return rng.choice(_HINTS), False
+
+    def generate(self, body: Dict[str, Any]) -> Tuple[float, int, Dict[str, Any]]:
+        """(latency, status, JSON body) for one generateContent request."""
+        latency, outcome = self._draw()
+        if outcome == 'error':
+            status = int(self.behaviour['error_status'])
+            self._count('error')
+            return latency, status, {'error': {'code': status, 'message': 'Fake Gemini injected failure.',
+                                               'status': 'RESOURCE_EXHAUSTED' if status == 429 else 'UNAVAILABLE'}}
+        if outcome == 'blocked':
+            self._count('blocked')
+            return latency, 200, {'promptFeedback': {'blockReason': 'SAFETY', 'safetyRatings': [
+                {'category': 'HARM_CATEGORY_DANGEROUS_CONTENT', 'probability': 'HIGH'}]}}
+        prompt = '\n'.join(part.get('text', '') for content in body.get('contents', [])
+                           for part in content.get('parts', []))
+        if outcome == 'empty':
+            text = ''
+        else:
+            with self._lock:
+                text, malformed = self._reply_text(prompt, outcome == 'malformed')
+            outcome = 'malformed' if malformed else 'ok'
+        self._count(outcome)
+        return latency, 200, {
+            'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'},
+                            'finishReason': 'STOP', 'index': 0, 'safetyRatings': []}],
+            'promptFeedback': {'safetyRatings': []},
+            'usageMetadata': {'promptTokenCount': len(prompt.split()), 'candidatesTokenCount': len(text.split()),
+                              'totalTokenCount': len(prompt.split()) + len(text.split())},
+        }
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return {}
+
+            def do_GET(self):
+                if self.path.split('?')[0] == '/stats':
+                    return self._send(200, fake.stats())
+                self._send(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                if path == '/config':
+                    try:
+                        fake.configure(**self._body())
+                    except (TypeError, ValueError) as e:
+                        return self._send(400, {'error': str(e)})
+                    return self._send(200, fake.stats())
+                if not _GENERATE_PATH.match(path):
+                    return self._send(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+                latency, status, payload = fake.generate(self._body())
+                time.sleep(latency)
+                self._send(status, payload)
+
+            def log_message(self, fmt, *args):
+                log.debug("fake-gemini %s", fmt % args)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local Gemini stand-in for offline hint and filter benchmarks.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=None)
+    for key, default in DEFAULT_BEHAVIOUR.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=type(default), default=default)
+    args = vars(parser.parse_args())
+    host, port, seed = args.pop('host'), args.pop('port'), args.pop('seed')
+    server = FakeGemini(host=host, port=port, seed=seed, **args).start()
+    print(f"Fake Gemini on {server.endpoint}  (export GEMINI_API_ENDPOINT={server.endpoint})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,37 +1,42 @@
 import time
-from threading import Timer as ThreadingTimer
-from typing import Dict, Any, Callable
 
+import numpy as np
+from typing import Dict, Any, Callable, Optional
+
+from backend.bots import answer_as_bot
 from backend.constants import CLASSIC_MODE, BATTLE_ROYALE_MODE
+from backend.log import get_logger
+from backend.payloads import PreEncoded, cached_payload, drop_cached_payloads
+from backend.questions import RoundQuestion
+
+log = get_logger(__name__)
 
 
-def next_question(*, current_game: Dict[str, Any], socketio, namespace: str, config, get_random_questions: Callable, calculate_points: Callable, bot_action: Callable):
+def next_question(*, current_game: Dict[str, Any], socketio, namespace: str, config, get_random_questions: Callable, calculate_points: Callable, bot_action: Callable) -> Optional[RoundQuestion]:
+    """Serve the next question. Returns its data, or None if the game ended instead."""
     if not current_game or current_game.get('game_state') != 'in_progress':
-        print("next_question: No active game or game not in progress.")
-        return
+        log.debug("next_question: No active game or game not in progress.")
+        return None
 
     # --- Clear bot state from PREVIOUS question ---
     if 'bot_answer_timers' in current_game:
         for _, timer_obj_old in current_game['bot_answer_timers'].items():
-            if timer_obj_old.is_alive():
-                timer_obj_old.cancel()
+            timer_obj_old.cancel()
     current_game['bot_answer_timers'] = {}
     current_game['bot_data_for_round'] = {}
     # --- END Clear bot state ---
 
     # --- Battle Royale: Win condition check (BEFORE new question) ---
     if current_game['mode'] == BATTLE_ROYALE_MODE:
-        print(f"BR Next Q Check: Active players = {len(current_game['active_player_sids'])}, SIDs: {current_game['active_player_sids']}")
+        log.debug("BR next question check: %d active players", len(current_game['active_player_sids']),
+                  extra={'game_id': current_game['game_id'], 'event': 'br_check', 'sampled': True})
         if len(current_game['active_player_sids']) <= 1:
-            print("Battle Royale win condition met (<=1 active player). Ending game from next_question.")
+            log.info("Battle Royale win condition met (<=1 active player). Ending game from next_question.", extra={'game_id': current_game['game_id']})
             return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace)
 
     # --- Reset round-specific states for active players ---
-    sids_to_reset_for_round = current_game['active_player_sids'] if current_game['mode'] == BATTLE_ROYALE_MODE else current_game['players'].keys()
-    for player_sid in sids_to_reset_for_round:
-        if player_sid in current_game['players']:
-            current_game['players'][player_sid]['answered_this_round'] = False
-            current_game['players'][player_sid]['current_answer_correct'] = None
+    players = current_game['players']
+    players.reset_round(players.slots_for(current_game['active_player_sids']) if current_game['mode'] == BATTLE_ROYALE_MODE else players.live_slots())
 
     current_game['current_question_index'] += 1
 
@@ -43,18 +48,14 @@ def next_question(*, current_game: Dict[str, Any], socketio, namespace: str, con
         if current_game['questions_at_current_difficulty_streak'] >= config.BR_DIFFICULTY_STEP_QUESTIONS:
             target_difficulty_for_this_round = min(10, current_game['adaptive_difficulty'] + 1)
             current_game['questions_at_current_difficulty_streak'] = 0
-            print(f"BR Difficulty Increased! New target level: {target_difficulty_for_this_round}")
+            log.info("BR difficulty increased to %d", target_difficulty_for_this_round, extra={'game_id': current_game['game_id']})
         current_game['adaptive_difficulty'] = target_difficulty_for_this_round
 
     elif current_game['mode'] == CLASSIC_MODE:
         if current_game['current_question_index'] > 0:
-            correct_human_answers, total_human_answers_this_round = 0, 0
-            for sid in current_game['human_player_sids']:
-                player = current_game['players'].get(sid)
-                if player and player.get('answered_last_round_correctly') is not None:
-                    total_human_answers_this_round += 1
-                    if player.get('answered_last_round_correctly'):
-                        correct_human_answers += 1
+            last_correct = players.last_correct[players.slots_for(current_game['human_player_sids'])]
+            total_human_answers_this_round = int(np.count_nonzero(last_correct != -1))
+            correct_human_answers = int(np.count_nonzero(last_correct == 1))
             if total_human_answers_this_round > 0:
                 accuracy = correct_human_answers / total_human_answers_this_round
                 new_classic_difficulty = current_game['adaptive_difficulty']
@@ -63,7 +64,8 @@ def next_question(*, current_game: Dict[str, Any], socketio, namespace: str, con
                 elif accuracy < 0.35:
                     new_classic_difficulty = max(1, current_game['adaptive_difficulty'] - 1)
                 if new_classic_difficulty != current_game['adaptive_difficulty']:
-                    print(f"Classic Adaptive difficulty changed to: {new_classic_difficulty} (Prev: {current_game['adaptive_difficulty']}, Acc: {accuracy:.2f})")
+                    log.debug("Classic adaptive difficulty changed to %d (prev %d, accuracy %.2f)", new_classic_difficulty,
+                              current_game['adaptive_difficulty'], accuracy, extra={'game_id': current_game['game_id'], 'sampled': True})
                     current_game['adaptive_difficulty'] = new_classic_difficulty
             target_difficulty_for_this_round = current_game['adaptive_difficulty']
         else:
@@ -72,186 +74,268 @@ def next_question(*, current_game: Dict[str, Any], socketio, namespace: str, con
     # --- Handle running out of questions ---
     if current_game['current_question_index'] >= len(current_game['questions']):
         if current_game['mode'] == BATTLE_ROYALE_MODE:
-            print(f"BR Game {current_game['game_id']}: Ran out of questions. Replenishing at current difficulty {target_difficulty_for_this_round}...")
-            new_questions_batch = get_random_questions(config.QUESTIONS_PER_GAME, diff=target_difficulty_for_this_round)
-            if not new_questions_batch:
-                print("CRITICAL ERROR: Could not fetch new questions for BR. Ending game.")
-                return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace)
-            current_game['questions'].extend(new_questions_batch)
-            print(f"Replenished {len(new_questions_batch)} questions. Total now: {len(current_game['questions'])}")
+            # Rounds only hold a question id and option order, so BR just makes room; each round still draws its own question
+            current_game['questions'].extend(config.QUESTIONS_PER_GAME)
+            log.info("BR extended to %d rounds", len(current_game['questions']), extra={'game_id': current_game['game_id']})
         else:
-            print("Classic Mode: All questions asked. Ending game.")
+            log.info("Classic mode: all questions asked. Ending game.", extra={'game_id': current_game['game_id']})
             return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace)
 
     # --- Fetch Question ---
-    print(f"Fetching question for game mode {current_game['mode']} at target difficulty {target_difficulty_for_this_round}")
-    q_list = get_random_questions(1, diff=target_difficulty_for_this_round)
+    prefetched = _take_prefetched(current_game, target_difficulty_for_this_round)
+    log.debug("Fetching question at target difficulty %d (%s)", target_difficulty_for_this_round, 'prefetched' if prefetched else 'lookup',
+              extra={'game_id': current_game['game_id'], 'event': 'question_fetch', 'sampled': True})
+    q_list = [prefetched] if prefetched else get_random_questions(1, diff=target_difficulty_for_this_round)
     if not q_list:
-        print(f"Warning: No question found at target difficulty {target_difficulty_for_this_round}. Fetching any question.")
+        log.warning("No question found at target difficulty %d. Fetching any question.", target_difficulty_for_this_round, extra={'game_id': current_game['game_id']})
         q_list = get_random_questions(1)
         if not q_list:
-            print("CRITICAL: No questions available at all. Ending game.")
+            log.critical("No questions available at all. Ending game.", extra={'game_id': current_game['game_id']})
             return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace)
 
     current_q_data = q_list[0]
     current_game['questions'][current_game['current_question_index']] = current_q_data
+    invalidate_state_snapshot(current_game)
 
-    # --- Prepare and Emit Question Payload ---
-    question_payload = {
-        'question': current_q_data['question'],
-        'options': current_q_data['options'],
+    # --- Prepare and Emit Question Payload (encoded once; reused by queued and per-sid sends) ---
+    question_payload = cached_payload(current_game, ('new_question', current_game['current_question_index']), lambda: {
+        'question': current_q_data.question,
+        'options': current_q_data.options,
         'question_number': current_game['current_question_index'] + 1,
         'total_questions': "Ongoing" if current_game['mode'] == BATTLE_ROYALE_MODE else len(current_game['questions']),
         'duration': config.QUESTION_DURATION,
-        'difficulty': current_q_data.get('difficulty', 'N/A'),
+        'difficulty': current_q_data.difficulty,
         'target_difficulty_level': target_difficulty_for_this_round,
         'active_player_count': len(current_game['active_player_sids']) if current_game['mode'] == BATTLE_ROYALE_MODE else None,
         'initial_player_count': current_game.get('initial_player_count') if current_game['mode'] == BATTLE_ROYALE_MODE else None,
-    }
-    socketio.emit('new_question', question_payload, room=current_game['room_name'], namespace=namespace)
+    })
+    # Stamp before emitting: answer timing is measured from when the question leaves the server
+    # (monotonic, for scoring) and latency compensation accounts for the trip to each client.
+    current_game['question_sent_at'] = time.monotonic()
     current_game['question_start_time'] = time.time()
+    socketio.emit('new_question', question_payload, room=current_game['room_name'], namespace=namespace)
 
     # --- Bot Actions for the NEW question ---
     for sid, player_data in current_game['players'].items():
         if player_data['is_bot'] and (current_game['mode'] == CLASSIC_MODE or sid in current_game['active_player_sids']):
             bot_action(sid, current_q_data)
 
-    # --- Start Question Timer ---
-    if current_game.get('question_timer'):
-        current_game['question_timer'].cancel()
-    # reveal_callback must be provided by the caller using a closure over the same current_game
-    # The caller should set current_game['question_timer'] to this timer
+    # The caller arms the reveal timeout for this question
+    return current_q_data
 
 
-def reveal_answers_and_scores(*, current_game: Dict[str, Any], socketio, namespace: str, app, config, calculate_points: Callable, get_llm_advice: Callable):
+def prefetch_question_candidates(*, current_game: Dict[str, Any], config, get_random_questions: Callable) -> None:
+    """
+    Pick (and option-shuffle) a question for every difficulty the next round could target.
+
+    Runs off the critical path, while the results/intermission screens are up, so
+    `next_question` only has to take the candidate for the difficulty it settles on.
+    Classic can move one step either way; BR either stays or steps up.
+    """
     if not current_game or current_game.get('game_state') != 'in_progress':
-        print("reveal_answers_and_scores: No active/valid game to process.")
         return
+    next_index = current_game['current_question_index'] + 1
+    current = current_game['adaptive_difficulty']
+    if current_game['mode'] == BATTLE_ROYALE_MODE:
+        targets = {current, min(10, current + 1)}
+    elif next_index == 0:
+        targets = {1}  # Classic always opens at difficulty 1
+    else:
+        targets = {current, min(10, current + 1), max(1, current - 1)}
+    candidates = {}
+    for diff in targets:
+        q_list = get_random_questions(1, diff=diff)
+        if q_list:
+            candidates[diff] = q_list[0]
+    current_game['prefetched_questions'] = {'index': next_index, 'by_difficulty': candidates}
+
+
+def _take_prefetched(current_game: Dict[str, Any], difficulty: int) -> Optional[RoundQuestion]:
+    prefetched = current_game.pop('prefetched_questions', None)
+    if not prefetched or prefetched['index'] != current_game['current_question_index']:
+        return None
+    return prefetched['by_difficulty'].get(difficulty)
+
+
+def reveal_answers_and_scores(*, current_game: Dict[str, Any], socketio, namespace: str, config, calculate_points: Callable) -> bool:
+    """
+    Score the current round, apply eliminations and emit `question_result`.
+    Returns True if the game should continue to another question. Never blocks;
+    the caller schedules the results pause and the next question.
+    """
+    if not current_game or current_game.get('game_state') != 'in_progress':
+        log.debug("reveal_answers_and_scores: No active/valid game to process.")
+        return False
 
-    # This function is often called by a timer, so SocketIO calls need app_context
-    with app.app_context():
-        # Cancel the main question timer if it's still running
-        if current_game.get('question_timer') and current_game['question_timer'].is_alive():
-            current_game['question_timer'].cancel()
-            current_game['question_timer'] = None
-
-        # --- Force pending bots to answer and cancel their async timers ---
-        if 'bot_answer_timers' in current_game:
-            for bot_sid, timer_obj in list(current_game['bot_answer_timers'].items()):
-                # Cancel any pending timer so it doesn't fire after reveal
-                if timer_obj.is_alive():
-                    timer_obj.cancel()
-                # If a bot hasn't answered, force decision using stored params via stored function
-                if bot_sid in current_game['players'] and not current_game['players'][bot_sid].get('answered_this_round'):
-                    if 'bot_data_for_round' in current_game and bot_sid in current_game['bot_data_for_round']:
-                        stored_record = current_game['bot_data_for_round'][bot_sid]
-                        fn = stored_record.get('timer_function_ref')
-                        params = stored_record.get('force_params')
-                        if callable(fn):
-                            try:
-                                fn(was_forced=True, forced_params_from_reveal=params)
-                            except Exception as e:
-                                print(f"Error forcing bot {bot_sid} answer: {e}")
-            current_game['bot_answer_timers'].clear()
-
-        # --- Compute results and update scores ---
-        q_idx = current_game['current_question_index']
-        q_data = current_game['questions'][q_idx]
+    # --- Force pending bots to answer and cancel their scheduled answers ---
+    if 'bot_answer_timers' in current_game:
+        for bot_sid, timer_obj in list(current_game['bot_answer_timers'].items()):
+            # Cancel any pending answer so it doesn't fire after reveal
+            timer_obj.cancel()
+            # If a bot hasn't answered, force the decision using the stored params
+            if bot_sid in current_game['players'] and not current_game['players'][bot_sid].get('answered_this_round'):
+                try:
+                    answer_as_bot(current_game, bot_sid, calculate_points, was_forced=True)
+                except Exception:
+                    log.exception("Error forcing bot answer", extra={'game_id': current_game['game_id'], 'sid': bot_sid})
+        current_game['bot_answer_timers'].clear()
+
+    # --- Compute results and update scores ---
+    q_idx = current_game['current_question_index']
+    q_data = current_game['questions'][q_idx]
+
+    is_br = current_game['mode'] == BATTLE_ROYALE_MODE
+
+    # Score the round on whole columns: everyone still in play (BR: active players only)
+    players = current_game['players']
+    slots = players.slots_for(current_game['active_player_sids']) if is_br else players.live_slots()
+    correct = players.correct[slots] == 1
+    # Bots computed correctness/potential points when they answered; humans in submit_answer
+    players.score[slots] += np.where(correct, players.points[slots], 0)
+    # Track last round correctness for adaptive difficulty
+    players.last_correct[slots] = correct
+    answered = players.answered[slots]
+
+    # Battle Royale elimination logic (simple: wrong or missing answers eliminate)
+    if is_br:
+        eliminated = ~(answered & correct)
+        players.eliminated[slots[eliminated]] = True
+        current_game['active_player_sids'] = [players.sids[s] for s in slots[~eliminated].tolist()]
+
+    sids = [players.sids[s] for s in slots.tolist()]
+    player_result_snapshot = {
+        sid: {'score': score, 'answered_this_round': ans, 'is_eliminated': elim, 'place': place, 'helps': helps}
+        for sid, score, ans, elim, place, helps in zip(
+            sids, players.score[slots].tolist(), answered.tolist(), players.eliminated[slots].tolist(),
+            players.place[slots].tolist(), players.helps_dicts(slots),
+        )
+    }
 
-        is_br = current_game['mode'] == BATTLE_ROYALE_MODE
-        human_sids = list(current_game['human_player_sids'])
-
-        # Aggregate results for emit
-        player_result_snapshot = {}
-
-        for sid, pdata in list(current_game['players'].items()):
-            is_active_for_round = (sid in current_game['active_player_sids']) if is_br else True
-            if not is_active_for_round:
-                continue
-
-            answered = pdata.get('answered_this_round', False)
-            correct = pdata.get('current_answer_correct', False)
-            potential_pts = int(pdata.get('potential_points_this_round', 0) or 0)
-
-            # Update helps for next round
-            pdata.setdefault('helps', {'fifty_fifty': True, 'call_friend': True, 'double_score': True})
-
-            if pdata.get('is_bot'):
-                # For bots, we already computed correctness/potential points. Add to score if correct.
-                if correct:
-                    pdata['score'] = pdata.get('score', 0) + potential_pts
-            else:
-                # Humans: score if correct
-                if correct:
-                    pdata['score'] = pdata.get('score', 0) + potential_pts
-
-            # Track last round correctness for adaptive difficulty
-            pdata['answered_last_round_correctly'] = True if correct else False
-
-            player_result_snapshot[sid] = {
-                'score': pdata.get('score', 0),
-                'answered_this_round': answered,
-                'is_eliminated': pdata.get('is_eliminated', False),
-                'place': pdata.get('place', 0),
-                'helps': pdata.get('helps', {}),
-            }
-
-        # Battle Royale elimination logic (simple: wrong answers eliminate)
-        if is_br:
-            still_active = []
-            for sid in list(current_game['active_player_sids']):
-                pdata = current_game['players'].get(sid)
-                if not pdata:
-                    continue
-                if not pdata.get('answered_this_round') or not pdata.get('current_answer_correct'):
-                    # Eliminate
-                    pdata['is_eliminated'] = True
-                else:
-                    still_active.append(sid)
-            current_game['active_player_sids'] = still_active
-
-        # Emit results
-        payload = {
-            'mode': current_game['mode'],
-            'question_number': q_idx + 1,
-            'correct_answer': q_data['correct_answer'],
-            'player_data': player_result_snapshot,
-            'active_player_count': len(current_game.get('active_player_sids', [])) if is_br else None,
-        }
-        socketio.emit('question_result', payload, room=current_game['room_name'], namespace=namespace)
+    invalidate_state_snapshot(current_game)
 
-        # Battle Royale: check win condition
-        if is_br:
-            active_count = len(current_game.get('active_player_sids', []))
-            if active_count <= 1:
-                print(f"Battle Royale win condition met (Active players: {active_count}). Ending game.")
-                socketio.sleep(3)
-                return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace)
+    # Emit results
+    payload = {
+        'mode': current_game['mode'],
+        'question_number': q_idx + 1,
+        'correct_answer': q_data.correct_answer,
+        'player_data': player_result_snapshot,
+        'active_player_count': len(current_game.get('active_player_sids', [])) if is_br else None,
+    }
+    socketio.emit('question_result', payload, room=current_game['room_name'], namespace=namespace)
 
-        socketio.sleep(5)  # Pause to show results before next question
-        # Next question will be triggered by the caller wrapper to ensure timer wiring remains in app.py
+    # Battle Royale: check win condition
+    if is_br:
+        active_count = len(current_game.get('active_player_sids', []))
+        if active_count <= 1:
+            log.info("Battle Royale win condition met (%d active players). Ending game.", active_count, extra={'game_id': current_game['game_id']})
+            return False
+    return True
 
 
-def end_game(*, current_game: Dict[str, Any], socketio, namespace: str, lobby_manager):
-    return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace, lobby_manager=lobby_manager)
+def end_game(*, current_game: Dict[str, Any], socketio, namespace: str):
+    return _end_game_internal(current_game=current_game, socketio=socketio, namespace=namespace)
 
 
-def _end_game_internal(*, current_game: Dict[str, Any], socketio, namespace: str, lobby_manager=None):
-    if not current_game:
+def _end_game_internal(*, current_game: Dict[str, Any], socketio, namespace: str):
+    if not current_game or current_game.get('game_state') == 'ended':
         return
-    print(f"Game {current_game['game_id']} ended.")
+    log.info("Game ended", extra={'game_id': current_game['game_id'], 'event': 'game_over'})
     game_room = current_game['room_name']
     lead = sorted([
         {'username': p['username'], 'score': p['score'], 'is_bot': p['is_bot']}
         for p in current_game['players'].values()
     ], key=lambda x: x['score'], reverse=True)
-    socketio.emit('game_over', {'leaderboard': lead}, room=game_room, namespace=namespace)
-    # Cancel timer if present
+    game_over_payload = PreEncoded({'leaderboard': lead})
+    socketio.emit('game_over', game_over_payload, room=game_room, namespace=namespace)
+    if current_game.get('spectator_room'):
+        socketio.emit('game_over', game_over_payload, room=current_game['spectator_room'], namespace=namespace)
+    # Cancel pending timers if present
     if current_game.get('question_timer'):
         current_game['question_timer'].cancel()
-    # Reset
+    for timer_obj in current_game.get('bot_answer_timers', {}).values():
+        timer_obj.cancel()
+    # Reset, keeping only the final standings for whoever observes the end (e.g. rating updates)
+    bot_difficulty = current_game.get('bot_difficulty')
     current_game.clear()
-    if lobby_manager:
-        lobby_manager.stop(emit_update=True)
-    print("Game ended. Lobby dormant.")
+    current_game.update(game_state='ended', final_standings=lead, bot_difficulty=bot_difficulty)
+
+
+
+# --- Session resume support ---
+
+SNAPSHOT_VERSION = 1
+
 
+def invalidate_state_snapshot(current_game: Dict[str, Any]) -> None:
+    """Drop the cached shared snapshot and encoded payloads; call after scores, membership or the question change."""
+    if current_game:
+        current_game.pop('snapshot_cache', None)
+        drop_cached_payloads(current_game)
+
+
+def build_state_snapshot(*, current_game: Dict[str, Any], sid: str, config) -> PreEncoded:
+    """
+    Compact, versioned view of the game for a (re)joining player.
+
+    The part shared by every player is built and JSON-encoded once per question/score
+    change and cached on the game, so a burst of reconnects only pays for encoding the
+    small per-player overlay.
+    """
+    q_idx = current_game.get('current_question_index', -1)
+    cache_key = (q_idx, current_game.get('question_start_time'))
+    cached = current_game.get('snapshot_cache')
+    if not cached or cached[0] != cache_key:
+        is_br = current_game['mode'] == BATTLE_ROYALE_MODE
+        q_data = current_game['questions'][q_idx] if 0 <= q_idx < len(current_game['questions']) else None
+        shared = {
+            'v': SNAPSHOT_VERSION,
+            'game_id': current_game['game_id'],
+            'mode': current_game['mode'],
+            'question_number': q_idx + 1,
+            'total_questions': "Ongoing" if is_br else len(current_game['questions']),
+            'question': q_data.public() if q_data else None,
+            'duration': config.QUESTION_DURATION,
+            # [sid, username, score, is_bot, is_eliminated]
+            'players': _player_rows(current_game['players']),
+            'active_player_count': len(current_game['active_player_sids']) if is_br else None,
+            'initial_player_count': current_game.get('initial_player_count'),
+        }
+        cached = (cache_key, PreEncoded(shared))
+        current_game['snapshot_cache'] = cached
+
+    shared = cached[1]
+    start = current_game.get('question_start_time')
+    remaining = max(0.0, config.QUESTION_DURATION - (time.time() - start)) if start else 0.0
+    player = current_game['players'].get(sid, {})
+    return shared.merged({
+        'time_remaining': round(remaining, 1),
+        'you': {
+            'sid': sid,
+            'helps': dict(player.get('helps', {})),
+            'answered_this_round': player.get('answered_this_round', False),
+            'is_eliminated': player.get('is_eliminated', False),
+        },
+    })
+
+
+def _player_rows(players) -> list:
+    slots = players.live_slots()
+    return [list(row) for row in zip(
+        [players.sids[s] for s in slots.tolist()], [players.usernames[s] for s in slots.tolist()],
+        players.score[slots].tolist(), players.is_bot[slots].tolist(), players.eliminated[slots].tolist(),
+    )]
+
+
+def rebind_player_sid(current_game: Dict[str, Any], old_sid: str, new_sid: str) -> bool:
+    """Move a player's slot from a dead socket id to the reconnected one."""
+    if not current_game or old_sid not in current_game['players']:
+        return False
+    current_game['players'].rebind(old_sid, new_sid)
+    current_game['players'][new_sid].pop('disconnected', None)
+    for key in ('human_player_sids', 'active_player_sids'):
+        current_game[key] = [new_sid if s == old_sid else s for s in current_game.get(key, [])]
+    tokens = current_game.get('session_tokens')
+    if tokens and old_sid in tokens:
+        tokens[new_sid] = tokens.pop(old_sid)
+    invalidate_state_snapshot(current_game)
+    return True
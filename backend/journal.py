@@ -0,0 +1,299 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterator
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+# Game keys that make up the durable state; everything else (timers, caches, the
+# question bank snapshot, prefetched candidates) is rebuilt after recovery.
+STATE_KEYS = (
+    'game_id', 'mode', 'questions', 'current_question_index', 'adaptive_difficulty',
+    'human_player_sids', 'active_player_sids', 'room_name', 'initial_player_count',
+    'bot_difficulty', 'questions_at_current_difficulty_streak', 'topics', 'phase', 'session_tokens',
+    'tournament',
+)
+SNAPSHOT_KINDS = ('created', 'snapshot')
+
+
+def export_state(game: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact, JSON-safe copy of a live game's durable state."""
+    state = {key: game[key] for key in STATE_KEYS if key in game}
+    state['topics'] = list(state.get('topics', ()))
+    state['questions'] = game['questions'].to_state()
+    state['players'] = {p['sid']: p for p in game['players'].records()}
+    return state
+
+
+def apply_event(state: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Advance an exported state by one journal record (the same state transitions the actor made)."""
+    kind = record['kind']
+    players = state['players']
+    if kind == 'question':
+        idx = record['round']
+        questions = state['questions']
+        questions.extend([None] * (idx + 1 - len(questions)))
+        questions[idx] = record['question']
+        # What the round started from, so a recovery that serves it again can step from the same place
+        state['before_question'] = {key: state.get(key) for key in ('adaptive_difficulty', 'questions_at_current_difficulty_streak')}
+        state['current_question_index'] = idx
+        state['adaptive_difficulty'] = record['adaptive_difficulty']
+        state['questions_at_current_difficulty_streak'] = record['streak']
+        state['phase'] = 'question'
+    elif kind == 'help':
+        if record['sid'] in players:
+            players[record['sid']]['helps'][record['help_type']] = False
+    elif kind == 'reveal':
+        for sid, answered, correct, points, score, eliminated in record['rows']:
+            if sid in players:
+                players[sid].update(score=score, is_eliminated=eliminated, answered_last_round_correctly=bool(correct))
+        state['active_player_sids'] = record['active_player_sids']
+        state['phase'] = 'results'
+    elif kind == 'leave':
+        players.pop(record['sid'], None)
+        state['human_player_sids'] = [s for s in state['human_player_sids'] if s != record['sid']]
+    elif kind == 'rebind':
+        old, new = record['old_sid'], record['new_sid']
+        if old in players:
+            players[new] = dict(players.pop(old), sid=new)
+        for key in ('human_player_sids', 'active_player_sids'):
+            state[key] = [new if s == old else s for s in state.get(key, [])]
+        tokens = state.get('session_tokens') or {}
+        if old in tokens:
+            tokens[new] = tokens.pop(old)
+    elif kind == 'end':
+        state['phase'] = 'ended'
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Records in file order; a torn final line from a crash mid-write is skipped."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                log.warning("Skipping unreadable journal line %d in %s", line_no, path)
+
+
+def rebuild_state(path: str) -> Optional[Dict[str, Any]]:
+    """State at the end of a journal: the last snapshot plus every record after it."""
+    state = None
+    for record in read_records(path):
+        if record['kind'] in SNAPSHOT_KINDS:
+            state = json.loads(json.dumps(record['state']))
+        elif state is not None:
+            apply_event(state, record)
+    return state
+
+
+class GameJournal:
+    """
+    Append-only per-game event journal on local disk.
+
+    Actors call `record()` from their worker threads; records go onto an in-memory
+    queue and one writer thread appends them as JSON lines to `<game_id>.jsonl`.
+    Files are fsynced together every `fsync_interval` seconds (and always before a
+    game's journal is closed), so the hot path never waits on the disk and a crash
+    loses at most that window.
+
+    A 'created' record holds the full initial state and a 'snapshot' record the
+    state every `snapshot_every` rounds, so recovery replays only the tail after the
+    last one. Finished journals move to `finished/` and are kept for replay.
+    """
+
+    def __init__(self, *, directory: str, fsync_interval: float, snapshot_every: int) -> None:
+        self.directory = directory
+        self.finished_dir = os.path.join(directory, 'finished')
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = max(1, snapshot_every)
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._seq: Dict[str, int] = {}
+        self._files: Dict[str, Any] = {}
+        self._unsynced: set = set()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.records_written = 0
+        self.fsyncs = 0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                os.makedirs(self.finished_dir, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name='journal-writer', daemon=True)
+                self._thread.start()
+
+    # ----- Producer side (actor threads) -----
+
+    def record(self, game_id: str, kind: str, **data) -> None:
+        seq = self._seq.get(game_id, 0) + 1
+        self._seq[game_id] = seq
+        record = {'seq': seq, 't': round(time.time(), 4), 'kind': kind, **data}
+        self._queue.put(('append', game_id, json.dumps(record, separators=(',', ':'))))
+
+    def snapshot(self, game_id: str, game: Dict[str, Any]) -> None:
+        self.record(game_id, 'snapshot', state=export_state(game))
+
+    def close(self, game_id: str) -> None:
+        """Sync and archive the game's journal once its final record is queued."""
+        self._seq.pop(game_id, None)
+        self._queue.put(('close', game_id, None))
+
+    # ----- Recovery -----
+
+    def recover(self) -> List[Dict[str, Any]]:
+        """States of games whose journals were never closed (i.e. in flight when the process died)."""
+        states = []
+        if not os.path.isdir(self.directory):
+            return states
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.jsonl'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                state = rebuild_state(path)
+                last_seq = max((r['seq'] for r in read_records(path)), default=0)
+            except (OSError, ValueError, KeyError):
+                log.exception("Could not replay journal %s", path)
+                continue
+            if state is None or state.get('phase') == 'ended':
+                self._archive(state['game_id'] if state else name[:-len('.jsonl')])
+                continue
+            self._seq[state['game_id']] = last_seq
+            states.append(state)
+        return states
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'directory': self.directory,
+            'open_journals': len(self._files),
+            'pending': self._queue.qsize(),
+            'unsynced_files': len(self._unsynced),
+            'records_written': self.records_written,
+            'fsyncs': self.fsyncs,
+        }
+
+    # ----- Writer thread -----
+
+    def _path(self, game_id: str) -> str:
+        return os.path.join(self.directory, f"{game_id}.jsonl")
+
+    def _run(self) -> None:
+        last_sync = time.monotonic()
+        while True:
+            timeout = max(0.0, last_sync + self.fsync_interval - time.monotonic()) if self._unsynced else None
+            try:
+                op, game_id, line = self._queue.get(timeout=timeout)
+                if op == 'append':
+                    self._append(game_id, line)
+                elif op == 'close':
+                    self._close(game_id)
+            except queue.Empty:
+                pass
+            except OSError:
+                log.exception("Journal write failed", extra={'game_id': game_id})
+            if self._unsynced and time.monotonic() - last_sync >= self.fsync_interval:
+                self._sync_all()
+                last_sync = time.monotonic()
+
+    def _append(self, game_id: str, line: str) -> None:
+        f = self._files.get(game_id)
+        if f is None:
+            f = self._files[game_id] = open(self._path(game_id), 'a', encoding='utf-8')
+        f.write(line + '\n')
+        self._unsynced.add(game_id)
+        self.records_written += 1
+
+    def _sync_all(self) -> None:
+        for game_id in list(self._unsynced):
+            f = self._files.get(game_id)
+            if f is not None:
+                try:
+                    f.flush()
+                    os.fsync(f.fileno())
+                except OSError:
+                    log.exception("Journal fsync failed", extra={'game_id': game_id})
+        self.fsyncs += 1
+        self._unsynced.clear()
+
+    def _close(self, game_id: str) -> None:
+        f = self._files.pop(game_id, None)
+        if f is not None:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self._unsynced.discard(game_id)
+        self._archive(game_id)
+
+    def _archive(self, game_id: str) -> None:
+        src = self._path(game_id)
+        if os.path.exists(src):
+            os.makedirs(self.finished_dir, exist_ok=True)
+            os.replace(src, os.path.join(self.finished_dir, os.path.basename(src)))
+
+
+# --- Deterministic replay (debugging) ---
+
+def replay(path: str, *, question_duration: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Walk a journal round by round and re-check every reveal against the answers that
+    preceded it. Returns one report per round: timings (question -> reveal, answer
+    latency) and any player whose recorded score does not equal the previous score
+    plus the points of a correct answer.
+    """
+    reports: List[Dict[str, Any]] = []
+    state = None
+    current = None
+    for record in read_records(path):
+        kind = record['kind']
+        if kind in SNAPSHOT_KINDS:
+            state = json.loads(json.dumps(record['state']))
+            continue
+        if state is None:
+            continue
+        if kind == 'question':
+            current = {'round': record['round'] + 1, 'question': record['question']['question'],
+                       'served_at': record['t'], 'answers': {}, 'mismatches': []}
+            reports.append(current)
+        elif kind == 'answer' and current is not None:
+            current['answers'][record['sid']] = record
+        elif kind == 'reveal' and current is not None:
+            current['reveal_after_s'] = round(record['t'] - current['served_at'], 3)
+            for sid, answered, correct, points, score, eliminated in record['rows']:
+                before = state['players'].get(sid, {}).get('score', 0)
+                expected = before + (points if correct else 0)
+                answer = current['answers'].get(sid)
+                if score != expected or (answer and bool(answer['correct']) != bool(correct)):
+                    current['mismatches'].append({'sid': sid, 'score_before': before, 'points': points,
+                                                  'recorded_score': score, 'expected_score': expected})
+            latencies = [a['elapsed'] for a in current['answers'].values() if a.get('elapsed') is not None]
+            current['answer_count'] = len(current['answers'])
+            current['max_answer_s'] = round(max(latencies), 3) if latencies else None
+            if question_duration is not None:
+                current['slow'] = current['reveal_after_s'] > question_duration + 1
+        apply_event(state, record)
+    for report in reports:
+        report.pop('answers', None)
+    return reports
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a game journal and check each round.")
+    parser.add_argument('path')
+    parser.add_argument('--question-duration', type=float, default=None, help="Flag rounds whose reveal came later than this + 1s")
+    args = parser.parse_args()
+    for report in replay(args.path, question_duration=args.question_duration):
+        flags = ' SLOW' if report.get('slow') else ''
+        flags += f" MISMATCH x{len(report['mismatches'])}" if report['mismatches'] else ''
+        print(f"Round {report['round']}: reveal after {report.get('reveal_after_s')}s, "
+              f"{report.get('answer_count', 0)} answers (slowest {report.get('max_answer_s')}s){flags}")
+        print(f"    {report['question']}")
+        for m in report['mismatches']:
+            print(f"    ! {m}")
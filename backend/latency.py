@@ -0,0 +1,126 @@
+import bisect
+import time
+from collections import deque, OrderedDict
+from threading import Lock
+from typing import Dict, Any, Optional
+
+# Upper bounds (ms) of the RTT histogram buckets exposed by `stats`; the last bucket is open-ended.
+RTT_BUCKETS_MS = (10, 25, 50, 100, 200, 400, 800, 1600)
+
+
+class LatencyTracker:
+    """
+    Per-client round-trip-time estimates from ping/pong sampling.
+
+    One `latency_ping` carrying a sequence number is broadcast per interval; each
+    client echoes it as `latency_pong`, and the RTT is measured against the
+    monotonic send time of that sequence. Estimates are smoothed the way TCP does
+    it (SRTT/RTTVAR, RFC 6298), and raw samples feed a bounded histogram.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, *, max_one_way: float, history: int = 10000, outstanding_pings: int = 8) -> None:
+        self.max_one_way = max_one_way
+        self.lock = Lock()
+        self._seq = 0
+        self._sent_at: "OrderedDict[int, float]" = OrderedDict()
+        self._outstanding_pings = outstanding_pings
+        self._clients: Dict[str, Dict[str, float]] = {}  # sid -> {'srtt', 'rttvar', 'last', 'samples'}
+        self._recent = deque(maxlen=history)
+        self._histogram = [0] * (len(RTT_BUCKETS_MS) + 1)
+        self._pinger_started = False
+
+    # ----- Sampling -----
+
+    def next_ping(self) -> Dict[str, int]:
+        with self.lock:
+            self._seq += 1
+            self._sent_at[self._seq] = time.monotonic()
+            while len(self._sent_at) > self._outstanding_pings:
+                self._sent_at.popitem(last=False)
+            return {'seq': self._seq}
+
+    def record_pong(self, sid: str, seq) -> Optional[float]:
+        """Record a pong for ping `seq`. Returns the RTT sample in seconds, or None if unknown/too old."""
+        now = time.monotonic()
+        with self.lock:
+            sent_at = self._sent_at.get(seq)
+            if sent_at is None:
+                return None
+            rtt = now - sent_at
+            est = self._clients.get(sid)
+            if est is None:
+                est = {'srtt': rtt, 'rttvar': rtt / 2, 'samples': 0}
+                self._clients[sid] = est
+            else:
+                est['rttvar'] = (1 - self.BETA) * est['rttvar'] + self.BETA * abs(est['srtt'] - rtt)
+                est['srtt'] = (1 - self.ALPHA) * est['srtt'] + self.ALPHA * rtt
+            est['last'] = rtt
+            est['samples'] += 1
+            self._recent.append(rtt)
+            self._histogram[bisect.bisect_left(RTT_BUCKETS_MS, rtt * 1000)] += 1
+            return rtt
+
+    def start_pinger(self, socketio, *, interval: float, namespace: str) -> None:
+        """Broadcast a ping every `interval` seconds as a SocketIO background task (started once)."""
+        with self.lock:
+            if self._pinger_started:
+                return
+            self._pinger_started = True
+
+        def _loop():
+            while True:
+                socketio.sleep(interval)
+                socketio.emit('latency_ping', self.next_ping(), namespace=namespace)
+
+        socketio.start_background_task(_loop)
+
+    def forget(self, sid: str) -> None:
+        with self.lock:
+            self._clients.pop(sid, None)
+
+    # ----- Compensation -----
+
+    def one_way_delay(self, sid: str) -> float:
+        """Smoothed one-way delay estimate (SRTT / 2), clamped to [0, max_one_way]."""
+        est = self._clients.get(sid)
+        if not est:
+            return 0.0
+        return min(max(est['srtt'] / 2, 0.0), self.max_one_way)
+
+    def compensated_elapsed(self, sid: str, sent_at: float, received_at: Optional[float] = None) -> float:
+        """
+        Time the player actually had the question on screen before answering.
+
+        Both legs are corrected: the question reached the client one one-way delay
+        after `sent_at`, and the answer left the client one one-way delay before
+        `received_at`. All times are `time.monotonic()` values.
+        """
+        received_at = time.monotonic() if received_at is None else received_at
+        return max(0.0, (received_at - sent_at) - 2 * self.one_way_delay(sid))
+
+    # ----- Instrumentation -----
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            recent = sorted(self._recent)
+            clients = {sid: {'srtt_ms': round(e['srtt'] * 1000, 1), 'rttvar_ms': round(e['rttvar'] * 1000, 1),
+                             'last_ms': round(e['last'] * 1000, 1), 'samples': e['samples']}
+                       for sid, e in self._clients.items()}
+            histogram = list(self._histogram)
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 1) if recent else None
+
+        labels = [f"<={b}ms" for b in RTT_BUCKETS_MS] + [f">{RTT_BUCKETS_MS[-1]}ms"]
+        return {
+            'samples': len(recent),
+            'p50_ms': pct(0.50),
+            'p90_ms': pct(0.90),
+            'p99_ms': pct(0.99),
+            'histogram': dict(zip(labels, histogram)),
+            'max_one_way_compensation_ms': self.max_one_way * 1000,
+            'clients': clients,
+        }
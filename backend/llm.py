@@ -1,5 +1,11 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict
 from . import config
+from .log import get_logger
+
+log = get_logger(__name__)
 
 _gemini_model_instance = None
 try:
@@ -16,9 +22,15 @@ def get_gemini_model():
         if not genai:
             return None
         api_key = os.getenv("GOOGLE_API_KEY")
+        if config.GEMINI_API_ENDPOINT:
+            api_key = api_key or "local"  # The stand-in server does not check keys
         if api_key:
             try:
-                genai.configure(api_key=api_key)
+                if config.GEMINI_API_ENDPOINT:
+                    genai.configure(api_key=api_key, transport="rest",
+                                    client_options={"api_endpoint": config.GEMINI_API_ENDPOINT})
+                else:
+                    genai.configure(api_key=api_key)
                 safety_settings = {
                     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
                     HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
@@ -27,12 +39,13 @@ def get_gemini_model():
                 }
                 generation_config = genai.types.GenerationConfig(candidate_count=1, max_output_tokens=150, temperature=0.8)
                 _gemini_model_instance = genai.GenerativeModel(config.LLM_MODEL_TO_USE, safety_settings=safety_settings, generation_config=generation_config)
-                print(f"Gemini model ({config.LLM_MODEL_TO_USE}) initialized.")
+                log.info("Gemini model (%s) initialized%s.", config.LLM_MODEL_TO_USE,
+                         f" against {config.GEMINI_API_ENDPOINT}" if config.GEMINI_API_ENDPOINT else "")
             except Exception as e:
-                print(f"Error initializing Gemini: {e}")
+                log.error("Error initializing Gemini: %s", e)
                 _gemini_model_instance = None
         else:
-            print("GOOGLE_API_KEY not found.")
+            log.warning("GOOGLE_API_KEY not found.")
             _gemini_model_instance = None
     return _gemini_model_instance
 
@@ -43,7 +56,7 @@ def get_llm_advice(q_txt, opts):
         return "AI friend unavailable."
     prmpt = f"Trivia Hint: Q:\"{q_txt}\" Opts:{opts}. Fun, subtle hint (1-2 sent.), not direct answer."
     try:
-        resp = model.generate_content(prmpt)
+        resp = model.generate_content(prmpt, request_options={"timeout": config.LLM_REQUEST_TIMEOUT})
         if getattr(resp, 'candidates', None) and getattr(resp, 'text', None):
             adv = resp.text.strip().replace("**", "")
             if not adv or "unable" in adv or "cannot" in adv:
@@ -53,6 +66,54 @@ def get_llm_advice(q_txt, opts):
             return "AI friend blocked!"
         return "AI friend odd reply."
     except Exception as e:
-        print(f"Gemini Call Fail: {e}")
+        log.warning("Gemini call failed: %s", e)
         return "AI connection fuzzy!"
 
+
+
+class HintService:
+    """
+    Runs `get_llm_advice` on a small thread pool so the slow Gemini call never blocks
+    a game worker. `submit` returns immediately; `on_done(advice)` is called from a pool thread.
+    """
+
+    def __init__(self, max_workers: int, profiler=None) -> None:
+        self.profiler = profiler
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hint')
+        self._lock = Lock()
+        self._pending = 0
+        self._running = 0
+        self.submitted = 0
+
+    def submit(self, q_txt, opts, on_done: Callable[[str], None]) -> None:
+        with self._lock:
+            self._pending += 1
+            self.submitted += 1
+
+        def _run():
+            with self._lock:
+                self._running += 1
+            try:
+                if self.profiler:
+                    with self.profiler.track('llm.get_llm_advice'):
+                        advice = get_llm_advice(q_txt, opts)
+                else:
+                    advice = get_llm_advice(q_txt, opts)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    self._running -= 1
+            on_done(advice)
+
+        self._executor.submit(_run)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        # Plain int reads; no lock, so polling this never delays a submit
+        pending, running = self._pending, self._running
+        return {'queued': max(0, pending - running), 'running': running, 'workers': self.max_workers,
+                'submitted': self.submitted}
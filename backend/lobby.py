@@ -1,18 +1,61 @@
-from threading import RLock, Timer as ThreadingTimer
-from typing import Callable, Dict, Any, Optional, List
+import itertools
+import math
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+
+class Lobby:
+    """One countdown lobby: up to `max_players` players of a single mode."""
+
+    __slots__ = ('lobby_id', 'mode', 'max_players', 'players', 'deadline')
+
+    def __init__(self, lobby_id: str, mode: str, max_players: int, deadline: float) -> None:
+        self.lobby_id = lobby_id
+        self.mode = mode
+        self.max_players = max_players
+        self.players: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.deadline = deadline
+
+    @property
+    def room(self) -> str:
+        return f"lobby:{self.lobby_id}"
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.players) >= self.max_players
+
+    def time_remaining(self, now: float) -> int:
+        return max(0, math.ceil(self.deadline - now))
 
 
 class LobbyManager:
     """
-    Manages a single active lobby countdown at a time for a specific mode.
+    Runs any number of countdown lobbies side by side, several per mode.
+
+    A lobby opens for a mode's first waiting player and starts its countdown
+    right away. Joins go to the fullest lobby of the mode that still has room. A
+    lobby that reaches its mode's `max_players` takes no more joins but keeps
+    counting down, and the next player opens a new one. Open lobbies are kept in
+    per-mode buckets indexed by player count, with a pointer to the fullest
+    non-empty bucket, so routing a join does not look at other lobbies. A single
+    ticker advances every countdown. When one runs out, its players are handed
+    to `on_countdown_finished` and the lobby closes. Each lobby has its own
+    Socket.IO room, so a `lobby_countdown_update` only reaches that lobby's players.
+    Updates are built under the lock and sent after it is released, so emits never
+    hold up a join. Callers should not hold the lock around `join` and `leave`
+    either, or the emits would run under it after all.
 
     External dependencies are injected to minimize coupling:
-      - socketio: for emit
+      - socketio: for emit and room membership
       - namespace: socket namespace
-      - lock: shared lock for thread-safety when reading players
-      - get_players_for_mode(mode) -> Dict[sid, player_data]
-      - is_game_active() -> bool
-      - on_countdown_finished(mode) -> None (creates a game)
+      - lock: shared lock for thread-safety (the app's lobby lock)
+      - on_countdown_finished(mode, players: Dict[sid, player_data]) -> None (creates a game)
     """
 
     def __init__(
@@ -21,148 +64,210 @@ class LobbyManager:
         socketio,
         namespace: str,
         wait_time: int,
+        max_players: Dict[str, int],
         lock: Optional[RLock],
-        get_players_for_mode: Callable[[str], Dict[str, Dict[str, Any]]],
-        is_game_active: Callable[[], bool],
-        on_countdown_finished: Optional[Callable[[str], None]] = None,
+        on_countdown_finished: Optional[Callable[[str, Dict[str, Dict[str, Any]]], None]] = None,
     ) -> None:
         self.socketio = socketio
         self.namespace = namespace
         self.wait_time = wait_time
+        self.max_players = {mode: max(1, size) for mode, size in max_players.items()}
         self.lock = lock or RLock()
-        self.get_players_for_mode = get_players_for_mode
-        self.is_game_active = is_game_active
         self.on_countdown_finished = on_countdown_finished
 
-        self._timer: Optional[ThreadingTimer] = None
-        self.countdown_active: bool = False
-        self.time_remaining: int = self.wait_time
-        self.mode_in_countdown: Optional[str] = None
+        self._lobbies: Dict[str, Lobby] = {}
+        self._lobby_of: Dict[str, str] = {}  # sid -> lobby_id
+        self._open: Dict[str, List["OrderedDict[str, Lobby]"]] = {}  # mode -> [player count] -> lobbies with room
+        self._fullest: Dict[str, int] = {}  # mode -> highest player count with an open lobby
+        self._ids = itertools.count(1)
+        self._ticker_started = False
+        self.lobbies_opened = 0
+        self.lobbies_launched = 0
 
     # ----- Public API -----
 
-    def start(self, mode: str) -> None:
-        """Start a countdown for the given mode if not already active and no game is running."""
+    def join(self, sid: str, player: Dict[str, Any], *, quiet: bool = False) -> str:
+        """
+        Put `player` (which carries its 'desired_mode') in a lobby and return the lobby id.
+        A player already waiting for the same mode stays where they are; `quiet` then
+        refreshes only their own view instead of the whole lobby's.
+        """
+        mode = player['desired_mode']
+        updates = []
         with self.lock:
-            if self.is_game_active():
-                return
-            # If already active for this mode, just emit current status
-            if self.countdown_active and self.mode_in_countdown == mode:
-                self._emit_update(active=True, mode=mode)
-                return
+            lobby = self._lobbies.get(self._lobby_of.get(sid, ''))
+            if lobby is not None and lobby.mode == mode:
+                lobby.players[sid] = player
+                updates.append(self._update(lobby, room=sid if quiet else None))
+            else:
+                if lobby is not None:
+                    self._remove_locked(sid, updates)
+                lobby = self._fullest_open(mode) or self._open_lobby(mode)
+                self._unindex(lobby)
+                lobby.players[sid] = player
+                self._index(lobby)
+                self._lobby_of[sid] = lobby.lobby_id
+                self.socketio.server.enter_room(sid, lobby.room, namespace=self.namespace)
+                if lobby.is_full:
+                    log.debug("Lobby %s is full (%d players)", lobby.lobby_id, len(lobby.players), extra={'mode': mode})
+                updates.append(self._update(lobby))
+        self._send_updates(updates)
+        return lobby.lobby_id
 
-            # Switch to this mode countdown
-            players_for_mode = self.get_players_for_mode(mode)
-            if not players_for_mode:
-                # Nothing to do
-                self._reset_internal()
-                self._emit_update(active=False, mode=mode, players=[])
-                return
+    def leave(self, sid: str) -> Optional[str]:
+        """Take `sid` out of its lobby; returns the lobby id, or None if it was not waiting."""
+        updates = []
+        with self.lock:
+            lobby_id = self._remove_locked(sid, updates)
+        self._send_updates(updates)
+        return lobby_id
 
-            self.countdown_active = True
-            self.mode_in_countdown = mode
-            self.time_remaining = self.wait_time
-            self._emit_update(active=True, mode=mode, players=list(players_for_mode.values()))
-            self._schedule_next_tick()
+    def lobby_of(self, sid: str) -> Optional[str]:
+        return self._lobby_of.get(sid)
 
-    def stop(self, *, emit_update: bool = False) -> None:
-        """Stop any active countdown and optionally emit an update to clients."""
+    def status(self, sid: str) -> Optional[Dict[str, Any]]:
+        """The `lobby_countdown_update` payload for `sid`'s lobby, or None if it is not in one."""
         with self.lock:
-            self._cancel_timer()
-            was_active = self.countdown_active
-            stopped_mode = self.mode_in_countdown
-            self._reset_internal()
-            if was_active and emit_update and stopped_mode:
-                remaining_players = list(self.get_players_for_mode(stopped_mode).values())
-                self._emit_update(active=False, mode=stopped_mode, players=remaining_players)
-
-    def trigger_next_waiting_lobby_if_any(self, modes_priority: List[str]) -> None:
-        """If idle, try starting a countdown for the first mode that has players waiting."""
+            lobby = self._lobbies.get(self._lobby_of.get(sid, ''))
+            return self._payload(lobby, time.monotonic()) if lobby else None
+
+    def tick(self) -> None:
+        """Advance every countdown: emit the remaining time, and launch the lobbies whose time is up."""
+        now = time.monotonic()
+        due, updates = [], []
+        with self.lock:
+            for lobby in list(self._lobbies.values()):
+                if lobby.deadline <= now:
+                    self._close_locked(lobby)
+                    due.append(lobby)
+                else:
+                    updates.append(self._update(lobby, now=now))
+        self._send_updates(updates)
+        for lobby in due:
+            self._launch(lobby)
+
+    def start_ticker(self, socketio, interval: float = 1.0) -> None:
         with self.lock:
-            if self.is_game_active() or self.countdown_active:
+            if self._ticker_started:
                 return
-            for mode in modes_priority:
-                players = self.get_players_for_mode(mode)
-                if players:
-                    self.mode_in_countdown = mode
-                    # Call start which will check again and emit
-                    self.start(mode)
-                    return
+            self._ticker_started = True
+
+        def _loop():
+            while True:
+                socketio.sleep(interval)
+                try:
+                    self.tick()
+                except Exception:
+                    log.exception("Lobby tick error")
+
+        socketio.start_background_task(_loop)
+
+    def stats(self) -> Dict[str, Any]:
+        # Without the lock (it is the app's lobby lock, held by joins and game creation): the lobby
+        # list is copied in one step, and each count is a single len(), so polling never makes a join wait
+        now = time.monotonic()
+        lobbies = list(self._lobbies.values())
+        return {
+            'waiting': len(self._lobby_of),
+            'lobbies_opened': self.lobbies_opened,
+            'lobbies_launched': self.lobbies_launched,
+            'max_players': dict(self.max_players),
+            'lobbies': [{'lobby_id': lobby.lobby_id, 'mode': lobby.mode, 'players': len(lobby.players),
+                         'full': lobby.is_full, 'time_remaining': lobby.time_remaining(now)}
+                        for lobby in lobbies],
+        }
 
     # ----- Internal helpers -----
 
-    def _schedule_next_tick(self) -> None:
-        self._cancel_timer()
-        self._timer = ThreadingTimer(1.0, self._tick)
-        self._timer.start()
+    def _fullest_open(self, mode: str) -> Optional[Lobby]:
+        buckets = self._open.get(mode)
+        if not buckets:
+            return None
+        size = self._fullest.get(mode, 0)
+        while size > 0 and not buckets[size]:
+            size -= 1
+        self._fullest[mode] = size
+        return next(iter(buckets[size].values())) if size else None
 
-    def _cancel_timer(self) -> None:
-        if self._timer and self._timer.is_alive():
-            self._timer.cancel()
-        self._timer = None
+    def _open_lobby(self, mode: str) -> Lobby:
+        max_players = self.max_players.get(mode, 1)
+        lobby = Lobby(f"{mode}-{next(self._ids)}", mode, max_players, time.monotonic() + self.wait_time)
+        self._lobbies[lobby.lobby_id] = lobby
+        if mode not in self._open:
+            self._open[mode] = [OrderedDict() for _ in range(max_players)]
+        self.lobbies_opened += 1
+        log.debug("Opened lobby %s", lobby.lobby_id, extra={'mode': mode})
+        return lobby
 
-    def _tick(self) -> None:
-        # Timer callback; keep it resilient and lock-protected
-        with self.lock:
-            if self.is_game_active():
-                # Game started while counting down; stop without emitting end (game events will update UI)
-                self._reset_internal()
-                return
-            if not self.countdown_active or not self.mode_in_countdown:
-                # Nothing to do
-                self._reset_internal()
-                return
+    def _index(self, lobby: Lobby) -> None:
+        size = len(lobby.players)
+        if 0 < size < lobby.max_players:
+            self._open[lobby.mode][size][lobby.lobby_id] = lobby
+            if size > self._fullest.get(lobby.mode, 0):
+                self._fullest[lobby.mode] = size
 
-            players_for_mode = self.get_players_for_mode(self.mode_in_countdown)
-            if not players_for_mode:
-                # Everyone left; stop and emit update for this mode
-                ended_mode = self.mode_in_countdown
-                self._reset_internal()
-                self._emit_update(active=False, mode=ended_mode, players=[])
-                # Try next waiting lobby
-                return
+    def _unindex(self, lobby: Lobby) -> None:
+        size = len(lobby.players)
+        if 0 < size < lobby.max_players:
+            self._open[lobby.mode][size].pop(lobby.lobby_id, None)
 
-            self.time_remaining -= 1
-            if self.time_remaining <= 0:
-                # Fire game creation callback then stop and emit inactive
-                finished_mode = self.mode_in_countdown
-                if self.on_countdown_finished:
-                    # Call without holding lock to avoid deadlocks if callback re-enters
-                    # But we need to release lock first
-                    pass
-                # Release lock and run callback, then re-acquire to finalize state
-                self.lock.release()
-                try:
-                    if self.on_countdown_finished:
-                        self.on_countdown_finished(finished_mode)
-                finally:
-                    self.lock.acquire()
-
-                # Reset and emit inactive for finished mode
-                self._reset_internal()
-                self._emit_update(active=False, mode=finished_mode, players=[])
-                return
+    def _remove_locked(self, sid: str, updates: List[Tuple[str, Dict[str, Any]]]) -> Optional[str]:
+        lobby_id = self._lobby_of.pop(sid, None)
+        lobby = self._lobbies.get(lobby_id) if lobby_id else None
+        if lobby is None:
+            return None
+        self._unindex(lobby)
+        lobby.players.pop(sid, None)
+        self.socketio.server.leave_room(sid, lobby.room, namespace=self.namespace)
+        if lobby.players:
+            self._index(lobby)
+            updates.append(self._update(lobby))
+        else:
+            del self._lobbies[lobby.lobby_id]
+            log.debug("Lobby %s closed: everyone left", lobby.lobby_id, extra={'mode': lobby.mode})
+        return lobby_id
 
-            # Normal tick - emit update and schedule next
-            self._emit_update(active=True, mode=self.mode_in_countdown, players=list(players_for_mode.values()))
-            self._schedule_next_tick()
+    def _close_locked(self, lobby: Lobby) -> None:
+        self._unindex(lobby)
+        del self._lobbies[lobby.lobby_id]
+        for sid in lobby.players:
+            self._lobby_of.pop(sid, None)
+        self.lobbies_launched += 1
 
-    def _emit_update(self, *, active: bool, mode: Optional[str], players: Optional[list] = None) -> None:
-        payload = {
-            'mode': mode,
-            'time_remaining': self.time_remaining if active else self.wait_time,
-            'players': players if players is not None else [],
-            'is_active': active,
-        }
+    def _launch(self, lobby: Lobby) -> None:
+        # Runs without the lock held, so the callback may take it (or other locks) freely
+        log.info("Lobby %s countdown finished with %d players", lobby.lobby_id, len(lobby.players), extra={'mode': lobby.mode})
         try:
-            self.socketio.emit('lobby_countdown_update', payload, namespace=self.namespace)
-        except Exception as e:
-            # Be defensive; don't crash timer on emit failures
-            print(f"LobbyManager emit error: {e}")
+            if self.on_countdown_finished:
+                self.on_countdown_finished(lobby.mode, dict(lobby.players))
+        except Exception:
+            log.exception("Lobby on_countdown_finished error")
+        # Clear the lobby view of whoever was in it, then drop the room
+        self._emit(lobby.room, {'lobby_id': lobby.lobby_id, 'mode': lobby.mode, 'time_remaining': self.wait_time,
+                                'players': [], 'max_players': lobby.max_players, 'is_active': False})
+        self.socketio.server.close_room(lobby.room, namespace=self.namespace)
+
+    def _payload(self, lobby: Lobby, now: float) -> Dict[str, Any]:
+        return {
+            'lobby_id': lobby.lobby_id,
+            'mode': lobby.mode,
+            'time_remaining': lobby.time_remaining(now),
+            'players': list(lobby.players.values()),
+            'max_players': lobby.max_players,
+            'is_active': True,
+        }
+
+    def _update(self, lobby: Lobby, *, room: Optional[str] = None, now: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+        """(room, payload) for a lobby's current state; built under the lock, sent after it is released."""
+        return room or lobby.room, self._payload(lobby, time.monotonic() if now is None else now)
 
-    def _reset_internal(self) -> None:
-        self.countdown_active = False
-        self.mode_in_countdown = None
-        self.time_remaining = self.wait_time
-        self._cancel_timer()
+    def _send_updates(self, updates: List[Tuple[str, Dict[str, Any]]]) -> None:
+        for room, payload in updates:
+            self._emit(room, payload)
 
+    def _emit(self, room: str, payload: Dict[str, Any]) -> None:
+        try:
+            self.socketio.emit('lobby_countdown_update', payload, room=room, namespace=self.namespace)
+        except Exception as e:
+            # Be defensive; don't crash the ticker on emit failures
+            log.warning("LobbyManager emit error: %s", e)
@@ -0,0 +1,144 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from typing import Dict, Optional
+
+from . import config
+
+# Fields picked up from `extra=` and rendered as key=value (or JSON keys)
+STRUCTURED_FIELDS = ('event', 'game_id', 'sid', 'mode', 'username', 'round')
+
+# Log args of these types cannot change after the call, so rendering them can wait for the listener
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["_NonBlockingQueueHandler"] = None
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that drops (and counts) records instead of blocking when full."""
+
+    def __init__(self, q: "queue.Queue") -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the whole message on the calling thread. Here % interpolation is
+        # left to the listener unless an arg is mutable (it could change before the listener runs). A
+        # traceback is still rendered now: queuing exc_info would keep its frames, and their locals, alive.
+        if record.args and not (isinstance(record.msg, str) and isinstance(record.args, tuple)
+                                and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in record.args)):
+            record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _traceback_text(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _traceback_text(exc_info) -> str:
+    return logging.Formatter().formatException(exc_info)
+
+
+class _SampledDebugFilter(logging.Filter):
+    """Keeps only a fraction of DEBUG records marked `extra={'sampled': True}` (per-round chatter)."""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and getattr(record, 'sampled', False):
+            return random.random() < self.rate
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """`time level logger message key=value...`, or one JSON object per line when json_output is set."""
+
+    def __init__(self, json_output: bool = False) -> None:
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: getattr(record, k) for k in STRUCTURED_FIELDS if getattr(record, k, None) is not None}
+        if self.json_output:
+            payload = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                       'msg': record.getMessage(), **fields}
+            exc = self._exception_text(record)
+            if exc:
+                payload['exc'] = exc
+            return json.dumps(payload, default=str)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in fields.items())
+        exc = self._exception_text(record)
+        if exc:
+            line += '\n' + exc
+        return line
+
+    def _exception_text(self, record: logging.LogRecord) -> Optional[str]:
+        # Records from the queue carry the traceback already rendered in exc_text
+        if record.exc_info:
+            return self.formatException(record.exc_info)
+        return record.exc_text
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """'backend.game=DEBUG,backend.app=WARNING' -> {'backend.game': 'DEBUG', 'backend.app': 'WARNING'}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """
+    Route every `backend.*` logger through a bounded in-memory queue.
+
+    Callers only append a record to the queue. The blocking write to stderr, the
+    structured formatting and (when every arg is an immutable scalar) the %
+    interpolation happen on a single QueueListener thread, so hot paths never
+    contend on the stream lock. Tracebacks are rendered on the calling thread.
+    Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    q: "queue.Queue" = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(StructuredFormatter(json_output=config.LOG_FORMAT == 'json'))
+    _queue_handler = _NonBlockingQueueHandler(q)
+    _queue_handler.addFilter(_SampledDebugFilter(config.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger('backend')
+    root.setLevel(config.LOG_LEVEL.upper())
+    root.addHandler(_queue_handler)
+    root.propagate = False
+    for name, level in _parse_levels(config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
@@ -0,0 +1,315 @@
+import atexit
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+BucketKey = Tuple[str, int, str]  # (mode, rating band, bot difficulty)
+
+
+class RatingStore:
+    """
+    Per-player skill ratings (Elo), keyed by username.
+
+    A finished game counts as a round-robin of pairwise results between every pair
+    of participants, ordered by final score. Bots take part with a fixed rating
+    for the game's bot difficulty but are never updated themselves.
+
+    With a `path`, ratings are written to disk by a background thread every
+    `save_interval` seconds when something changed, and once more at exit. A game
+    end only marks the store dirty, so it never waits for the file. Entries are
+    replaced, never changed in place, so a flush copies the map under the lock
+    (one dict copy) and serializes it after releasing it.
+    """
+
+    def __init__(self, *, initial: float, k_factor: float, bot_ratings: Dict[str, float], path: Optional[str] = None,
+                 save_interval: float = 5.0) -> None:
+        self.initial = initial
+        self.k_factor = k_factor
+        self.bot_ratings = bot_ratings
+        self.path = path
+        self.save_interval = save_interval
+        self.lock = RLock()
+        self._save_lock = threading.Lock()  # One file write at a time (writer thread and the exit flush)
+        self._dirty = False
+        self._thread: Optional[threading.Thread] = None
+        self._ratings: Dict[str, Dict[str, float]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._ratings = json.load(f)
+            except (OSError, ValueError) as e:
+                log.warning("Could not load ratings from %s: %s", path, e)
+
+    def start(self) -> None:
+        if not self.path:
+            return
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='ratings-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def rating(self, username: str) -> float:
+        entry = self._ratings.get(username)
+        return entry['rating'] if entry else self.initial
+
+    def record_game(self, standings: List[Dict[str, Any]], bot_difficulty: str) -> None:
+        """Update human ratings from a final leaderboard of {'username', 'score', 'is_bot'} entries."""
+        if len(standings) < 2:
+            return
+        bot_rating = self.bot_ratings.get(bot_difficulty, self.initial)
+        with self.lock:
+            current = [bot_rating if p['is_bot'] else self.rating(p['username']) for p in standings]
+            k = self.k_factor / (len(standings) - 1)
+            for i, p in enumerate(standings):
+                if p['is_bot']:
+                    continue
+                delta = 0.0
+                for j, q in enumerate(standings):
+                    if i == j:
+                        continue
+                    actual = 1.0 if p['score'] > q['score'] else 0.5 if p['score'] == q['score'] else 0.0
+                    expected = 1.0 / (1.0 + 10 ** ((current[j] - current[i]) / 400.0))
+                    delta += k * (actual - expected)
+                entry = self._ratings.get(p['username']) or {'rating': self.initial, 'games': 0}
+                self._ratings[p['username']] = {'rating': round(entry['rating'] + delta, 1), 'games': entry['games'] + 1}
+            self._dirty = True
+
+    def flush(self) -> bool:
+        """Write the ratings file if anything changed since the last write. Returns whether it wrote."""
+        if not self.path:
+            return False
+        with self._save_lock:
+            with self.lock:
+                if not self._dirty:
+                    return False
+                snapshot = dict(self._ratings)
+                self._dirty = False
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                log.warning("Could not save ratings to %s: %s", self.path, e)
+                with self.lock:
+                    self._dirty = True  # Try again on the next interval
+                return False
+        return True
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.save_interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Ratings flush failed")
+
+
+class Matchmaker:
+    """
+    Skill-bucketed matchmaking queue.
+
+    Waiting players are grouped by (mode, rating band, bot-difficulty preference).
+    Each bucket is an insertion-ordered dict, and one heap holds the wait deadline
+    of every bucket's oldest ticket. Enqueueing is O(1) into the bucket plus
+    O(log n) on the heap. A match forms as soon as a bucket reaches its mode's match
+    size, or on `tick` once the oldest ticket's deadline has passed (bots then fill
+    the game). Each tick only looks at buckets whose deadline is due, so tick cost
+    does not grow with the number of waiting players.
+
+    A bucket's status is sent to its room only when its membership or deadline
+    changed (clients count the seconds down themselves in between), and always
+    after the lock is released, so emits never hold up an enqueue.
+
+    External dependencies are injected:
+      - socketio: for bucket status emits (`lobby_countdown_update`, same shape as the lobby)
+      - ratings: RatingStore
+      - on_match(mode, players: Dict[sid, ticket], bot_difficulty) -> None (creates a game)
+    """
+
+    def __init__(
+        self,
+        *,
+        socketio,
+        namespace: str,
+        ratings: RatingStore,
+        match_sizes: Dict[str, int],
+        max_wait: float,
+        band_width: float,
+        on_match: Callable[[str, Dict[str, Dict[str, Any]], str], None],
+    ) -> None:
+        self.socketio = socketio
+        self.namespace = namespace
+        self.ratings = ratings
+        self.match_sizes = match_sizes
+        self.max_wait = max_wait
+        self.band_width = band_width
+        self.on_match = on_match
+        self.lock = RLock()
+        self._buckets: Dict[BucketKey, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._bucket_of: Dict[str, BucketKey] = {}
+        self._deadlines: List[Tuple[float, int, BucketKey]] = []
+        self._seq = itertools.count()
+        self._dirty: set = set()  # Buckets whose status has changed since it was last sent
+        self._ticker_started = False
+        self.matches_formed = 0
+
+    # ----- Public API -----
+
+    def enqueue(self, sid: str, *, username: str, mode: str, bot_difficulty: str, topics: List[str] = ()) -> None:
+        rating = self.ratings.rating(username)
+        key = (mode, int(rating // self.band_width), bot_difficulty)
+        ready = None
+        with self.lock:
+            self._remove_locked(sid)
+            bucket = self._buckets.setdefault(key, OrderedDict())
+            bucket[sid] = {
+                'sid': sid, 'username': username, 'desired_mode': mode,
+                'bot_difficulty_pref': bot_difficulty, 'topics': list(topics), 'rating': rating, 'enqueued_at': time.monotonic(),
+            }
+            self._bucket_of[sid] = key
+            self.socketio.server.enter_room(sid, self._room(key), namespace=self.namespace)
+            if len(bucket) >= self.match_sizes.get(mode, 1):
+                ready = self._take_locked(key)
+            else:
+                if len(bucket) == 1:
+                    heapq.heappush(self._deadlines, (bucket[sid]['enqueued_at'] + self.max_wait, next(self._seq), key))
+                self._dirty.add(key)
+            updates = self._drain_updates_locked()
+        self._send_updates(updates)
+        if ready:
+            self._dispatch(*ready)
+
+    def remove(self, sid: str) -> bool:
+        with self.lock:
+            key = self._remove_locked(sid)
+            updates = self._drain_updates_locked()
+        self._send_updates(updates)
+        return key is not None
+
+    def is_waiting(self, sid: str) -> bool:
+        return sid in self._bucket_of
+
+    def tick(self) -> None:
+        """Form matches for buckets whose oldest ticket has waited past the deadline, and send the statuses that changed."""
+        ready = []
+        now = time.monotonic()
+        with self.lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, _, key = heapq.heappop(self._deadlines)
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                oldest = next(iter(bucket.values()))
+                if oldest['enqueued_at'] + self.max_wait > now:
+                    # Stale entry: the ticket it was pushed for has left; re-arm for the current oldest
+                    heapq.heappush(self._deadlines, (oldest['enqueued_at'] + self.max_wait, next(self._seq), key))
+                    continue
+                ready.append(self._take_locked(key))
+            updates = self._drain_updates_locked()
+        self._send_updates(updates)
+        for match in ready:
+            self._dispatch(*match)
+
+    def start_ticker(self, socketio, interval: float = 1.0) -> None:
+        with self.lock:
+            if self._ticker_started:
+                return
+            self._ticker_started = True
+
+        def _loop():
+            while True:
+                socketio.sleep(interval)
+                try:
+                    self.tick()
+                except Exception:
+                    log.exception("Matchmaker tick error")
+
+        socketio.start_background_task(_loop)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'waiting': len(self._bucket_of),
+                'matches_formed': self.matches_formed,
+                'buckets': {f"{m}:{b}:{d}": len(v) for (m, b, d), v in self._buckets.items()},
+            }
+
+    # ----- Internal helpers -----
+
+    @staticmethod
+    def _room(key: BucketKey) -> str:
+        return f"mm:{key[0]}:{key[1]}:{key[2]}"
+
+    def _remove_locked(self, sid: str) -> Optional[BucketKey]:
+        key = self._bucket_of.pop(sid, None)
+        if key is None:
+            return None
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pop(sid, None)
+            if not bucket:
+                del self._buckets[key]
+            else:
+                self._dirty.add(key)
+        self.socketio.server.leave_room(sid, self._room(key), namespace=self.namespace)
+        return key
+
+    def _take_locked(self, key: BucketKey):
+        mode, _, bot_difficulty = key
+        bucket = self._buckets[key]
+        size = self.match_sizes.get(mode, 1)
+        players = {}
+        while bucket and len(players) < size:
+            sid, ticket = bucket.popitem(last=False)
+            players[sid] = ticket
+            del self._bucket_of[sid]
+            self.socketio.server.leave_room(sid, self._room(key), namespace=self.namespace)
+        if bucket:
+            heapq.heappush(self._deadlines, (next(iter(bucket.values()))['enqueued_at'] + self.max_wait, next(self._seq), key))
+            self._dirty.add(key)
+        else:
+            del self._buckets[key]
+        self.matches_formed += 1
+        return mode, players, bot_difficulty
+
+    def _drain_updates_locked(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(room, payload) for every changed bucket that still has players; the payloads are sent later, unlocked."""
+        updates = []
+        now = time.monotonic()
+        for key in self._dirty:
+            bucket = self._buckets.get(key)
+            if not bucket:
+                continue
+            oldest = next(iter(bucket.values()))
+            updates.append((self._room(key), {
+                'mode': key[0],
+                'time_remaining': max(0, int(round(oldest['enqueued_at'] + self.max_wait - now))),
+                'players': list(bucket.values()),
+                'is_active': True,
+            }))
+        self._dirty.clear()
+        return updates
+
+    def _send_updates(self, updates: List[Tuple[str, Dict[str, Any]]]) -> None:
+        for room, payload in updates:
+            self.socketio.emit('lobby_countdown_update', payload, room=room, namespace=self.namespace)
+
+    def _dispatch(self, mode: str, players: Dict[str, Dict[str, Any]], bot_difficulty: str) -> None:
+        log.info("Match formed with %d players (bot difficulty '%s')", len(players), bot_difficulty, extra={'mode': mode, 'event': 'match_formed'})
+        try:
+            self.on_match(mode, players, bot_difficulty)
+        except Exception:
+            log.exception("Matchmaker on_match error")
@@ -0,0 +1,223 @@
+import json
+import time
+from collections import deque
+from threading import RLock
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+from .log import get_logger
+from .payloads import PreEncoded
+
+log = get_logger(__name__)
+
+# Events where only the newest payload matters; an older queued copy is replaced in place.
+COALESCED_EVENTS = frozenset({'lobby_countdown_update', 'latency_ping', 'spectator_update', 'show_update', 'show_tally'})
+# Events that are never dropped; if these alone exceed the limits the client is disconnected.
+CRITICAL_EVENTS = frozenset({
+    'connection_ack', 'game_starting', 'new_question', 'question_result', 'game_over',
+    'game_state_snapshot', 'help_result', 'show_question', 'show_reveal', 'show_over',
+})
+
+
+class _ClientQueue:
+    __slots__ = ('events', 'bytes', 'over_limit_since', 'sent', 'dropped', 'coalesced')
+
+    def __init__(self) -> None:
+        self.events: deque = deque()  # (event, data, size)
+        self.bytes = 0
+        self.over_limit_since: Optional[float] = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+
+class OutboundQueues:
+    """
+    Per-connection outbound queues in front of `socketio.emit`.
+
+    Exposes the subset of the SocketIO API the game modules use (`emit`, `sleep`,
+    `start_background_task`), so it can be injected wherever `socketio` was.
+
+    While a client keeps up, an emit goes straight to the room and is encoded once, as
+    before. A client whose Engine.IO transport queue is above `transport_high_water`
+    packets is skipped by the room emit and its events are held here instead. Held
+    events are coalesced (COALESCED_EVENTS keep only the newest), non-critical events
+    are dropped oldest-first when the per-client event or byte limit is exceeded, and a
+    client still over the limit after `overflow_grace` seconds is disconnected.
+    """
+
+    def __init__(
+        self,
+        socketio,
+        *,
+        max_events: int,
+        max_bytes: int,
+        transport_high_water: int,
+        overflow_grace: float,
+        drain_interval: float,
+    ) -> None:
+        self.socketio = socketio
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.transport_high_water = transport_high_water
+        self.overflow_grace = overflow_grace
+        self.drain_interval = drain_interval
+        self.lock = RLock()
+        self._queues: Dict[Tuple[str, str], _ClientQueue] = {}  # (namespace, sid) -> queue
+        self._drainer_started = False
+        self.disconnected_for_backpressure = 0
+
+    # ----- SocketIO-compatible surface -----
+
+    def __getattr__(self, name):
+        # sleep, start_background_task, server, ... fall through to the real SocketIO instance
+        return getattr(self.socketio, name)
+
+    def emit(self, event: str, data: Any = None, *, room: Optional[str] = None, to: Optional[str] = None,
+             namespace: Optional[str] = None, skip_sid=None, **kwargs) -> None:
+        room = to or room
+        namespace = namespace or '/'
+        skip = set(skip_sid if isinstance(skip_sid, list) else [skip_sid]) if skip_sid else set()
+
+        with self.lock:
+            held = [sid for sid, eio_sid in self._participants(namespace, room)
+                    if sid not in skip and self._should_hold(namespace, sid, eio_sid)]
+            for sid in held:
+                self._enqueue(namespace, sid, event, data)
+        if held:
+            self._ensure_drainer()
+            skip.update(held)
+        self.socketio.emit(event, data, room=room, namespace=namespace, skip_sid=list(skip) or None, **kwargs)
+
+    # ----- Metrics -----
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            clients = {
+                sid: {'depth': len(q.events), 'bytes': q.bytes, 'sent': q.sent, 'dropped': q.dropped,
+                      'coalesced': q.coalesced, 'over_limit': q.over_limit_since is not None}
+                for (_, sid), q in self._queues.items()
+            }
+        return {
+            'queued_clients': sum(1 for c in clients.values() if c['depth']),
+            'total_depth': sum(c['depth'] for c in clients.values()),
+            'total_bytes': sum(c['bytes'] for c in clients.values()),
+            'disconnected_for_backpressure': self.disconnected_for_backpressure,
+            'clients': clients,
+        }
+
+    def forget(self, sid: str, namespace: Optional[str] = None) -> None:
+        """Drop any queued events for a disconnected client."""
+        with self.lock:
+            self._queues.pop((namespace or '/', sid), None)
+
+    # ----- Internal helpers -----
+
+    def _participants(self, namespace: str, room: Optional[str]) -> Iterable[Tuple[str, str]]:
+        manager = getattr(getattr(self.socketio, 'server', None), 'manager', None)
+        if manager is None:
+            return ()
+        return manager.get_participants(namespace, room)
+
+    def _transport_depth(self, eio_sid: str) -> int:
+        eio = getattr(getattr(self.socketio, 'server', None), 'eio', None)
+        sock = eio.sockets.get(eio_sid) if eio is not None else None
+        queue = getattr(sock, 'queue', None)
+        return queue.qsize() if queue is not None else 0
+
+    def _should_hold(self, namespace: str, sid: str, eio_sid: str) -> bool:
+        q = self._queues.get((namespace, sid))
+        if q is not None and q.events:
+            return True  # Keep ordering: once queued, everything queues behind it
+        return self._transport_depth(eio_sid) > self.transport_high_water
+
+    def _enqueue(self, namespace: str, sid: str, event: str, data: Any) -> None:
+        q = self._queues.setdefault((namespace, sid), _ClientQueue())
+        size = data.size if isinstance(data, PreEncoded) else len(json.dumps(data, default=str))
+        if event in COALESCED_EVENTS:
+            for i, (queued_event, _, queued_size) in enumerate(q.events):
+                if queued_event == event:
+                    q.events[i] = (event, data, size)
+                    q.bytes += size - queued_size
+                    q.coalesced += 1
+                    return
+        q.events.append((event, data, size))
+        q.bytes += size
+        self._enforce_limits(q)
+
+    def _over_limits(self, q: _ClientQueue) -> bool:
+        return len(q.events) > self.max_events or q.bytes > self.max_bytes
+
+    def _enforce_limits(self, q: _ClientQueue) -> None:
+        if not self._over_limits(q):
+            q.over_limit_since = None
+            return
+        kept = deque()
+        count = len(q.events)
+        # Walk oldest-first, dropping non-critical events until back under the limits
+        for item in q.events:
+            if (count > self.max_events or q.bytes > self.max_bytes) and item[0] not in CRITICAL_EVENTS:
+                count -= 1
+                q.bytes -= item[2]
+                q.dropped += 1
+                continue
+            kept.append(item)
+        q.events = kept
+        if self._over_limits(q):
+            if q.over_limit_since is None:
+                q.over_limit_since = time.monotonic()
+        else:
+            q.over_limit_since = None
+
+    def _ensure_drainer(self) -> None:
+        with self.lock:
+            if self._drainer_started:
+                return
+            self._drainer_started = True
+        self.socketio.start_background_task(self._drain_loop)
+
+    def _drain_loop(self) -> None:
+        while True:
+            self.socketio.sleep(self.drain_interval)
+            try:
+                self.drain()
+            except Exception:
+                log.exception("Outbound drain error")
+
+    def drain(self) -> None:
+        """Flush held events to clients whose transport has caught up; disconnect persistent laggards."""
+        to_disconnect: List[Tuple[str, str]] = []
+        now = time.monotonic()
+        with self.lock:
+            eio_by_sid = {}
+            for (namespace, sid) in list(self._queues.keys()):
+                if namespace not in eio_by_sid:
+                    manager = self.socketio.server.manager
+                    eio_by_sid[namespace] = {s: e for s, e in manager.get_participants(namespace, None)}
+                eio_sid = eio_by_sid[namespace].get(sid)
+                q = self._queues[(namespace, sid)]
+                if eio_sid is None:
+                    del self._queues[(namespace, sid)]  # Client is gone
+                    continue
+                if q.over_limit_since is not None and now - q.over_limit_since > self.overflow_grace:
+                    to_disconnect.append((namespace, sid))
+                    del self._queues[(namespace, sid)]
+                    continue
+                budget = self.transport_high_water - self._transport_depth(eio_sid)
+                while q.events and budget > 0:
+                    event, data, size = q.events.popleft()
+                    q.bytes -= size
+                    q.sent += 1
+                    budget -= 1
+                    # Sent under the lock so a concurrent emit cannot overtake queued events
+                    self.socketio.emit(event, data, to=sid, namespace=namespace)
+                if not q.events and q.over_limit_since is None and not q.dropped and not q.coalesced:
+                    del self._queues[(namespace, sid)]
+                elif not self._over_limits(q):
+                    q.over_limit_since = None
+        for namespace, sid in to_disconnect:
+            self.disconnected_for_backpressure += 1
+            log.warning("Disconnecting: outbound queue over limit for more than %ss", self.overflow_grace, extra={'sid': sid, 'event': 'backpressure_disconnect'})
+            try:
+                self.socketio.server.disconnect(sid, namespace=namespace)
+            except Exception as e:
+                log.warning("Backpressure disconnect failed: %s", e, extra={'sid': sid})
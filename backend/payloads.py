@@ -0,0 +1,97 @@
+import json
+from typing import Dict, Any, Callable, Hashable
+
+_stats = {
+    'payloads_encoded': 0,   # PreEncoded payloads built (one JSON encode each)
+    'cache_hits': 0,         # cached_payload lookups served without encoding
+    'packets_encoded': 0,    # Socket.IO packets encoded by PacketJSON
+    'packets_spliced': 0,    # ... of which reused a pre-encoded payload
+}
+
+
+def _encode(data: Any) -> str:
+    return json.dumps(data, separators=(',', ':'))
+
+
+class PreEncoded:
+    """
+    An event payload already encoded to JSON text.
+
+    Emit it like a dict; PacketJSON splices the text straight into the packet, so the
+    same payload sent to a room, to per-sid fallbacks and from the outbound queues
+    is serialized exactly once.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, data: Any = None, *, text: str = None) -> None:
+        if text is None:
+            text = _encode(data)
+            _stats['payloads_encoded'] += 1
+        self.text = text
+
+    @property
+    def size(self) -> int:
+        return len(self.text)
+
+    def merged(self, extra: Dict[str, Any]) -> 'PreEncoded':
+        """This object payload plus `extra` keys; only `extra` is encoded."""
+        if not extra:
+            return self
+        extra_text = _encode(extra)
+        if self.text == '{}':
+            return PreEncoded(text=extra_text)
+        return PreEncoded(text=f"{self.text[:-1]},{extra_text[1:]}")
+
+    def decode(self) -> Any:
+        return json.loads(self.text)
+
+    def __repr__(self) -> str:
+        return f"PreEncoded({self.text[:60]}{'...' if len(self.text) > 60 else ''})"
+
+
+class PacketJSON:
+    """
+    json-module stand-in for `SocketIO(json=...)`.
+
+    Socket.IO encodes an event as the list `[event, *args]`; any PreEncoded argument is
+    spliced in as its cached text instead of being serialized again.
+    """
+
+    @staticmethod
+    def dumps(obj: Any, **kwargs) -> str:
+        _stats['packets_encoded'] += 1
+        if isinstance(obj, list) and any(isinstance(item, PreEncoded) for item in obj):
+            _stats['packets_spliced'] += 1
+            return '[' + ','.join(
+                item.text if isinstance(item, PreEncoded) else json.dumps(item, **kwargs) for item in obj
+            ) + ']'
+        return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(s, **kwargs) -> Any:
+        return json.loads(s, **kwargs)
+
+
+def cached_payload(current_game: Dict[str, Any], key: Hashable, build: Callable[[], Any]) -> PreEncoded:
+    """
+    Encoded payload for `key`, built and encoded at most once per game state.
+
+    Entries live on the game next to the snapshot cache and are dropped with it by
+    `invalidate_state_snapshot` whenever scores, membership or the question change.
+    """
+    cache = current_game.setdefault('payload_cache', {})
+    payload = cache.get(key)
+    if payload is None:
+        payload = PreEncoded(build())
+        cache[key] = payload
+    else:
+        _stats['cache_hits'] += 1
+    return payload
+
+
+def drop_cached_payloads(current_game: Dict[str, Any]) -> None:
+    current_game.pop('payload_cache', None)
+
+
+def stats() -> Dict[str, int]:
+    return dict(_stats)
@@ -0,0 +1,283 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+HELP_TYPES = ('fifty_fifty', 'call_friend', 'double_score')
+ALL_HELPS = (1 << len(HELP_TYPES)) - 1
+
+# Tri-state columns (None / False / True) are stored as int8: -1 / 0 / 1
+_TRISTATE = {None: -1, False: 0, True: 1}
+_FROM_TRISTATE = {-1: None, 0: False, 1: True}
+
+# Player-dict key -> (column, kind)
+_COLUMNS = {
+    'score': ('score', 'int'),
+    'answered_this_round': ('answered', 'bool'),
+    'current_answer_correct': ('correct', 'tristate'),
+    'potential_points_this_round': ('points', 'int'),
+    'is_eliminated': ('eliminated', 'bool'),
+    'place': ('place', 'int'),
+    'is_bot': ('is_bot', 'bool'),
+    'used_double_score_this_round': ('double_score', 'bool'),
+    'answered_last_round_correctly': ('last_correct', 'tristate'),
+    'disconnected': ('disconnected', 'bool'),
+}
+_DTYPES = {
+    'score': np.int64, 'answered': np.bool_, 'correct': np.int8, 'points': np.int32,
+    'eliminated': np.bool_, 'place': np.int16, 'is_bot': np.bool_, 'double_score': np.bool_,
+    'last_correct': np.int8, 'disconnected': np.bool_, 'helps': np.uint8, 'live': np.bool_,
+}
+# Keys that only appear in a player's dict form once set (absent == default)
+_OPTIONAL_KEYS = frozenset({'used_double_score_this_round', 'answered_last_round_correctly', 'disconnected',
+                            'answered_this_round', 'current_answer_correct', 'potential_points_this_round'})
+
+
+class HelpsView(MutableMapping):
+    """A player's helps as {'fifty_fifty': bool, ...}, backed by one bitmask byte."""
+    __slots__ = ('_table', '_slot')
+
+    def __init__(self, table: 'PlayerTable', slot: int) -> None:
+        self._table = table
+        self._slot = slot
+
+    def __getitem__(self, key: str) -> bool:
+        return bool(self._table.helps[self._slot] & (1 << HELP_TYPES.index(key)))
+
+    def __setitem__(self, key: str, value: bool) -> None:
+        bit = 1 << HELP_TYPES.index(key)
+        mask = int(self._table.helps[self._slot])
+        self._table.helps[self._slot] = (mask | bit) if value else (mask & ~bit)
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError('helps cannot be removed')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(HELP_TYPES)
+
+    def __len__(self) -> int:
+        return len(HELP_TYPES)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class PlayerView(MutableMapping):
+    """
+    Dict-like view of one player row in a PlayerTable.
+
+    Reads and writes of the per-round keys ('score', 'answered_this_round', ...) go
+    straight to the table's columns; any other key is kept in a small per-player
+    dict. Use `to_dict()` (or `PlayerTable.records()`) when the player is sent to
+    clients.
+    """
+    __slots__ = ('_table', '_slot')
+
+    def __init__(self, table: 'PlayerTable', slot: int) -> None:
+        self._table = table
+        self._slot = slot
+
+    def __getitem__(self, key: str) -> Any:
+        t, slot = self._table, self._slot
+        col = _COLUMNS.get(key)
+        if col is not None:
+            value = getattr(t, col[0])[slot]
+            if col[1] == 'bool':
+                return bool(value)
+            if col[1] == 'tristate':
+                return _FROM_TRISTATE[int(value)]
+            return int(value)
+        if key == 'username':
+            return t.usernames[slot]
+        if key == 'sid':
+            return t.sids[slot]
+        if key == 'helps':
+            return HelpsView(t, slot)
+        return t.extras[slot][key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        t, slot = self._table, self._slot
+        col = _COLUMNS.get(key)
+        if col is not None:
+            getattr(t, col[0])[slot] = _TRISTATE[value] if col[1] == 'tristate' else (value or 0)
+        elif key == 'username':
+            t.usernames[slot] = value
+        elif key == 'sid':
+            t.sids[slot] = value
+        elif key == 'helps':
+            t.helps[slot] = _helps_mask(value)
+        else:
+            t.extras[slot][key] = value
+
+    def __delitem__(self, key: str) -> None:
+        t, slot = self._table, self._slot
+        col = _COLUMNS.get(key)
+        if col is not None and key in _OPTIONAL_KEYS:
+            getattr(t, col[0])[slot] = -1 if col[1] == 'tristate' else 0
+        elif key in t.extras[slot]:
+            del t.extras[slot][key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ('username', 'sid', 'helps')
+        for key in _COLUMNS:
+            if key not in _OPTIONAL_KEYS or key in self:
+                yield key
+        yield from self._table.extras[self._slot]
+
+    def __contains__(self, key) -> bool:
+        col = _COLUMNS.get(key)
+        if col is not None and key in _OPTIONAL_KEYS:
+            value = getattr(self._table, col[0])[self._slot]
+            return bool(value != -1) if col[1] == 'tristate' else bool(value)
+        return col is not None or key in ('username', 'sid', 'helps') or key in self._table.extras[self._slot]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: dict(value) if key == 'helps' else value for key, value in ((k, self[k]) for k in self)}
+
+    def __repr__(self) -> str:
+        return f"PlayerView({self.to_dict()!r})"
+
+
+def _helps_mask(helps: Optional[Mapping]) -> int:
+    if helps is None:
+        return ALL_HELPS
+    return sum(1 << i for i, name in enumerate(HELP_TYPES) if helps.get(name))
+
+
+class PlayerTable(MutableMapping):
+    """
+    Struct-of-arrays player state for one game: sid -> PlayerView.
+
+    Scores, answered/correct flags, round points, elimination, places and help
+    bitmasks live in NumPy columns indexed by slot, with a sid -> slot map in front.
+    Existing code keeps using `players[sid]['score']`; the per-round hot paths
+    (round reset, reveal scoring, elimination, "has everyone answered") work on
+    whole columns at once. Freed slots are reused by later inserts.
+    """
+
+    def __init__(self, capacity: int = 16) -> None:
+        capacity = max(1, capacity)
+        for name, dtype in _DTYPES.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.correct[:] = -1
+        self.last_correct[:] = -1
+        self.sids: List[Optional[str]] = [None] * capacity
+        self.usernames: List[Optional[str]] = [None] * capacity
+        self.extras: List[Dict[str, Any]] = [{} for _ in range(capacity)]
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+    @classmethod
+    def from_records(cls, records: Mapping) -> 'PlayerTable':
+        table = cls(capacity=len(records))
+        for sid, record in records.items():
+            table[sid] = record
+        return table
+
+    # ----- Mapping interface -----
+
+    def __getitem__(self, sid: str) -> PlayerView:
+        return PlayerView(self, self._slots[sid])
+
+    def __setitem__(self, sid: str, record: Mapping) -> None:
+        if isinstance(record, PlayerView) and record._table is self:
+            # Re-keying an existing row (e.g. a resumed session under a new sid)
+            self._slots[sid] = record._slot
+            self.sids[record._slot] = sid
+            return
+        slot = self._slots.get(sid)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[sid] = slot
+        for name in _DTYPES:
+            getattr(self, name)[slot] = 0
+        self.correct[slot] = -1
+        self.last_correct[slot] = -1
+        self.helps[slot] = ALL_HELPS
+        self.live[slot] = True
+        self.sids[slot] = sid
+        self.extras[slot] = {}
+        view = PlayerView(self, slot)
+        for key, value in record.items():
+            if key != 'sid':
+                view[key] = value
+
+    def __delitem__(self, sid: str) -> None:
+        # Column values stay readable through views that were taken before the delete
+        slot = self._slots.pop(sid)
+        self.live[slot] = False
+        self._free.append(slot)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, sid) -> bool:
+        return sid in self._slots
+
+    # ----- Column helpers -----
+
+    def slot(self, sid: str) -> int:
+        return self._slots[sid]
+
+    def slots_for(self, sids: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self._slots[s] for s in sids if s in self._slots), dtype=np.intp)
+
+    def live_slots(self) -> np.ndarray:
+        return np.fromiter(self._slots.values(), dtype=np.intp, count=len(self._slots))
+
+    def reset_round(self, slots: np.ndarray) -> None:
+        self.answered[slots] = False
+        self.correct[slots] = -1
+
+    def humans_waiting(self) -> int:
+        """Connected humans who have not answered this round."""
+        waiting = self.live & ~self.is_bot & ~self.disconnected & ~self.answered
+        return int(np.count_nonzero(waiting))
+
+    def top(self, k: int, slots: Optional[np.ndarray] = None) -> np.ndarray:
+        """Slots of the `k` highest scores (among `slots`, default all players), best first."""
+        if slots is None:
+            slots = self.live_slots()
+        if k <= 0:
+            return slots[:0]
+        scores = self.score[slots]
+        if len(slots) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            slots, scores = slots[best], scores[best]
+        return slots[np.argsort(-scores, kind='stable')]
+
+    def helps_dicts(self, slots: np.ndarray) -> List[Dict[str, bool]]:
+        masks = self.helps[slots]
+        flags = [((masks & (1 << i)) != 0).tolist() for i in range(len(HELP_TYPES))]
+        return [dict(zip(HELP_TYPES, row)) for row in zip(*flags)]
+
+    def records(self, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Plain-dict copies of every player, for payloads."""
+        return [PlayerView(self, slot).to_dict() for sid, slot in self._slots.items() if sid != exclude]
+
+    def rebind(self, old_sid: str, new_sid: str) -> None:
+        slot = self._slots.pop(old_sid)
+        self._slots[new_sid] = slot
+        self.sids[slot] = new_sid
+
+    def _grow(self) -> None:
+        old = len(self.sids)
+        new = old * 2
+        for name, dtype in _DTYPES.items():
+            column = np.zeros(new, dtype=dtype)
+            column[:old] = getattr(self, name)
+            setattr(self, name, column)
+        self.sids.extend([None] * old)
+        self.usernames.extend([None] * old)
+        self.extras.extend({} for _ in range(old))
+        self._free.extend(range(new - 1, old - 1, -1))
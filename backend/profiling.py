@@ -0,0 +1,220 @@
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Any, Optional, List, Set
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+
+class Profiler:
+    """
+    Low-overhead profiling surface for handlers, actor commands and hint calls.
+
+    Two independent parts:
+      - Slow-call recording (always on): `track(name, game_id=...)` marks a call as
+        in flight. A watchdog thread captures the stack of any call still running
+        past `slow_threshold`, so a stalled round shows *where* it is stuck, not
+        just that it was slow. Completed slow calls go into a bounded history.
+      - Sampling (on demand): a thread reads `sys._current_frames()` every
+        `sample_interval` and folds the stacks into counts. It can run globally or
+        for selected games only; per-game samples come from threads whose
+        in-flight call is tagged with one of those games.
+
+    `folded()` returns the samples in the collapsed-stack format read by flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self, *, sample_interval: float, slow_threshold: float, history: int = 100, max_depth: int = 64) -> None:
+        self.sample_interval = sample_interval
+        self.slow_threshold = slow_threshold
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self._in_flight: Dict[int, list] = {}  # thread ident -> [name, game_id, started_at, captured_stack]
+        self._slow_calls = deque(maxlen=history)
+        self._samples: Counter = Counter()
+        self._sample_count = 0
+        self._global = False
+        self._games: Set[str] = set()
+        self._sampler: Optional[threading.Thread] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+        self._own_idents: Set[int] = set()
+
+    # ----- Slow-call recording -----
+
+    @contextmanager
+    def track(self, name: str, game_id: Optional[str] = None):
+        ident = threading.get_ident()
+        entry = [name, game_id, time.perf_counter(), None]
+        outer = self._in_flight.get(ident)
+        self._in_flight[ident] = entry
+        if self._watchdog is None:
+            self._start_watchdog()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - entry[2]
+            if outer is None:
+                self._in_flight.pop(ident, None)
+            else:
+                self._in_flight[ident] = outer
+            if duration >= self.slow_threshold:
+                self._slow_calls.append({
+                    'name': name,
+                    'game_id': game_id,
+                    'duration_ms': round(duration * 1000, 1),
+                    'at': time.time(),
+                    'stack': entry[3],
+                })
+
+    def timed(self, name: str):
+        """Decorator form of `track` for socket handlers."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.track(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _start_watchdog(self) -> None:
+        with self.lock:
+            if self._watchdog is not None:
+                return
+            self._watchdog = threading.Thread(target=self._watch, name='profiler-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def _watch(self) -> None:
+        self._own_idents.add(threading.get_ident())
+        while True:
+            time.sleep(self.slow_threshold / 2)
+            now = time.perf_counter()
+            stuck = [(ident, e) for ident, e in list(self._in_flight.items())
+                     if e[3] is None and now - e[2] >= self.slow_threshold]
+            if not stuck:
+                continue
+            frames = sys._current_frames()
+            for ident, entry in stuck:
+                frame = frames.get(ident)
+                if frame is not None:
+                    entry[3] = traceback.format_stack(frame, limit=self.max_depth)
+
+    # ----- Sampling -----
+
+    def start(self, game_id: Optional[str] = None) -> None:
+        """Sample every thread (no game_id) or only threads working on `game_id`."""
+        with self.lock:
+            if game_id is None:
+                self._global = True
+            else:
+                self._games.add(game_id)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+                self._sampler.start()
+
+    def stop(self, game_id: Optional[str] = None) -> None:
+        """Stop sampling for one game, or entirely when no game_id is given. Collected samples are kept."""
+        with self.lock:
+            if game_id is None:
+                self._global = False
+                self._games.clear()
+            else:
+                self._games.discard(game_id)
+
+    def toggle(self) -> bool:
+        """Flip global sampling (used by the profiling signal). Returns the new state."""
+        if self.active:
+            self.stop()
+            return False
+        self.start()
+        return True
+
+    @property
+    def active(self) -> bool:
+        return self._global or bool(self._games)
+
+    def reset(self) -> None:
+        with self.lock:
+            self._samples.clear()
+            self._sample_count = 0
+            self._slow_calls.clear()
+
+    def _sample_loop(self) -> None:
+        self._own_idents.add(threading.get_ident())
+        while True:
+            with self.lock:
+                if not self.active:
+                    self._sampler = None
+                    return
+                sample_all, games = self._global, set(self._games)
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident in self._own_idents:
+                    continue
+                entry = self._in_flight.get(ident)
+                if not sample_all and not (entry and entry[1] in games):
+                    continue
+                root = thread_names.get(ident, str(ident))
+                if entry and entry[1]:
+                    root = f"{root};game:{entry[1]}"
+                self._record(root, frame)
+            time.sleep(self.sample_interval)
+
+    def _record(self, root: str, frame) -> None:
+        labels = []
+        depth = 0
+        while frame is not None and depth < self.max_depth:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                self._labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+            depth += 1
+        labels.append(root)
+        with self.lock:
+            self._samples[';'.join(reversed(labels))] += 1
+            self._sample_count += 1
+
+    # ----- Export -----
+
+    def folded(self) -> str:
+        with self.lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self._samples.most_common())
+
+    def slow_calls(self) -> List[Dict[str, Any]]:
+        return list(self._slow_calls)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            'sampling': {'global': self._global, 'games': sorted(self._games), 'samples': self._sample_count,
+                         'unique_stacks': len(self._samples), 'interval_ms': self.sample_interval * 1000},
+            'slow_threshold_ms': self.slow_threshold * 1000,
+            'in_flight': [{'name': e[0], 'game_id': e[1], 'elapsed_ms': round((now - e[2]) * 1000, 1)}
+                          for e in list(self._in_flight.values())],
+            'slow_calls': [{k: v for k, v in c.items() if k != 'stack'} for c in self.slow_calls()],
+        }
+
+
+def install_signal_toggle(profiler: Profiler, signal_name: str) -> bool:
+    """Toggle global sampling on `signal_name` (e.g. SIGUSR2). Must be called from the main thread."""
+    import signal
+    signum = getattr(signal, signal_name, None)
+    if signum is None:
+        log.warning("Profiling signal %s is not available on this platform.", signal_name)
+        return False
+
+    def _handler(_signum, _frame):
+        log.info("Profiler sampling %s (%s).", 'started' if profiler.toggle() else 'stopped', signal_name)
+
+    signal.signal(signum, _handler)
+    return True
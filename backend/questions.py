@@ -1,54 +1,364 @@
+import itertools
+import os
 import random
+import threading
+import time
+from array import array
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple, NamedTuple
 from . import config
+from .categories import CATEGORIES, classify, parse_categories
+from .log import get_logger
+
+log = get_logger(__name__)
+
+REQUIRED_COLUMNS = ['Question', 'Correct Answer', 'Wrong Answer 1', 'Wrong Answer 2', 'Wrong Answer 3', 'Difficulty']
+TEXT_COLUMNS = REQUIRED_COLUMNS[:-1]
+CATEGORY_COLUMN = 'Category'  # Optional; written by tag_questions.py as 'science|nature'
+# Every order the four answers can be shown in; a served question stores an index into this
+OPTION_PERMUTATIONS = tuple(itertools.permutations(range(4)))
+
+
+class QuestionRecord(NamedTuple):
+    """One bank row, built once per snapshot and shared by every game that draws it."""
+    id: int  # Row position in the bank snapshot
+    question: str
+    answers: Tuple[str, ...]  # Correct answer first
+    difficulty: int
+
+
+class RoundQuestion(NamedTuple):
+    """A shared record as one game serves it: the record plus the order its options are shown in."""
+    record: QuestionRecord
+    perm: int  # Index into OPTION_PERMUTATIONS
+
+    @property
+    def id(self) -> int:
+        return self.record.id
+
+    @property
+    def question(self) -> str:
+        return self.record.question
+
+    @property
+    def correct_answer(self) -> str:
+        return self.record.answers[0]
+
+    @property
+    def difficulty(self) -> int:
+        return self.record.difficulty
+
+    @property
+    def options(self) -> List[str]:
+        answers = self.record.answers
+        return [answers[i] for i in OPTION_PERMUTATIONS[self.perm]]
+
+    def public(self) -> Dict[str, Any]:
+        """What players may see while the question is open."""
+        return {'question': self.question, 'options': self.options, 'difficulty': self.difficulty}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'perm': self.perm, 'correct_answer': self.correct_answer, **self.public()}
+
+
+class QuestionBank:
+    """
+    Immutable snapshot of the question bank.
+
+    Columns are kept as flat numpy arrays and a difficulty -> row-position index is
+    built once per load, so sampling never scans or copies the bank. A snapshot is
+    never mutated after construction: reloads build a new one and swap it in, and
+    games that hold a reference keep using theirs until they end.
+
+    Topic filtering uses an inverted index from (category, difficulty) to row
+    positions, so a topic-filtered draw only touches the postings it needs. The
+    merged pool for a given (difficulty window, topics) is cached on the snapshot.
+
+    Drawn rows are interned as QuestionRecords on first use, so concurrent games
+    share one record per question instead of each holding its own copy.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], *, source: str, version: int, rejected_rows: int = 0) -> None:
+        self.source = source
+        self.version = version
+        self.rejected_rows = rejected_rows
+        self.loaded_at = time.time()
+        self.questions = columns['Question']
+        self.correct_answers = columns['Correct Answer']
+        self.wrong_answers = (columns['Wrong Answer 1'], columns['Wrong Answer 2'], columns['Wrong Answer 3'])
+        self.difficulties = columns['Difficulty']
+        self.by_difficulty: Dict[int, np.ndarray] = {
+            int(d): np.flatnonzero(self.difficulties == d) for d in np.unique(self.difficulties)
+        }
+        self.categories = columns.get(CATEGORY_COLUMN)  # object array of category lists per row
+        postings: Dict[Tuple[str, int], List[int]] = {}
+        if self.categories is not None:
+            for pos, (cats, d) in enumerate(zip(self.categories, self.difficulties.tolist())):
+                for category in cats:
+                    postings.setdefault((category, d), []).append(pos)
+        self.by_topic: Dict[Tuple[str, int], np.ndarray] = {key: np.asarray(v, dtype=np.intp) for key, v in postings.items()}
+        self._topic_pools: Dict[tuple, np.ndarray] = {}
+        self._records: Dict[int, QuestionRecord] = {}
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def positions_for(self, diff: Optional[int], tol: int, topics: Sequence[str] = ()) -> Optional[np.ndarray]:
+        """Row positions within [diff - tol, diff + tol] (and any of `topics`), or None for the whole bank."""
+        if topics:
+            return self._topic_pool(diff, tol, tuple(topics))
+        if diff is None:
+            return None
+        min_d, max_d = max(1, diff - tol), min(10, diff + tol)
+        parts = [self.by_difficulty[d] for d in range(min_d, max_d + 1) if d in self.by_difficulty]
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _topic_pool(self, diff: Optional[int], tol: int, topics: Tuple[str, ...]) -> np.ndarray:
+        key = (diff, tol, topics)
+        pool = self._topic_pools.get(key)
+        if pool is None:
+            levels = range(1, 11) if diff is None else range(max(1, diff - tol), min(10, diff + tol) + 1)
+            parts = [self.by_topic[(t, d)] for t in topics for d in levels if (t, d) in self.by_topic]
+            if not parts and diff is not None:
+                # Like the unfiltered case, a difficulty window with no matches widens to the whole (topic) pool
+                pool = self._topic_pool(None, 0, topics)
+            elif not parts:
+                pool = np.empty(0, dtype=np.intp)
+            elif len(parts) == 1 or len(topics) == 1:
+                pool = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            else:
+                pool = np.unique(np.concatenate(parts))  # A question tagged with two chosen topics counts once
+            self._topic_pools[key] = pool
+        return pool
+
+    def topic_size(self, topics: Sequence[str]) -> int:
+        """Questions available for `topics` at any difficulty."""
+        return len(self._topic_pool(None, 0, tuple(topics)))
+
+    def record(self, pos: int) -> QuestionRecord:
+        record = self._records.get(pos)
+        if record is None:
+            answers = (self.correct_answers[pos],) + tuple(col[pos] for col in self.wrong_answers)
+            # setdefault keeps whichever thread interned the row first
+            record = self._records.setdefault(pos, QuestionRecord(pos, self.questions[pos], answers, int(self.difficulties[pos])))
+        return record
+
+    def question_at(self, pos: int) -> RoundQuestion:
+        return RoundQuestion(self.record(pos), random.randrange(len(OPTION_PERMUTATIONS)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'rows': len(self),
+            'rejected_rows': self.rejected_rows,
+            'loaded_at': self.loaded_at,
+            'rows_by_difficulty': {d: len(p) for d, p in sorted(self.by_difficulty.items())},
+            'rows_by_category': {c: self.topic_size([c]) for c in CATEGORIES if self.categories is not None},
+            'interned_records': len(self._records),
+        }
+
+
+class GameQuestions:
+    """
+    The questions of one game: per round, the bank row id and option permutation
+    that were served, in two compact arrays (-1 marks a round not served yet).
+    Indexing resolves a round against the game's bank snapshot to a RoundQuestion.
+    """
+
+    def __init__(self, bank: QuestionBank, rounds: int = 0) -> None:
+        self.bank = bank
+        self.ids = array('i', [-1]) * rounds
+        self.perms = array('B', bytes(rounds))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, idx: int) -> Optional[RoundQuestion]:
+        qid = self.ids[idx]
+        return RoundQuestion(self.bank.record(qid), self.perms[idx]) if qid >= 0 else None
+
+    def __setitem__(self, idx: int, question: RoundQuestion) -> None:
+        self.ids[idx] = question.id
+        self.perms[idx] = question.perm
+
+    def extend(self, rounds: int) -> None:
+        """Make room for more rounds (battle royale runs until one player is left)."""
+        self.ids.extend(array('i', [-1]) * rounds)
+        self.perms.extend(bytes(rounds))
+
+    def to_state(self) -> List[Optional[Dict[str, Any]]]:
+        """JSON-safe form for the game journal; the question text lets `from_state` check the ids still match."""
+        return [{'id': qid, 'perm': perm, 'question': self.bank.questions[qid]} if qid >= 0 else None
+                for qid, perm in zip(self.ids, self.perms)]
+
+    @classmethod
+    def from_state(cls, bank: QuestionBank, items: Sequence[Optional[Dict[str, Any]]]) -> 'GameQuestions':
+        """
+        Rebuild from `to_state` output (or journal 'question' records). A round whose
+        id no longer names the same question in `bank` comes back unserved.
+        """
+        questions = cls(bank, len(items))
+        for idx, item in enumerate(items):
+            qid = item.get('id', -1) if isinstance(item, dict) else -1
+            if 0 <= qid < len(bank) and bank.questions[qid] == item.get('question'):
+                questions.ids[idx] = qid
+                questions.perms[idx] = item.get('perm', 0)
+        return questions
+
+
+def load_question_bank(path: str, *, version: int = 1, chunk_size: Optional[int] = None) -> QuestionBank:
+    """
+    Stream the CSV in chunks, validating rows as they arrive.
+
+    Only validated column arrays are retained between chunks, so peak memory is
+    one raw chunk plus the compact result rather than the whole raw file.
+    Banks without a Category column (not yet run through tag_questions.py) are
+    tagged with the keyword classifier as they load.
+    """
+    chunk_size = chunk_size or config.QUESTION_BANK_CHUNK_SIZE
+    parts: Dict[str, List[np.ndarray]] = {col: [] for col in REQUIRED_COLUMNS + [CATEGORY_COLUMN]}
+    rejected = 0
+    reader = pd.read_csv(path, chunksize=chunk_size, usecols=lambda c: c in REQUIRED_COLUMNS or c == CATEGORY_COLUMN,
+                         dtype=str, keep_default_na=False)
+    for chunk in reader:
+        text = chunk[TEXT_COLUMNS].apply(lambda col: col.str.strip())
+        difficulty = pd.to_numeric(chunk['Difficulty'], errors='coerce')
+        valid = (text != '').all(axis=1) & difficulty.between(1, 10) & (difficulty % 1 == 0)
+        rejected += int((~valid).sum())
+        for col in TEXT_COLUMNS:
+            parts[col].append(text.loc[valid, col].to_numpy(dtype=object))
+        parts['Difficulty'].append(difficulty[valid].to_numpy(dtype=np.int8))
+        if CATEGORY_COLUMN in chunk:
+            tags = [parse_categories(v) or ['general'] for v in chunk.loc[valid, CATEGORY_COLUMN]]
+        else:
+            tags = [classify(q, a) for q, a in zip(text.loc[valid, 'Question'], text.loc[valid, 'Correct Answer'])]
+        category_arr = np.empty(len(tags), dtype=object)
+        category_arr[:] = tags
+        parts[CATEGORY_COLUMN].append(category_arr)
+    columns = {
+        col: np.concatenate(arrs) if arrs else np.empty(0, dtype=np.int8 if col == 'Difficulty' else object)
+        for col, arrs in parts.items()
+    }
+    return QuestionBank(columns, source=path, version=version, rejected_rows=rejected)
+
+
+# --- Live bank (copy-on-write snapshot) ---
+_bank_lock = threading.Lock()
+_reload_lock = threading.Lock()
 
-# Load questions DataFrame once
 try:
-    questions_df = pd.read_csv(config.QUESTIONS_CSV_FILE)
+    _live_bank = load_question_bank(config.QUESTIONS_CSV_FILE)
 except FileNotFoundError:
     raise SystemExit(f"Error: {config.QUESTIONS_CSV_FILE} not found.")
+log.info("Question bank v%d loaded: %d questions (%d rejected).", _live_bank.version, len(_live_bank), _live_bank.rejected_rows)
 
 
-def get_random_questions(num: int, diff: Optional[int] = None, tol: int = 1) -> List[Dict[str, Any]]:
-    global questions_df
-    if questions_df is None or questions_df.empty:
-        print("Error: questions_df is not loaded or is empty. Cannot get random questions.")
-        return []
+def get_question_bank() -> QuestionBank:
+    """Return the current live snapshot. Callers may hold on to it for as long as they need."""
+    return _live_bank
 
-    available_questions = questions_df.copy()
-    if diff is not None:
-        min_d, max_d = max(1, diff - tol), min(10, diff + tol)
-        filtered = available_questions[(available_questions['Difficulty'] >= min_d) & (available_questions['Difficulty'] <= max_d)]
-        if len(filtered) >= num:
-            available_questions = filtered
-        elif not filtered.empty:
-            available_questions = filtered
-
-    if available_questions.empty:
-        print("Warning: No questions available for sampling (possibly after filtering).")
-        return []
 
-    sample_n = min(num, len(available_questions))
-    if sample_n == 0:
-        return []
+def reload_questions(path: Optional[str] = None, *, background: bool = True) -> bool:
+    """
+    Build a new bank from `path` and swap it in atomically.
+    Returns False if a reload is already running.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return False
 
-    needs_replacement = len(available_questions) < num
-    selected_df = available_questions.sample(n=sample_n, replace=needs_replacement)
+    def _build_and_swap():
+        global _live_bank
+        try:
+            source = path or config.QUESTIONS_CSV_FILE
+            new_bank = load_question_bank(source, version=_live_bank.version + 1)
+            if new_bank.empty:
+                log.warning("Question reload from %s produced no valid rows; keeping v%d.", source, _live_bank.version)
+                return
+            with _bank_lock:
+                _live_bank = new_bank
+            log.info("Question bank swapped to v%d: %d questions (%d rejected).", new_bank.version, len(new_bank), new_bank.rejected_rows)
+        except Exception:
+            log.exception("Question reload failed, keeping v%d", _live_bank.version)
+        finally:
+            _reload_lock.release()
+
+    if background:
+        threading.Thread(target=_build_and_swap, name='question-bank-reload', daemon=True).start()
+    else:
+        _build_and_swap()
+    return True
+
+
+class QuestionBankWatcher:
+    """Polls the bank file and triggers a reload once a change has settled."""
 
-    q_list = []
-    for _, row in selected_df.iterrows():
+    def __init__(self, path: Optional[str] = None, interval: Optional[float] = None) -> None:
+        self.path = path or config.QUESTIONS_CSV_FILE
+        self.interval = interval or config.QUESTION_BANK_WATCH_INTERVAL
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_sig = self._signature()
+
+    def _signature(self):
         try:
-            options = [row['Correct Answer'], row['Wrong Answer 1'], row['Wrong Answer 2'], row['Wrong Answer 3']]
-            random.shuffle(options)
-            q_list.append({
-                'question': row['Question'],
-                'options': options,
-                'correct_answer': row['Correct Answer'],
-                'difficulty': int(row['Difficulty'])
-            })
-        except KeyError as e:
-            print(f"Error processing question row (missing key {e}): {row.to_dict()}")
-            continue
-    return q_list
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='question-bank-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        pending_sig = None
+        while not self._stop.wait(self.interval):
+            sig = self._signature()
+            if sig is None or sig == self._last_sig:
+                pending_sig = None
+                continue
+            # Wait one more interval with an unchanged signature so half-written files are skipped
+            if sig != pending_sig:
+                pending_sig = sig
+                continue
+            self._last_sig = sig
+            pending_sig = None
+            log.info("Question bank file %s changed; reloading.", self.path)
+            reload_questions(self.path)
+
+
+def get_random_questions(num: int, diff: Optional[int] = None, tol: int = 1, bank: Optional[QuestionBank] = None,
+                         topics: Sequence[str] = ()) -> List[RoundQuestion]:
+    if bank is None:
+        bank = _live_bank
+    if bank is None or bank.empty:
+        log.error("Question bank is not loaded or is empty. Cannot get random questions.")
+        return []
+
+    positions = bank.positions_for(diff, tol, topics)
+    pool_size = len(bank) if positions is None else len(positions)
+
+    sample_n = min(num, pool_size)
+    if sample_n == 0:
+        return []
 
+    needs_replacement = pool_size < num
+    if needs_replacement:
+        picks = [random.randrange(pool_size) for _ in range(sample_n)]
+    else:
+        picks = random.sample(range(pool_size), sample_n)
+    if positions is not None:
+        picks = [int(positions[i]) for i in picks]
+    return [bank.question_at(pos) for pos in picks]
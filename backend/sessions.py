@@ -0,0 +1,124 @@
+import heapq
+import secrets
+import time
+from threading import RLock
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+
+class SessionManager:
+    """
+    Tracks resumable session tokens and the socket currently holding each one.
+
+    A token is issued with `connection_ack`. When the socket drops, the session is
+    parked for `grace_period` seconds instead of being discarded; a reconnect that
+    presents the token within that window takes the slot back. Expiry is handled by
+    one periodic sweep over a deadline heap rather than a timer per session, so a
+    reconnect storm costs O(log n) per disconnect and no extra threads.
+
+    External dependencies are injected:
+      - on_expire(token, last_sid) -> None, called (outside the lock) for sessions whose grace period ran out
+    """
+
+    def __init__(self, *, grace_period: float, on_expire: Optional[Callable[[str, str], None]] = None) -> None:
+        self.grace_period = grace_period
+        self.on_expire = on_expire
+        self.lock = RLock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}  # token -> {'sid', 'disconnected_at'}
+        self._token_by_sid: Dict[str, str] = {}
+        self._deadlines: List[Tuple[float, str]] = []  # (expires_at, token); stale entries are skipped lazily
+        self._reaper_started = False
+
+    # ----- Public API -----
+
+    def issue(self, sid: str) -> str:
+        token = secrets.token_urlsafe(16)
+        with self.lock:
+            self._sessions[token] = {'sid': sid, 'disconnected_at': None}
+            self._token_by_sid[sid] = token
+        return token
+
+    def adopt(self, token: str, sid: str) -> None:
+        """Register a session restored from disk as parked on `sid`, so the client can resume it."""
+        with self.lock:
+            now = time.monotonic()
+            self._sessions[token] = {'sid': sid, 'disconnected_at': now}
+            heapq.heappush(self._deadlines, (now + self.grace_period, token))
+
+    def token_for_sid(self, sid: str) -> Optional[str]:
+        return self._token_by_sid.get(sid)
+
+    def park(self, sid: str) -> Optional[str]:
+        """Start the grace period for the session held by `sid`. Returns its token, if any."""
+        with self.lock:
+            token = self._token_by_sid.pop(sid, None)
+            if not token or token not in self._sessions:
+                return None
+            now = time.monotonic()
+            self._sessions[token]['disconnected_at'] = now
+            heapq.heappush(self._deadlines, (now + self.grace_period, token))
+            return token
+
+    def resume(self, token: str, new_sid: str) -> Optional[str]:
+        """Move a parked session to `new_sid`. Returns the sid it was previously bound to."""
+        with self.lock:
+            session = self._sessions.get(token)
+            if not session:
+                return None
+            old_sid = session['sid']
+            if session['disconnected_at'] is None:
+                # Still attached (the old socket has not timed out yet); take it over
+                self._token_by_sid.pop(old_sid, None)
+            session['sid'] = new_sid
+            session['disconnected_at'] = None
+            self._token_by_sid[new_sid] = token
+            return old_sid
+
+    def discard(self, token: str) -> None:
+        with self.lock:
+            session = self._sessions.pop(token, None)
+            if session and self._token_by_sid.get(session['sid']) == token:
+                del self._token_by_sid[session['sid']]
+
+    def sweep(self) -> int:
+        """Expire sessions whose grace period has elapsed. Returns the number expired."""
+        expired = []
+        now = time.monotonic()
+        with self.lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, token = heapq.heappop(self._deadlines)
+                session = self._sessions.get(token)
+                # Skip entries for sessions that were resumed (or re-parked later) since this deadline was pushed
+                if not session or session['disconnected_at'] is None or session['disconnected_at'] + self.grace_period > now:
+                    continue
+                del self._sessions[token]
+                expired.append((token, session['sid']))
+        for token, sid in expired:
+            if self.on_expire:
+                try:
+                    self.on_expire(token, sid)
+                except Exception:
+                    log.exception("Session expiry callback error", extra={'sid': sid})
+        return len(expired)
+
+    def start_reaper(self, socketio, interval: float = 1.0) -> None:
+        """Run `sweep` periodically as a SocketIO background task (started once)."""
+        with self.lock:
+            if self._reaper_started:
+                return
+            self._reaper_started = True
+
+        def _loop():
+            while True:
+                socketio.sleep(interval)
+                self.sweep()
+
+        socketio.start_background_task(_loop)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            parked = sum(1 for s in self._sessions.values() if s['disconnected_at'] is not None)
+            return {'sessions': len(self._sessions), 'parked': parked}
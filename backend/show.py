@@ -0,0 +1,565 @@
+import itertools
+import queue
+import time
+from threading import Event, Lock, RLock
+from typing import Callable, Dict, Any, Optional, List
+
+import numpy as np
+
+from .log import get_logger
+from .payloads import PreEncoded
+from .questions import RoundQuestion
+
+log = get_logger(__name__)
+
+SCHEDULED, RUNNING, FINISHED = 'scheduled', 'running', 'finished'
+
+REJECT_REASONS = ('not_joined', 'closed', 'eliminated', 'invalid', 'duplicate', 'late')
+_REJECT_MESSAGES = {
+    'not_joined': "You are not playing in this show.",
+    'closed': "No question is open.",
+    'eliminated': "You are out of this show, but you can keep watching.",
+    'invalid': "Invalid answer.",
+    'duplicate': "Already answered.",
+    'late': "Too late for this question.",
+    'busy': "The show is too busy to take your answer, please try again.",
+}
+
+
+class ShardedCounter:
+    """
+    A row of counters that several threads add to without a lock.
+
+    There is one shard (a plain list) per writer, and each writer only ever adds to
+    its own shard, so no increment is lost. The show's answer workers are the
+    writers: worker `i` owns shard `i`. Reads sum the shards, so their cost does not
+    depend on how many answers there were.
+    """
+
+    def __init__(self, size: int, shards: int = 1) -> None:
+        self.size = size
+        self._shards: List[List[int]] = [[0] * size for _ in range(max(1, shards))]
+
+    def add(self, index: int, shard: int, n: int = 1) -> None:
+        self._shards[shard][index] += n
+
+    def totals(self) -> List[int]:
+        return [sum(column) for column in zip(*self._shards)]
+
+
+class ShowRound:
+    """One question of a show: its own answer arrays, so a late write can never leak into the next question."""
+
+    __slots__ = ('number', 'question', 'options', 'option_index', 'correct', 'sent_at', 'open', 'drained',
+                 'answers', 'elapsed', 'tally')
+
+    def __init__(self, number: int, question: RoundQuestion, players: int, shards: int) -> None:
+        self.number = number
+        self.question = question
+        self.options = question.options
+        self.option_index = {option: i for i, option in enumerate(self.options)}
+        self.correct = self.option_index[question.correct_answer]
+        self.sent_at = 0.0
+        self.open = False  # Taking new answers
+        self.drained = False  # Closed, and every answer that arrived while open has been written
+        self.answers = np.full(players, -1, dtype=np.int8)  # Option index per player slot, -1 = no answer
+        self.elapsed = np.zeros(players, dtype=np.float32)
+        self.tally = ShardedCounter(len(self.options), shards)
+
+
+class LiveShow:
+    """
+    A scheduled HQ-style show: every player gets the same question at the same time.
+
+    Players join while the show is scheduled and get a slot in a set of flat arrays
+    (alive, score, correct answers) that are allocated once, at the start. Each
+    question is one broadcast to the show's room. Answers are written by the
+    manager's answer workers without a lock. A slot always goes to the same worker,
+    so checking and claiming a slot's answer never races. The answer lands in the
+    round's answer array and in the worker's own shard of a `ShardedCounter` of
+    per-option counts. That counter feeds the coalesced `show_tally` broadcasts, a
+    few per second. The reveal closes the round and settles it in one vectorized
+    pass: scores and eliminations are updated and the per-option counts are taken
+    from the answer array. With `elimination` on, a wrong or missing answer knocks
+    a player out. A question nobody still in gets right eliminates no one.
+    """
+
+    def __init__(
+        self,
+        show_id: str,
+        *,
+        name: str,
+        starts_at: float,
+        questions: int,
+        question_duration: float,
+        elimination: bool,
+        shards: int = 1,
+    ) -> None:
+        self.id = show_id
+        self.name = name
+        self.starts_at = starts_at  # time.time()
+        self.total_questions = questions
+        self.duration = question_duration
+        self.elimination = elimination
+        self.shards = shards  # One per answer worker
+        self.state = SCHEDULED
+        self.questions: List[RoundQuestion] = []
+        self.round: Optional[ShowRound] = None
+        # Registration (append-only until the start; a slot is never reused)
+        self.usernames: List[str] = []
+        self.slots: Dict[str, int] = {}  # sid -> slot
+        self.left: set = set()
+        # Per-slot state, allocated at the start
+        self.alive = np.zeros(0, dtype=bool)
+        self.score = np.zeros(0, dtype=np.int32)
+        self.correct = np.zeros(0, dtype=np.int16)
+        self.rejected = ShardedCounter(len(REJECT_REASONS), shards)
+        self.history: List[Dict[str, Any]] = []
+        self.winners: List[Dict[str, Any]] = []
+        self.finished_at: Optional[float] = None
+        self.final_players: Optional[int] = None  # Set by release(), once the roster is gone
+        self.final_survivors: Optional[int] = None
+
+    @property
+    def room(self) -> str:
+        return f"show:{self.id}"
+
+    @property
+    def players(self) -> int:
+        if self.final_players is not None:
+            return self.final_players
+        return len(self.usernames) - len(self.left)
+
+    @property
+    def survivors(self) -> int:
+        if self.final_survivors is not None:
+            return self.final_survivors
+        return int(self.alive.sum()) if self.state != SCHEDULED else self.players
+
+    def allocate(self) -> None:
+        n = len(self.usernames)
+        self.alive = np.ones(n, dtype=bool)
+        if self.left:
+            self.alive[list(self.left)] = False
+        self.score = np.zeros(n, dtype=np.int32)
+        self.correct = np.zeros(n, dtype=np.int16)
+
+    def release(self) -> None:
+        """Drop the roster, per-slot arrays and questions of a finished show; its summary, history and winners stay."""
+        self.final_players, self.final_survivors = self.players, self.survivors
+        self.usernames, self.slots, self.left = [], {}, set()
+        self.alive = np.zeros(0, dtype=bool)
+        self.score = np.zeros(0, dtype=np.int32)
+        self.correct = np.zeros(0, dtype=np.int16)
+        self.questions = []
+        self.round = None
+
+    def answer(self, sid: str, slot: Optional[int], rnd: Optional[ShowRound], answer, received_at: float,
+               elapsed_for: Callable[[str, float, float], float], shard: int) -> Optional[str]:
+        """
+        Write one answer into `rnd`, the round that was open when it arrived; returns the reject
+        reason, or None if accepted. Only the worker owning `shard` may call this for `slot`.
+        """
+        if slot is None:
+            return 'not_joined'
+        if rnd is None or rnd.drained:
+            return 'closed'
+        if not self.alive[slot]:
+            return 'eliminated'
+        option = rnd.option_index.get(answer) if isinstance(answer, str) else answer
+        # type() rather than isinstance(): a JSON true/false is a bool, which isinstance would take as 1/0
+        if type(option) is not int or not 0 <= option < len(rnd.options):
+            return 'invalid'
+        if rnd.answers[slot] >= 0:
+            return 'duplicate'
+        elapsed = elapsed_for(sid, rnd.sent_at, received_at)
+        if elapsed > self.duration:
+            return 'late'
+        rnd.answers[slot] = option
+        rnd.elapsed[slot] = elapsed
+        rnd.tally.add(option, shard)
+        return None
+
+    def settle(self, rnd: ShowRound, points_base: int) -> Dict[str, Any]:
+        """Score a closed round over the whole roster at once."""
+        answers = rnd.answers
+        answered = answers >= 0
+        counts = np.bincount(answers[answered], minlength=len(rnd.options))
+        right = answers == rnd.correct
+        points = (np.maximum(0.1, (self.duration - rnd.elapsed) / self.duration) * points_base).astype(np.int32)
+        self.score += np.where(right, points, 0)
+        self.correct += right
+        before = int(self.alive.sum())
+        if self.elimination:
+            survivors = self.alive & right
+            if survivors.any():
+                self.alive = survivors
+        after = int(self.alive.sum())
+        return {
+            'question_number': rnd.number,
+            'correct_answer': rnd.question.correct_answer,
+            'counts': counts.tolist(),
+            'answered': int(answered.sum()),
+            'correct': int(right.sum()),
+            'survivors': after,
+            'eliminated': before - after,
+        }
+
+    def standings(self, limit: int) -> List[Dict[str, Any]]:
+        """Players still in (everyone, without elimination), best score first."""
+        candidates = np.flatnonzero(self.alive)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-self.score[candidates], limit - 1)[:limit]]
+        order = candidates[np.argsort(-self.score[candidates], kind='stable')]
+        return [{'username': self.usernames[i], 'score': int(self.score[i]), 'correct': int(self.correct[i])} for i in order]
+
+    def status_for(self, sid: str) -> Dict[str, Any]:
+        slot = self.slots.get(sid)
+        status = self.summary()
+        if slot is not None and self.state != SCHEDULED:
+            status['you'] = {'alive': bool(self.alive[slot]), 'score': int(self.score[slot]), 'correct': int(self.correct[slot])}
+        return status
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'show_id': self.id, 'name': self.name, 'state': self.state,
+            'starts_in': max(0, round(self.starts_at - time.time())) if self.state == SCHEDULED else 0,
+            'players': self.players,
+            'survivors': self.survivors,
+            'question_number': self.round.number if self.round else 0,
+            'total_questions': self.total_questions,
+            'elimination': self.elimination,
+        }
+
+
+class ShowManager:
+    """
+    Schedules live shows and runs each one on its own background task.
+
+    A show's task waits for the start time, sending a `show_update` to the show
+    room at most once per `update_interval` while people join. Updates are never
+    sent per join, which would mean players-squared messages. Then, for every
+    question, it broadcasts `show_question`, sends `show_tally` every
+    `tally_interval` while answers come in (only when the counts moved), closes
+    the round after the question's duration plus the largest latency credit,
+    broadcasts `show_reveal` and waits `results_time`. Every broadcast is a
+    PreEncoded payload, so it is encoded once however many players there are.
+    Questions are drawn when the show starts and served easiest first. A finished
+    show lets go of its roster right after `show_over`. Only the last
+    `finished_kept` finished shows are listed; older ones are dropped.
+
+    Answers come in through `submit`, which is stamped with the arrival time and
+    only queues the answer. A fixed set of `intake_workers` write them into the
+    round; a slot is always routed to the same worker. The queues hold at most
+    `intake_capacity` answers in all, and an answer that finds its queue full is
+    refused as busy. Closing a round waits for the workers to catch up with
+    everything that arrived while it was open, so time spent queued never counts
+    against a player.
+
+    External dependencies are injected:
+      - socketio: emits, `server.enter_room`/`leave_room`/`close_room`, `sleep`, `start_background_task`
+      - latency: LatencyTracker, for compensated answer times
+      - draw_questions(n) -> List[RoundQuestion]
+    """
+
+    def __init__(
+        self,
+        *,
+        socketio,
+        namespace: str,
+        latency,
+        draw_questions: Callable[[int], List[RoundQuestion]],
+        points_base: int,
+        question_duration: float,
+        results_time: float,
+        tally_interval: float,
+        update_interval: float = 1.0,
+        elimination: bool = True,
+        winners_listed: int = 100,
+        finished_kept: int = 20,
+        intake_workers: int = 4,
+        intake_capacity: int = 100000,
+    ) -> None:
+        self.socketio = socketio
+        self.namespace = namespace
+        self.latency = latency
+        self.draw_questions = draw_questions
+        self.points_base = points_base
+        self.question_duration = question_duration
+        self.results_time = results_time
+        self.tally_interval = tally_interval
+        self.update_interval = update_interval
+        self.elimination = elimination
+        self.winners_listed = winners_listed
+        self.finished_kept = finished_kept
+        self.lock = RLock()
+        self._shows: Dict[str, LiveShow] = {}
+        self._show_of: Dict[str, str] = {}  # sid -> show_id
+        self._ids = itertools.count(1)
+        workers = max(1, intake_workers)
+        self._intake = [queue.Queue(maxsize=max(1, intake_capacity // workers)) for _ in range(workers)]
+        self._intake_lock = Lock()
+        self._intake_started = False
+        self.intake_dropped = 0
+
+    # ----- Public API -----
+
+    def create(self, *, name: str, starts_in: float, questions: int, question_duration: Optional[float] = None,
+               elimination: Optional[bool] = None) -> LiveShow:
+        duration = self.question_duration if question_duration is None else question_duration
+        if questions < 1 or duration <= 0 or starts_in < 0:
+            raise ValueError("questions must be at least 1, question_duration positive and starts_in not negative")
+        with self.lock:
+            show = LiveShow(f"s{next(self._ids)}", name=name or f"Live show {len(self._shows) + 1}",
+                            starts_at=time.time() + starts_in, questions=questions, question_duration=duration,
+                            elimination=self.elimination if elimination is None else elimination,
+                            shards=len(self._intake))
+            self._shows[show.id] = show
+        log.info("Show %s scheduled in %ds with %d questions", show.id, starts_in, questions, extra={'event': 'show_created'})
+        self._start_intake()
+        self.socketio.start_background_task(self._run, show)
+        return show
+
+    def get(self, show_id: str) -> Optional[LiveShow]:
+        return self._shows.get(show_id)
+
+    def next_show(self) -> Optional[LiveShow]:
+        scheduled = [s for s in self._shows.values() if s.state == SCHEDULED]
+        return min(scheduled, key=lambda s: s.starts_at) if scheduled else None
+
+    def join(self, show_id: Optional[str], sid: str, username: str) -> Optional[str]:
+        """None on success, otherwise why the join was refused. Without a show id, joins the next scheduled show."""
+        with self.lock:
+            show = self._shows.get(show_id) if show_id else self.next_show()
+            if show is None:
+                return "No such show." if show_id else "No show is scheduled."
+            if sid in self._show_of:
+                return "You have already joined a show."
+            if show.state != SCHEDULED:
+                return "This show has already started."
+            show.slots[sid] = len(show.usernames)
+            show.usernames.append(username)
+            self._show_of[sid] = show.id
+            self.socketio.server.enter_room(sid, show.room, namespace=self.namespace)
+        self.socketio.emit('show_update', show.status_for(sid), room=sid, namespace=self.namespace)
+        return None
+
+    def is_joined(self, sid: str) -> bool:
+        return sid in self._show_of
+
+    def rebind(self, old_sid: str, new_sid: str) -> None:
+        """A player reconnected with their session token under a new sid; they keep their slot."""
+        with self.lock:
+            show_id = self._show_of.pop(old_sid, None)
+            show = self._shows.get(show_id) if show_id else None
+            if show is None or old_sid not in show.slots:
+                return
+            show.slots[new_sid] = show.slots.pop(old_sid)
+            self._show_of[new_sid] = show.id
+            self.socketio.server.enter_room(new_sid, show.room, namespace=self.namespace)
+        self.socketio.emit('show_update', show.status_for(new_sid), room=new_sid, namespace=self.namespace)
+
+    def leave(self, sid: str) -> bool:
+        """Drop a player (left, or disconnected for good). Once the show runs their slot stays, and they are out after the next question."""
+        with self.lock:
+            show_id = self._show_of.pop(sid, None)
+            show = self._shows.get(show_id) if show_id else None
+            if show is None:
+                return False
+            slot = show.slots.pop(sid, None)
+            if slot is not None and show.state == SCHEDULED:
+                show.left.add(slot)
+            self.socketio.server.leave_room(sid, show.room, namespace=self.namespace)
+        return True
+
+    def submit(self, sid: str, answer, received_at: Optional[float] = None) -> Optional[str]:
+        """
+        Queue an answer for the answer workers; None if queued, otherwise a message for the player.
+        Pass `received_at` as close to the answer's arrival as possible. A refusal for a queued
+        answer is sent to the player as an `error_message` by the worker.
+        """
+        received_at = time.monotonic() if received_at is None else received_at
+        show = self._shows.get(self._show_of.get(sid, ''))
+        if show is None:
+            return _REJECT_MESSAGES['not_joined']
+        slot = show.slots.get(sid)
+        rnd = show.round
+        inbox = self._intake[(slot if slot is not None else hash(sid)) % len(self._intake)]
+        try:
+            inbox.put_nowait((show, sid, slot, rnd if rnd is not None and rnd.open else None, answer, received_at))
+        except queue.Full:
+            with self._intake_lock:
+                self.intake_dropped += 1
+            return _REJECT_MESSAGES['busy']
+        return None
+
+    def intake_depth(self) -> int:
+        return sum(inbox.qsize() for inbox in self._intake)
+
+    def start_now(self, show_id: str) -> Optional[str]:
+        with self.lock:
+            show = self._shows.get(show_id)
+            if show is None:
+                return "No such show."
+            if show.state != SCHEDULED:
+                return "This show has already started."
+            show.starts_at = time.time()
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            shows = list(self._shows.values())
+        return {
+            'joined': len(self._show_of),
+            'intake': {'workers': len(self._intake), 'depth': self.intake_depth(), 'dropped_busy': self.intake_dropped},
+            'shows': [self.show_stats(show) for show in shows],
+        }
+
+    def show_stats(self, show: LiveShow) -> Dict[str, Any]:
+        stats = show.summary()
+        stats['rejected'] = dict(zip(REJECT_REASONS, show.rejected.totals()))
+        stats['rounds'] = list(show.history)
+        rnd = show.round
+        if rnd is not None and rnd.open:
+            stats['live_tally'] = rnd.tally.totals()
+        if show.state == FINISHED:
+            stats['winners'] = show.winners
+        return stats
+
+    # ----- Answer workers -----
+
+    def _start_intake(self) -> None:
+        with self._intake_lock:
+            if self._intake_started:
+                return
+            self._intake_started = True
+        for shard in range(len(self._intake)):
+            self.socketio.start_background_task(self._answer_worker, shard)
+
+    def _answer_worker(self, shard: int) -> None:
+        inbox = self._intake[shard]
+        while True:
+            item = inbox.get()
+            if isinstance(item, Event):
+                item.set()  # A drain marker: everything queued before it is written
+                continue
+            show, sid, slot, rnd, answer, received_at = item
+            try:
+                reason = show.answer(sid, slot, rnd, answer, received_at, self.latency.compensated_elapsed, shard)
+                if reason is not None:
+                    show.rejected.add(REJECT_REASONS.index(reason), shard)
+                    self.socketio.emit('error_message', {'message': _REJECT_MESSAGES[reason]}, room=sid,
+                                       namespace=self.namespace)
+            except Exception:
+                log.exception("Show %s answer error", show.id)
+
+    def _drain_intake(self, timeout: float) -> None:
+        """Wait until every answer queued so far has been written."""
+        deadline = time.monotonic() + timeout
+        markers = []
+        for inbox in self._intake:
+            marker = Event()
+            try:
+                inbox.put(marker, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                log.warning("Show answer queue still full after %.1fs", timeout)
+                continue
+            markers.append(marker)
+        for marker in markers:
+            if not marker.wait(max(0.0, deadline - time.monotonic())):
+                log.warning("Show answer workers did not catch up within %.1fs", timeout)
+                return
+
+    # ----- Show task -----
+
+    def _run(self, show: LiveShow) -> None:
+        try:
+            self._await_start(show)
+            self._start(show)
+            for number, question in enumerate(show.questions, start=1):
+                self._ask(show, number, question)
+                self.socketio.sleep(self.results_time)
+            self._finish(show)
+        except Exception:
+            log.exception("Show %s failed", show.id)
+
+    def _await_start(self, show: LiveShow) -> None:
+        last_players = None
+        while time.time() < show.starts_at:
+            if show.players != last_players:
+                last_players = show.players
+                self._broadcast(show, 'show_update', show.summary())
+            self.socketio.sleep(min(self.update_interval, max(0.01, show.starts_at - time.time())))
+
+    def _start(self, show: LiveShow) -> None:
+        with self.lock:
+            show.state = RUNNING
+            show.allocate()
+        show.questions = sorted(self.draw_questions(show.total_questions), key=lambda q: q.difficulty)
+        show.total_questions = len(show.questions)
+        log.info("Show %s starting with %d players", show.id, show.players, extra={'event': 'show_started'})
+        self._broadcast(show, 'show_update', show.summary())
+
+    def _ask(self, show: LiveShow, number: int, question: RoundQuestion) -> None:
+        rnd = ShowRound(number, question, len(show.usernames), show.shards)
+        payload = PreEncoded({
+            'show_id': show.id, 'question_number': number, 'total_questions': show.total_questions,
+            'duration': show.duration, 'survivors': int(show.alive.sum()), **question.public(),
+        })
+        rnd.sent_at = time.monotonic()
+        rnd.open = True
+        show.round = rnd
+        self._broadcast(show, 'show_question', payload)
+
+        closes_at = rnd.sent_at + show.duration + 2 * self.latency.max_one_way
+        last_counts = None
+        tally_emits = 0
+        while True:
+            now = time.monotonic()
+            if now >= closes_at:
+                break
+            self.socketio.sleep(min(self.tally_interval, closes_at - now))
+            counts = rnd.tally.totals()
+            if counts != last_counts:
+                last_counts = counts
+                tally_emits += 1
+                self._broadcast(show, 'show_tally', PreEncoded({
+                    'show_id': show.id, 'question_number': number, 'counts': counts, 'answered': sum(counts)}))
+        rnd.open = False
+        self._drain_intake(show.duration)
+        rnd.drained = True
+
+        started = time.perf_counter()
+        result = show.settle(rnd, self.points_base)
+        settle_ms = (time.perf_counter() - started) * 1000
+        self._broadcast(show, 'show_reveal', PreEncoded(dict(result, show_id=show.id)))
+        show.history.append(dict(result, settle_ms=round(settle_ms, 3), tally_emits=tally_emits))
+        log.info("Show %s question %d: %d answered, %d correct, %d still in (settled in %.1fms)", show.id, number,
+                 result['answered'], result['correct'], result['survivors'], settle_ms, extra={'event': 'show_reveal'})
+
+    def _finish(self, show: LiveShow) -> None:
+        show.winners = show.standings(self.winners_listed)
+        with self.lock:
+            show.state = FINISHED
+            show.finished_at = time.time()
+            show.round = None
+            for sid in show.slots:
+                self._show_of.pop(sid, None)
+        self._broadcast(show, 'show_over', PreEncoded({
+            'show_id': show.id, 'name': show.name, 'winners': show.winners,
+            'winner_count': show.survivors, 'players': show.players,
+        }))
+        self.socketio.server.close_room(show.room, namespace=self.namespace)
+        log.info("Show %s finished: %d winner(s) of %d players", show.id, show.survivors, show.players,
+                 extra={'event': 'show_over'})
+        with self.lock:
+            show.release()
+            finished = sorted((s for s in self._shows.values() if s.state == FINISHED), key=lambda s: s.finished_at)
+            for old in finished[:max(0, len(finished) - self.finished_kept)]:
+                del self._shows[old.id]
+
+    def _broadcast(self, show: LiveShow, event: str, payload) -> None:
+        try:
+            self.socketio.emit(event, payload, room=show.room, namespace=self.namespace)
+        except Exception as e:
+            log.warning("Show %s emit error: %s", show.id, e)
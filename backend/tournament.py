@@ -0,0 +1,356 @@
+import itertools
+import math
+import time
+from collections import deque
+from threading import RLock
+from typing import Callable, Dict, Any, Optional, List
+
+from .log import get_logger
+from .payloads import PreEncoded
+
+log = get_logger(__name__)
+
+REGISTRATION, RUNNING, FINISHED = 'registration', 'running', 'finished'
+
+
+def seed_matches(entrants: List[Dict[str, Any]], match_size: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split entrants into the fewest matches of at most `match_size`, snake-seeded by
+    rating (1st, 2nd, ... kth, then kth ... 1st) so every match gets a similar spread.
+    """
+    count = max(1, math.ceil(len(entrants) / match_size))
+    matches: List[List[Dict[str, Any]]] = [[] for _ in range(count)]
+    ordered = sorted(entrants, key=lambda e: e['rating'], reverse=True)
+    for i, entrant in enumerate(ordered):
+        lap, pos = divmod(i, count)
+        matches[pos if lap % 2 == 0 else count - 1 - pos].append(entrant)
+    return matches
+
+
+class Tournament:
+    """One bracketed event: registrants, the current round's matches and the running standings."""
+
+    def __init__(self, tournament_id: str, *, name: str, mode: str, match_size: int, advance: int, bot_difficulty: str) -> None:
+        self.id = tournament_id
+        self.name = name
+        self.mode = mode
+        self.match_size = match_size
+        self.advance = advance
+        self.bot_difficulty = bot_difficulty
+        self.state = REGISTRATION
+        self.round = 0
+        self.final = False  # The current round is a single match that decides the champion
+        self.registrants: Dict[str, Dict[str, Any]] = {}  # {username: entrant}; usernames are unique per tournament
+        self.sid_to_username: Dict[str, str] = {}
+        self.pending: Dict[int, List[Dict[str, Any]]] = {}  # {match number: entrants} not finished this round
+        self.advancing: List[Dict[str, Any]] = []
+        self.champion: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def room(self) -> str:
+        return f"tournament:{self.id}"
+
+    def standings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Furthest round reached first, then total score over every match played."""
+        rows = sorted(self.registrants.values(),
+                      key=lambda e: (e['username'] != self.champion, -e['reached_round'], -e['total_score']))
+        return [{k: e[k] for k in ('username', 'status', 'reached_round', 'matches', 'wins', 'total_score', 'best_place')}
+                for e in rows[:limit]]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'tournament_id': self.id, 'name': self.name, 'mode': self.mode, 'state': self.state,
+            'round': self.round, 'registrants': len(self.registrants),
+            'still_in': sum(1 for e in self.registrants.values() if e['status'] in ('registered', 'playing', 'advanced')),
+            'matches_remaining': len(self.pending), 'champion': self.champion,
+        }
+
+
+class TournamentManager:
+    """
+    Runs tournaments as rounds of concurrent matches on top of the normal game flow.
+
+    Registrants of a tournament are snake-seeded by rating into matches of up to
+    `match_size`. Every match is an ordinary game started through `create_match`;
+    when it ends (`on_game_end`, from the game-over hook) its top `advance` humans go
+    through and the standings are updated from that one leaderboard. Once all of a
+    round's matches are in, the next round is seeded from the players who went
+    through, until a round fits in one match: its winner is the champion.
+
+    Match starts are never bursty: every match waits in one launch queue shared by
+    all tournaments and a launcher task starts one every `stagger` seconds (at most
+    `max_concurrent` tournament games at a time, if set). Since games then run on
+    fixed question/result timers, the offset carries through the whole match and
+    questions, reveals and bot timers of different matches stay spread out.
+
+    External dependencies are injected:
+      - socketio: emits (`tournament_update` to the tournament room) and `server.enter_room`
+      - ratings: RatingStore, for seeding
+      - create_match(mode, players: Dict[sid, entrant], bot_difficulty, tag) -> game_id or None
+    """
+
+    def __init__(
+        self,
+        *,
+        socketio,
+        namespace: str,
+        ratings,
+        create_match: Callable[[str, Dict[str, Dict[str, Any]], str, Dict[str, Any]], Optional[str]],
+        stagger: float,
+        max_concurrent: int = 0,
+        round_break: float = 10.0,
+    ) -> None:
+        self.socketio = socketio
+        self.namespace = namespace
+        self.ratings = ratings
+        self.create_match = create_match
+        self.stagger = stagger
+        self.max_concurrent = max_concurrent
+        self.round_break = round_break
+        self.lock = RLock()
+        self._tournaments: Dict[str, Tournament] = {}
+        self._sid_tournament: Dict[str, str] = {}
+        self._launch_queue = deque()  # (not_before, tournament_id, round, match number)
+        self._running: Dict[str, tuple] = {}  # {game_id: (tournament_id, round, match number)}
+        self._ids = itertools.count(1)
+        self._launcher_started = False
+        self.matches_started = 0
+
+    # ----- Public API -----
+
+    def create(self, *, name: str, mode: str, match_size: int, advance: int, bot_difficulty: str) -> Tournament:
+        if match_size < 2 or not 1 <= advance < match_size:
+            raise ValueError("match_size must be at least 2 and advance between 1 and match_size - 1")
+        with self.lock:
+            tournament = Tournament(f"t{next(self._ids)}", name=name or f"Tournament {len(self._tournaments) + 1}", mode=mode,
+                                    match_size=match_size, advance=advance, bot_difficulty=bot_difficulty)
+            self._tournaments[tournament.id] = tournament
+        log.info("Tournament %s created (%s, matches of %d, top %d advance)", tournament.id, mode, match_size, advance,
+                 extra={'mode': mode, 'event': 'tournament_created'})
+        return tournament
+
+    def get(self, tournament_id: str) -> Optional[Tournament]:
+        return self._tournaments.get(tournament_id)
+
+    def register(self, tournament_id: str, sid: str, username: str) -> Optional[str]:
+        """None on success, otherwise why the registration was refused."""
+        with self.lock:
+            tournament = self._tournaments.get(tournament_id)
+            if tournament is None:
+                return "No such tournament."
+            if tournament.state != REGISTRATION:
+                return "Registration is closed."
+            if sid in self._sid_tournament:
+                return "You are already registered for a tournament."
+            if username in tournament.registrants:
+                return "That username is already registered."
+            tournament.registrants[username] = {
+                'sid': sid, 'username': username, 'desired_mode': tournament.mode,
+                'bot_difficulty_pref': tournament.bot_difficulty, 'topics': [], 'rating': self.ratings.rating(username),
+                'status': 'registered', 'reached_round': 0, 'matches': 0, 'wins': 0, 'total_score': 0, 'best_place': None,
+            }
+            tournament.sid_to_username[sid] = username
+            self._sid_tournament[sid] = tournament_id
+            self.socketio.server.enter_room(sid, tournament.room, namespace=self.namespace)
+            self._emit_update(tournament)
+        return None
+
+    def is_registered(self, sid: str) -> bool:
+        return sid in self._sid_tournament
+
+    def rebind(self, old_sid: str, new_sid: str) -> None:
+        """A registrant reconnected with their session token under a new sid."""
+        with self.lock:
+            tournament_id = self._sid_tournament.pop(old_sid, None)
+            tournament = self._tournaments.get(tournament_id) if tournament_id else None
+            if tournament is None:
+                return
+            username = tournament.sid_to_username.pop(old_sid)
+            tournament.sid_to_username[new_sid] = username
+            tournament.registrants[username]['sid'] = new_sid
+            self._sid_tournament[new_sid] = tournament_id
+            self.socketio.server.enter_room(new_sid, tournament.room, namespace=self.namespace)
+
+    def withdraw(self, sid: str) -> bool:
+        """Drop a registrant (left, or disconnected for good). A match already running keeps their slot until it ends."""
+        with self.lock:
+            tournament_id = self._sid_tournament.pop(sid, None)
+            tournament = self._tournaments.get(tournament_id) if tournament_id else None
+            if tournament is None:
+                return False
+            username = tournament.sid_to_username.pop(sid)
+            if tournament.state == REGISTRATION:
+                del tournament.registrants[username]
+            else:
+                entrant = tournament.registrants[username]
+                entrant['status'] = 'withdrawn'
+                tournament.advancing = [e for e in tournament.advancing if e['username'] != username]
+            self._emit_update(tournament)
+        return True
+
+    def start(self, tournament_id: str) -> Optional[str]:
+        """Close registration and queue the first round. None on success, otherwise why it cannot start."""
+        with self.lock:
+            tournament = self._tournaments.get(tournament_id)
+            if tournament is None:
+                return "No such tournament."
+            if tournament.state != REGISTRATION:
+                return "Tournament has already started."
+            if len(tournament.registrants) < 2:
+                return "At least two registrants are needed."
+            tournament.state = RUNNING
+            tournament.started_at = time.time()
+            self._queue_round(tournament, list(tournament.registrants.values()), not_before=0.0)
+        self.start_launcher()
+        return None
+
+    def on_game_end(self, game_id: str, standings: List[Dict[str, Any]]) -> None:
+        """Record a finished match (called from the game-over hook with the final leaderboard)."""
+        with self.lock:
+            running = self._running.pop(game_id, None)
+            if running is None:
+                return
+            tournament_id, round_number, match_number = running
+            tournament = self._tournaments.get(tournament_id)
+            if tournament is None or tournament.round != round_number:
+                return
+            self._record_match(tournament, match_number, standings)
+
+    def tick(self) -> None:
+        """Launch the next queued match if its slot in the stagger has come."""
+        now = time.monotonic()
+        with self.lock:
+            if self.max_concurrent and len(self._running) >= self.max_concurrent:
+                return
+            # First match whose start time has come; a round waiting out its break does not hold up other tournaments
+            ready = next((i for i, item in enumerate(self._launch_queue) if item[0] <= now), None)
+            if ready is None:
+                return
+            _, tournament_id, round_number, match_number = self._launch_queue[ready]
+            del self._launch_queue[ready]
+            tournament = self._tournaments.get(tournament_id)
+            if tournament is None or tournament.round != round_number or match_number not in tournament.pending:
+                return
+            entrants = [e for e in tournament.pending[match_number] if e['status'] != 'withdrawn']
+            players = {e['sid']: e for e in entrants}
+            for entrant in entrants:
+                entrant['status'] = 'playing'
+            tag = {'tournament_id': tournament_id, 'round': round_number, 'match': match_number}
+        game_id = None
+        if players:
+            try:
+                game_id = self.create_match(tournament.mode, players, tournament.bot_difficulty, tag)
+            except Exception:
+                log.exception("Tournament match failed to start", extra={'mode': tournament.mode})
+        with self.lock:
+            if game_id:
+                self._running[game_id] = (tournament_id, round_number, match_number)
+                self.matches_started += 1
+                log.info("Tournament %s round %d match %d started with %d players", tournament_id, round_number,
+                         match_number + 1, len(players), extra={'game_id': game_id, 'event': 'tournament_match'})
+            else:
+                # Nobody left to play it (or the game could not be created): nobody advances from it
+                self._record_match(tournament, match_number, [])
+
+    def start_launcher(self) -> None:
+        with self.lock:
+            if self._launcher_started:
+                return
+            self._launcher_started = True
+
+        def _loop():
+            while True:
+                self.socketio.sleep(self.stagger)
+                try:
+                    self.tick()
+                except Exception:
+                    log.exception("Tournament launcher error")
+
+        self.socketio.start_background_task(_loop)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'tournaments': [t.summary() for t in self._tournaments.values()],
+                'queued_matches': len(self._launch_queue),
+                'running_matches': len(self._running),
+                'matches_started': self.matches_started,
+                'stagger_s': self.stagger,
+                'max_concurrent': self.max_concurrent,
+            }
+
+    # ----- Internal helpers -----
+
+    def _queue_round(self, tournament: Tournament, entrants: List[Dict[str, Any]], not_before: float) -> None:
+        tournament.round += 1
+        tournament.advancing = []
+        matches = seed_matches(entrants, tournament.match_size)
+        tournament.pending = dict(enumerate(matches))
+        tournament.final = len(matches) == 1
+        for entrant in entrants:
+            entrant['reached_round'] = tournament.round
+            entrant['status'] = 'registered'
+        # Rounds of other tournaments may already be queued; slots are spaced by the launcher's interval
+        for match_number in tournament.pending:
+            self._launch_queue.append((not_before, tournament.id, tournament.round, match_number))
+        log.info("Tournament %s round %d: %d players in %d matches", tournament.id, tournament.round, len(entrants),
+                 len(matches), extra={'mode': tournament.mode, 'event': 'tournament_round'})
+        self._emit_update(tournament)
+
+    def _record_match(self, tournament: Tournament, match_number: int, standings: List[Dict[str, Any]]) -> None:
+        entrants = tournament.pending.pop(match_number, [])
+        by_username = {e['username']: e for e in entrants}
+        # Humans only, in leaderboard order; an entrant who never made it into the game scores nothing
+        placed = [p for p in standings if not p['is_bot'] and p['username'] in by_username]
+        spots = 1 if tournament.final else min(tournament.advance, max(1, len(entrants) - 1))
+        advanced = 0
+        for place, row in enumerate(placed, start=1):
+            entrant = by_username[row['username']]
+            entrant['matches'] += 1
+            entrant['total_score'] += row['score']
+            entrant['best_place'] = place if entrant['best_place'] is None else min(entrant['best_place'], place)
+            if entrant['status'] == 'withdrawn':
+                continue
+            if advanced < spots:
+                advanced += 1
+                if place == 1:
+                    entrant['wins'] += 1
+                entrant['status'] = 'champion' if tournament.final else 'advanced'
+                tournament.advancing.append(entrant)
+            else:
+                entrant['status'] = 'eliminated'
+        for entrant in entrants:
+            if entrant['status'] == 'playing':
+                entrant['status'] = 'eliminated'
+            if entrant['sid'] in tournament.sid_to_username:
+                self.socketio.emit('tournament_result', {
+                    'tournament_id': tournament.id, 'round': tournament.round,
+                    'advanced': entrant['status'] in ('advanced', 'champion'), 'status': entrant['status'],
+                }, to=entrant['sid'], namespace=self.namespace)
+        if not tournament.pending:
+            self._finish_round(tournament)
+        else:
+            self._emit_update(tournament)
+
+    def _finish_round(self, tournament: Tournament) -> None:
+        through = tournament.advancing
+        if tournament.final or len(through) <= 1:
+            tournament.state = FINISHED
+            tournament.finished_at = time.time()
+            tournament.champion = through[0]['username'] if through else None
+            if through:
+                through[0]['status'] = 'champion'  # Also the last one standing when a round ends with a single survivor
+            for sid in list(tournament.sid_to_username):
+                self._sid_tournament.pop(sid, None)
+            log.info("Tournament %s finished after %d rounds; champion %s", tournament.id, tournament.round,
+                     tournament.champion, extra={'mode': tournament.mode, 'event': 'tournament_finished'})
+            self._emit_update(tournament)
+            return
+        self._queue_round(tournament, through, not_before=time.monotonic() + self.round_break)
+
+    def _emit_update(self, tournament: Tournament) -> None:
+        payload = PreEncoded(dict(tournament.summary(), standings=tournament.standings(limit=20)))
+        self.socketio.emit('tournament_update', payload, room=tournament.room, namespace=self.namespace)
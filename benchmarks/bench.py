@@ -0,0 +1,319 @@
+"""
+Microbenchmarks for the backend's hot paths.
+
+    python benchmarks/bench.py                 # compare against benchmarks/baseline.json
+    python benchmarks/bench.py --save          # record a new baseline
+    python benchmarks/bench.py -k reveal       # only cases whose name contains 'reveal'
+
+Each case reports the best per-call time over several repeats. A case more than
+--threshold times slower than its baseline is a regression and makes the run exit
+non-zero. Baselines are machine-specific: re-record them on the machine that
+compares against them.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import config  # noqa: E402
+from backend.app import calculate_points  # noqa: E402
+from backend.bots import schedule_bot_answer  # noqa: E402
+from backend.constants import CLASSIC_MODE, BATTLE_ROYALE_MODE  # noqa: E402
+from backend.game import next_question, reveal_answers_and_scores, build_state_snapshot  # noqa: E402
+from backend.lobby import LobbyManager  # noqa: E402
+from backend.payloads import PacketJSON, PreEncoded  # noqa: E402
+from backend.players import PlayerTable  # noqa: E402
+from backend.questions import QuestionBank, GameQuestions, get_random_questions, REQUIRED_COLUMNS  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PLAYER_COUNTS = (10, 100, 1000)
+BANK_SIZES = (1_000, 100_000)
+
+CASES: List[Tuple[str, Callable[[], Callable[[], None]]]] = []
+
+
+def case(name: str):
+    """Register a benchmark. The decorated function does the setup and returns the callable to time."""
+    def register(setup):
+        CASES.append((name, setup))
+        return setup
+    return register
+
+
+# ----- Fixtures -----
+
+class _Stub:
+    """Stands in for socketio/outbound: emits are accepted and dropped, room changes are no-ops."""
+
+    def __init__(self) -> None:
+        self.server = self
+        self.emitted = 0
+
+    def emit(self, *args, **kwargs) -> None:
+        self.emitted += 1
+
+    def enter_room(self, *args, **kwargs) -> None:
+        pass
+
+    def leave_room(self, *args, **kwargs) -> None:
+        pass
+
+
+class _Handle:
+    __slots__ = ()
+
+    def cancel(self) -> None:
+        pass
+
+
+def make_bank(rows: int) -> QuestionBank:
+    rng = np.random.default_rng(rows)
+    text = np.array([f"Question {i}?" for i in range(rows)], dtype=object)
+    columns = {col: text for col in REQUIRED_COLUMNS[:-1]}
+    columns['Difficulty'] = rng.integers(1, 11, rows).astype(np.int8)
+    categories = np.empty(rows, dtype=object)
+    categories[:] = [['science'] if i % 3 else ['history', 'geography'] for i in range(rows)]
+    columns['Category'] = categories
+    return QuestionBank(columns, source='benchmark', version=1)
+
+
+def make_game(players: int, mode: str = CLASSIC_MODE, bots: int = 0) -> Dict:
+    records = {}
+    for i in range(players):
+        is_bot = i < bots
+        sid = f"bot_{i}" if is_bot else f"sid_{i}"
+        records[sid] = {'username': f"player{i}", 'score': 0, 'is_bot': is_bot, 'sid': sid,
+                        'helps': {'fifty_fifty': True, 'call_friend': True, 'double_score': True},
+                        'is_eliminated': False, 'place': 0}
+    bank = make_bank(1_000)
+    sids = list(records)
+    questions = GameQuestions(bank, 50)
+    questions[0] = get_random_questions(1, diff=5, bank=bank)[0]
+    return {
+        'game_id': f"bench_{mode}_{players}",
+        'mode': mode,
+        'players': PlayerTable.from_records(records),
+        'question_bank': bank,
+        'questions': questions,
+        'current_question_index': 0,
+        'game_state': 'in_progress',
+        'adaptive_difficulty': 5,
+        'human_player_sids': [s for s in sids if not s.startswith('bot_')],
+        'active_player_sids': list(sids),
+        'room_name': f"bench_{mode}_{players}",
+        'initial_player_count': players,
+        'bot_difficulty': 'advanced',
+        'questions_at_current_difficulty_streak': 0,
+    }
+
+
+def answer_everyone(game: Dict) -> None:
+    rng = np.random.default_rng(0)
+    players = game['players']
+    slots = players.live_slots()
+    players.answered[slots] = True
+    players.correct[slots] = rng.integers(0, 2, len(slots))
+    players.points[slots] = rng.integers(100, 1000, len(slots))
+
+
+# ----- Cases -----
+
+for _rows in BANK_SIZES:
+    @case(f"get_random_questions[bank={_rows}]")
+    def _bench_sample(rows=_rows):
+        bank = make_bank(rows)
+        return lambda: get_random_questions(1, diff=5, bank=bank)
+
+    @case(f"get_random_questions[bank={_rows},batch=30]")
+    def _bench_sample_batch(rows=_rows):
+        bank = make_bank(rows)
+        return lambda: get_random_questions(30, diff=5, bank=bank)
+
+    @case(f"get_random_questions[bank={_rows},topics]")
+    def _bench_sample_topics(rows=_rows):
+        bank = make_bank(rows)
+        return lambda: get_random_questions(1, diff=5, bank=bank, topics=('history', 'science'))
+
+
+for _players in PLAYER_COUNTS:
+    @case(f"next_question[players={_players}]")
+    def _bench_next_question(players=_players):
+        game = make_game(players)
+        stub = _Stub()
+        sample = lambda num, diff=None: get_random_questions(num, diff=diff, bank=game['question_bank'])
+
+        def run():
+            game['current_question_index'] = 0
+            next_question(current_game=game, socketio=stub, namespace='/', config=config,
+                          get_random_questions=sample, calculate_points=calculate_points, bot_action=lambda sid, q: None)
+        return run
+
+    @case(f"reveal_answers_and_scores[classic,players={_players}]")
+    def _bench_reveal_classic(players=_players):
+        game = make_game(players)
+        answer_everyone(game)
+        stub = _Stub()
+        return lambda: reveal_answers_and_scores(current_game=game, socketio=stub, namespace='/', config=config,
+                                                 calculate_points=calculate_points)
+
+    @case(f"reveal_answers_and_scores[battle_royale,players={_players}]")
+    def _bench_reveal_br(players=_players):
+        game = make_game(players, mode=BATTLE_ROYALE_MODE)
+        answer_everyone(game)
+        stub = _Stub()
+        everyone = list(game['active_player_sids'])
+
+        def run():
+            # Undo the previous round's eliminations so every call scores the full field
+            game['players'].eliminated[:] = False
+            game['active_player_sids'] = list(everyone)
+            reveal_answers_and_scores(current_game=game, socketio=stub, namespace='/', config=config,
+                                      calculate_points=calculate_points)
+        return run
+
+    @case(f"schedule_bot_answer[bots={_players}]")
+    def _bench_bot_fanout(players=_players):
+        game = make_game(players, bots=players)
+        question = game['questions'][0]
+        bot_sids = list(game['players'])
+        handle = _Handle()
+
+        def run():
+            for sid in bot_sids:
+                schedule_bot_answer(game, sid, question, schedule=lambda delay, s: handle)
+        return run
+
+    @case(f"state_snapshot[players={_players}]")
+    def _bench_snapshot(players=_players):
+        game = make_game(players)
+        sids = list(game['players'])
+
+        def run():
+            game.pop('snapshot_cache', None)
+            build_state_snapshot(current_game=game, sid=sids[0], config=config)
+        return run
+
+
+@case("lobby_join_leave[players=50]")
+def _bench_lobby_join():
+    players = [{'sid': f"sid_{i}", 'username': f"player{i}", 'desired_mode': CLASSIC_MODE} for i in range(50)]
+    lobby = LobbyManager(socketio=_Stub(), namespace='/', wait_time=30, max_players={CLASSIC_MODE: 10}, lock=None)
+
+    def run():
+        for p in players:
+            lobby.join(p['sid'], p)
+        for p in players:
+            lobby.leave(p['sid'])
+    return run
+
+
+@case("lobby_tick[lobbies=20]")
+def _bench_lobby_tick():
+    lobby = LobbyManager(socketio=_Stub(), namespace='/', wait_time=30, max_players={CLASSIC_MODE: 10}, lock=None)
+    for i in range(200):
+        lobby.join(f"sid_{i}", {'sid': f"sid_{i}", 'username': f"player{i}", 'desired_mode': CLASSIC_MODE})
+    return lobby.tick
+
+
+@case("calculate_points")
+def _bench_points():
+    elapsed = [random.uniform(0, config.QUESTION_DURATION) for _ in range(100)]
+
+    def run():
+        for t in elapsed:
+            calculate_points(t)
+    return run
+
+
+@case("payload_encode[new_question]")
+def _bench_encode_question():
+    payload = {'question': 'Which planet is known as the Red Planet?', 'options': ['Mars', 'Jupiter', 'Saturn', 'Venus'],
+               'question_number': 3, 'total_questions': 10, 'duration': 20, 'difficulty': 2,
+               'target_difficulty_level': 2, 'active_player_count': None, 'initial_player_count': None}
+    return lambda: PacketJSON.dumps(['new_question', payload])
+
+
+@case("payload_encode[new_question,pre_encoded]")
+def _bench_encode_question_pre():
+    payload = PreEncoded({'question': 'Which planet is known as the Red Planet?', 'options': ['Mars', 'Jupiter', 'Saturn', 'Venus'],
+                          'question_number': 3, 'total_questions': 10, 'duration': 20, 'difficulty': 2,
+                          'target_difficulty_level': 2, 'active_player_count': None, 'initial_player_count': None})
+    return lambda: PacketJSON.dumps(['new_question', payload])
+
+
+@case("payload_encode[question_result,players=100]")
+def _bench_encode_result():
+    game = make_game(100)
+    answer_everyone(game)
+    payload = {'mode': CLASSIC_MODE, 'question_number': 1, 'correct_answer': 'Mars', 'active_player_count': None,
+               'player_data': {p['sid']: {'score': p['score'], 'answered_this_round': True, 'is_eliminated': False,
+                                          'place': 0, 'helps': dict(p['helps'])} for p in game['players'].values()}}
+    return lambda: PacketJSON.dumps(['question_result', payload])
+
+
+# ----- Runner -----
+
+def measure(fn: Callable[[], None], repeat: int) -> float:
+    """Best per-call time in microseconds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default='', help="Only run cases whose name contains this")
+    parser.add_argument('--save', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=1.3, help="Slowdown ratio that counts as a regression (default 1.3)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+
+    random.seed(0)
+    results: Dict[str, float] = {}
+    regressions = []
+    print(f"{'case':<58} {'us/call':>12} {'baseline':>12} {'ratio':>7}")
+    for name, setup in CASES:
+        if args.pattern not in name:
+            continue
+        us = measure(setup(), args.repeat)
+        results[name] = round(us, 3)
+        base = baseline.get(name)
+        ratio = us / base if base else None
+        flag = ''
+        if ratio is not None and ratio > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<58} {us:>12.2f} {base if base is not None else '-':>12} {f'{ratio:.2f}' if ratio else '-':>7}{flag}")
+
+    if args.save:
+        merged = dict(baseline, **results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                                   'processor': platform.processor() or platform.machine()},
+                       'recorded_at': time.strftime('%Y-%m-%d'), 'results': merged}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold}x baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Hint and difficulty-filter benchmarks against the local Gemini stand-in.
+
+    python benchmarks/llm_bench.py --hints 200 --latency-ms 800 --error-rate 0.05 --block-rate 0.02
+    python benchmarks/llm_bench.py --batches 50 --malformed-rate 0.1 --timeout 1.5
+
+Starts backend/fake_gemini.py in-process, points GEMINI_API_ENDPOINT at it and
+drives the real code paths: `HintService` -> `get_llm_advice` (the call-a-friend
+help) and `question_difficulty_check.ask_gemini_batch`. Reports per-request latency
+percentiles, how each reply was classified, and batch throughput. Needs the
+google-generativeai SDK installed; no API key or network is used.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.fake_gemini import FakeGemini, DEFAULT_BEHAVIOUR  # noqa: E402
+
+
+def percentiles(samples):
+    if not samples:
+        return "-"
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return f"p50 {p50 * 1000:.0f}ms  p95 {p95 * 1000:.0f}ms  p99 {p99 * 1000:.0f}ms  max {max(samples) * 1000:.0f}ms"
+
+
+def bench_hints(count: int, workers: int) -> None:
+    from backend.llm import HintService
+
+    service = HintService(max_workers=workers)
+    done = threading.Event()
+    outcomes = Counter()
+    latencies = []
+    lock = threading.Lock()
+    remaining = [count]
+
+    def submit(i):
+        started = time.perf_counter()
+
+        def on_done(advice):
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                outcomes[advice if advice.startswith('AI ') else 'hint'] += 1
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    done.set()
+        service.submit(f"Benchmark question {i}?", ['A', 'B', 'C', 'D'], on_done)
+
+    started = time.perf_counter()
+    for i in range(count):
+        submit(i)
+    done.wait()
+    elapsed = time.perf_counter() - started
+    print(f"\nHints: {count} requests on {workers} workers in {elapsed:.2f}s ({count / elapsed:.1f}/s)")
+    print(f"  latency (queue + call): {percentiles(latencies)}")
+    for outcome, n in outcomes.most_common():
+        print(f"  {outcome:<28} {n}")
+
+
+def bench_batches(batches: int, batch_size: int) -> None:
+    import google.generativeai as genai
+    import question_difficulty_check as qdc
+
+    qdc.configure_gemini(qdc.load_api_key())
+    model = genai.GenerativeModel(qdc.MODEL_NAME)
+    row = {"Question": "Which planet is known as the Red Planet?", "Correct Answer": "Mars",
+           "Wrong Answer 1": "Venus", "Wrong Answer 2": "Jupiter", "Wrong Answer 3": "Saturn"}
+    latencies = []
+    answered = unanswered = 0
+    started = time.perf_counter()
+    stdout = sys.stdout
+    for b in range(batches):
+        batch = [(b * batch_size + i, row) for i in range(batch_size)]
+        t0 = time.perf_counter()
+        sys.stdout = open(os.devnull, 'w')  # ask_gemini_batch prints every prompt
+        try:
+            results = qdc.ask_gemini_batch(model, batch)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        latencies.append(time.perf_counter() - t0)
+        for _, chosen, _ in results:
+            if not chosen:  # None: no usable reply for the batch, "": not one of the options
+                unanswered += 1
+            else:
+                answered += 1
+    elapsed = time.perf_counter() - started
+    total = batches * batch_size
+    print(f"\nDifficulty filter: {batches} batches x {batch_size} questions in {elapsed:.2f}s "
+          f"({total / elapsed:.1f} questions/s)")
+    print(f"  batch latency: {percentiles(latencies)}")
+    print(f"  answered {answered}, unusable (error/block/malformed) {unanswered}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hints', type=int, default=100, help="Call-a-friend requests to send (0 to skip)")
+    parser.add_argument('--hint-workers', type=int, default=4)
+    parser.add_argument('--batches', type=int, default=20, help="Difficulty-filter batches to send (0 to skip)")
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=None, help="LLM_REQUEST_TIMEOUT for hint requests")
+    parser.add_argument('--seed', type=int, default=0)
+    for key, default in DEFAULT_BEHAVIOUR.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=type(default), default=default)
+    args = parser.parse_args()
+
+    fake = FakeGemini(seed=args.seed, **{key: getattr(args, key) for key in DEFAULT_BEHAVIOUR}).start()
+    os.environ['GEMINI_API_ENDPOINT'] = fake.endpoint
+    from backend import config
+    config.GEMINI_API_ENDPOINT = fake.endpoint
+    if args.timeout is not None:
+        config.LLM_REQUEST_TIMEOUT = args.timeout
+    print(f"Fake Gemini on {fake.endpoint}: {fake.behaviour}")
+
+    try:
+        if args.hints:
+            bench_hints(args.hints, args.hint_workers)
+        if args.batches:
+            bench_batches(args.batches, args.batch_size)
+    finally:
+        print(f"\nServer counts: {fake.stats()['counts']}")
+        fake.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Crash-recovery round trip: journal a live game, "crash" it, rebuild it from the journal and play it to the end.
+
+    python benchmarks/recovery_check.py
+    python benchmarks/recovery_check.py --scenario br-question
+
+Each scenario starts a game through the real app, with Socket.IO test clients
+as players and the game journal (backend/journal.py) writing to a temp
+directory. Before the crash:
+  - the players answer every question, and some use helps;
+  - one player disconnects and resumes (a 'rebind' record);
+  - one player quits for good and their session expires (a 'leave' record).
+
+At the chosen round and phase the actor is frozen, as if the process died. The
+script checks three things.
+
+1. Rebuild. `rebuild_state` (last snapshot plus the records after it) must equal
+   `export_state` of the frozen game: round, difficulty, BR streak, rosters,
+   scores, eliminations and helps left.
+2. Resume. `recover_games` restarts the game and the players reconnect with
+   their session tokens. A game caught mid-question must serve the same round
+   again with the same difficulty and streak. A game caught after a reveal must
+   go on to the next round.
+3. Finish. The game must reach game_over, its journal must be archived,
+   `replay` must find no scoring mismatches, and the final leaderboard must
+   equal the journal's final state.
+
+The script exits non-zero if any scenario fails.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+JOURNAL_DIR = tempfile.mkdtemp(prefix='trivia-recovery-')
+# Fast games, short session grace, frequent snapshots; must be set before the app is imported
+os.environ.update({
+    'JOURNAL_DIR': JOURNAL_DIR, 'JOURNAL_FSYNC_INTERVAL': '0.05', 'JOURNAL_SNAPSHOT_EVERY': '2', 'JOURNAL_RECOVERY_DELAY': '0.2',
+    'QUESTION_DURATION': '3', 'QUESTIONS_PER_GAME': '6', 'GAME_START_DELAY': '0', 'RESULTS_DISPLAY_TIME': '0.3',
+    'INTERMISSION_TIME': '0.1', 'BR_END_DELAY': '0', 'BR_DIFFICULTY_STEP_QUESTIONS': '2', 'MIN_BOTS': '1', 'MAX_BOTS': '2',
+    'SESSION_GRACE_PERIOD': '1.5', 'RATE_SUBMIT_ANSWER': '1000', 'BURST_SUBMIT_ANSWER': '1000',
+    'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+})
+
+from backend import app as A  # noqa: E402
+from backend.constants import CLASSIC_MODE, BATTLE_ROYALE_MODE  # noqa: E402
+from backend.journal import export_state, read_records, rebuild_state, replay, STATE_KEYS  # noqa: E402
+
+# name -> (mode, round the crash happens in (1-based), phase it happens in)
+SCENARIOS = {
+    'classic-question': (CLASSIC_MODE, 4, 'question'),
+    'classic-results': (CLASSIC_MODE, 3, 'results'),
+    'br-question': (BATTLE_ROYALE_MODE, 4, 'question'),   # The round that stepped BR difficulty up
+    'br-question-streak': (BATTLE_ROYALE_MODE, 3, 'question'),
+    'br-results': (BATTLE_ROYALE_MODE, 4, 'results'),
+}
+PLAYER_KEYS = ('username', 'score', 'is_bot', 'is_eliminated', 'helps')
+
+
+class Player:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.connect()
+
+    def connect(self, token=None) -> None:
+        self.client = A.socketio.test_client(A.app, auth={'session_token': token} if token else None)
+        ack = next(e for e in self.client.get_received() if e['name'] == 'connection_ack')['args'][0]
+        self.token = ack['session_token']
+        self.sid = A.socketio.server.manager.sid_from_eio_sid(self.client.eio_sid, '/')
+
+    def reconnect(self) -> None:
+        if self.client.is_connected():
+            self.client.disconnect()
+        self.connect(self.token)
+
+
+def wait_for(predicate, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.01)
+    raise AssertionError(f"timed out waiting for {what}")
+
+
+def flush_journal() -> None:
+    wait_for(lambda: A.journal.stats()['pending'] == 0 and A.journal.stats()['unsynced_files'] == 0, 5, 'journal flush')
+
+
+def correct_option(game_id: str, question_number: int) -> str:
+    # Test-only peek at the live game so battle-royale players survive long enough to crash
+    return A.games[game_id].game['questions'][question_number - 1].correct_answer
+
+
+def normalized(state):
+    players = {sid: {k: p.get(k) for k in PLAYER_KEYS} for sid, p in state['players'].items()}
+    # Rounds as (bank row, option order); journal 'question' records carry the full question besides
+    questions = [(q['id'], q['perm']) if q else None for q in state['questions']]
+    while questions and questions[-1] is None:
+        questions.pop()
+    rest = {k: state.get(k) for k in STATE_KEYS if k not in ('phase', 'questions')}
+    return rest, players, questions
+
+
+def diff(live, rebuilt) -> list:
+    problems = []
+    (live_rest, live_players, live_q), (re_rest, re_players, re_q) = normalized(live), normalized(rebuilt)
+    for key in live_rest:
+        if live_rest[key] != re_rest.get(key):
+            problems.append(f"{key}: live {live_rest[key]!r} != rebuilt {re_rest.get(key)!r}")
+    for sid in set(live_players) | set(re_players):
+        if live_players.get(sid) != re_players.get(sid):
+            problems.append(f"player {sid}: live {live_players.get(sid)} != rebuilt {re_players.get(sid)}")
+    if live_q != re_q:
+        problems.append(f"questions differ: live {len(live_q)} rounds, rebuilt {len(re_q)}")
+    expected_phase = {'question': 'question', 'results': 'results', 'intermission': 'results'}.get(live.get('phase'), live.get('phase'))
+    if rebuilt.get('phase') != expected_phase:
+        problems.append(f"phase: live {live.get('phase')!r} rebuilt {rebuilt.get('phase')!r}")
+    return problems
+
+
+def play(players, game_id, *, until, survivor=None, answer_correctly=True):
+    """Answer every question for every connected player until `until()` is true; returns the game_over payload if seen."""
+    over = None
+    done = False
+    while not done:
+        done = until()  # Checked before draining, so events sent just before it became true are still read
+        for p in players:
+            if not p.client.is_connected():
+                continue
+            for event in p.client.get_received():
+                if event['name'] == 'new_question':
+                    number = event['args'][0]['question_number']
+                    options = event['args'][0]['options']
+                    right = game_id in A.games and correct_option(game_id, number)
+                    if answer_correctly or p is survivor:
+                        answer = right or options[0]
+                    else:
+                        answer = next(o for o in options if o != right)
+                    if number == 1 and p is players[0]:
+                        p.client.emit('use_help', {'type': 'double_score'})
+                    p.client.emit('submit_answer', {'answer': answer})
+                elif event['name'] == 'game_over':
+                    over = event['args'][0]
+        if over:
+            return over
+        if not done:
+            time.sleep(0.01)
+    return over
+
+
+def run(name: str) -> list:
+    mode, crash_round, crash_phase = SCENARIOS[name]
+    players = [Player(f"{name}-{i}") for i in range(4)]
+    keeper, bouncer, quitter = players[0], players[1], players[3]
+    with A.app.app_context():
+        game_id = A.create_game(mode, {p.sid: {'username': p.name} for p in players}, 'easy')
+    actor = A.games[game_id]
+    status = lambda: actor.status  # noqa: E731
+    at = lambda number, *phases: lambda: status()['round'] == number and status()['phase'] in phases  # noqa: E731
+
+    # Round 1: one player drops and resumes, another quits for good
+    play(players, game_id, until=at(1, 'question'))
+    bouncer.reconnect()
+    quitter.client.disconnect()
+    players.remove(quitter)
+    play(players, game_id, until=at(2, 'question'))
+    wait_for(lambda: quitter.sid not in actor.game['players'], 5, 'the quitter to be removed')
+
+    # Crash: freeze the actor at the target point, as if the process died there
+    if crash_phase == 'question':
+        play(players, game_id, until=at(crash_round, 'question'))
+    else:
+        play(players, game_id, until=at(crash_round, 'results', 'intermission'))
+    actor.finished = True
+    time.sleep(0.05)  # Let a command already running on the worker complete
+    flush_journal()
+    live = export_state(actor.game)
+    path = os.path.join(JOURNAL_DIR, f"{game_id}.jsonl")
+    rebuilt = rebuild_state(path)
+    problems = [f"rebuild: {p}" for p in diff(live, rebuilt)]
+    kinds = {r['kind'] for r in read_records(path)}
+    problems += [f"journal has no '{k}' record" for k in ('snapshot', 'help', 'rebind', 'leave') if k not in kinds]
+    interrupted = [r for r in read_records(path) if r['kind'] == 'question'][-1]
+
+    # Restart: drop the frozen actor and its connections, recover from disk, reconnect with the session tokens
+    for p in players:
+        p.client.disconnect()
+    A.games.pop(game_id, None)
+    if A.recover_games() != 1:
+        return problems + ["recover_games did not pick the game up"]
+    for p in players:
+        p.connect(p.token)
+    interrupted_round = rebuilt['current_question_index']
+    resume_round = interrupted_round if rebuilt['phase'] == 'question' else interrupted_round + 1
+
+    def served_after_recovery():
+        records = list(read_records(path))
+        recovered = [i for i, r in enumerate(records) if r['kind'] == 'recovered']
+        return recovered and next((r for r in records[recovered[0]:] if r['kind'] == 'question'), None)
+
+    served = wait_for(served_after_recovery, 10, "the first question after recovery")
+    if served['round'] != resume_round:
+        problems.append(f"resume: served round {served['round'] + 1}, expected {resume_round + 1}")
+    if rebuilt['phase'] == 'question':
+        for key in ('adaptive_difficulty', 'streak'):
+            if served[key] != interrupted[key]:
+                problems.append(f"resume: re-served question has {key} {served[key]}, interrupted one had {interrupted[key]}")
+
+    # Play it out; in battle royale everyone but the keeper now answers wrong so the game ends
+    over = play(players, game_id, until=lambda: game_id not in A.games, survivor=keeper,
+                answer_correctly=mode == CLASSIC_MODE)
+    finished_path = os.path.join(JOURNAL_DIR, 'finished', f"{game_id}.jsonl")
+    wait_for(lambda: os.path.exists(finished_path), 5, 'the journal to be archived')
+    if over is None:
+        problems.append("finish: no game_over received")
+    mismatches = [m for report in replay(finished_path) for m in report['mismatches']]
+    if mismatches:
+        problems.append(f"finish: replay found {len(mismatches)} scoring mismatch(es): {mismatches[:3]}")
+    final = rebuild_state(finished_path)
+    journal_scores = sorted((p['username'], p['score']) for p in final['players'].values())
+    if over and sorted((p['username'], p['score']) for p in over['leaderboard']) != journal_scores:
+        problems.append(f"finish: leaderboard {over['leaderboard']} != journal {journal_scores}")
+    for p in players:
+        p.client.disconnect()
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append', help="Run only these (default: all)")
+    args = parser.parse_args()
+    failed = False
+    try:
+        for name in args.scenario or SCENARIOS:
+            started = time.perf_counter()
+            try:
+                problems = run(name)
+            except AssertionError as e:
+                problems = [str(e)]
+            failed = failed or bool(problems)
+            print(f"{name:<20} {'ok' if not problems else 'FAILED'} ({time.perf_counter() - started:.1f}s)")
+            for problem in problems:
+                print(f"    {problem}")
+        leftovers = [os.path.basename(p) for p in glob.glob(os.path.join(JOURNAL_DIR, '*.jsonl'))]
+        if leftovers:
+            print(f"journals never closed: {leftovers}")
+            failed = True
+    finally:
+        shutil.rmtree(JOURNAL_DIR, ignore_errors=True)
+    print("ok" if not failed else "FAILED")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Load test for live shows: tens of thousands of simulated players answering the same question.
+
+    python benchmarks/show_load.py                              # 50k players, 32 reader threads
+    python benchmarks/show_load.py --players 100000 --burst     # every answer as fast as the readers can send it
+
+The script imports the real app, so answers take the production path. Each
+simulated player is registered with the app's Socket.IO server as a connection
+with its own address but no transport, and joins the show. Reader threads
+stand in for the sockets' receive loops. They hand every answer to
+`socketio.server._handle_event`, as python-socketio does for a decoded packet.
+The app takes `show_answer` there, on the reader's thread, before python-socketio
+would start a thread for the event. It stamps the arrival time, then runs:
+  - `profiler.track`;
+  - `admission.admit`, with the admission lock and the per-client and per-IP buckets;
+  - `ShowManager.submit`, which queues the answer for the show's answer workers.
+Broadcasts go out through the app's `OutboundQueues` to the real Socket.IO
+manager. Per broadcast, that means two walks over the 50k-player room: one
+under the outbound lock and one in the manager's emit. Only the final socket
+write is missing, because the connections have no transport.
+
+Answers are spread over the question window, or sent all at once with --burst.
+Only players still in answer. Each answers correctly with --accuracy
+probability. For every question the script reports:
+  - answers taken and the intake rate;
+  - what a reader pays to dispatch one answer;
+  - the deepest the answer queues got;
+  - live tally broadcasts;
+  - the time to settle the reveal.
+It then prints the cost of each broadcast kind and where every answer sent
+ended up. It checks the revealed counts against what the readers sent and against the
+round's live tally, and exits non-zero on a mismatch.
+
+Answers are timed from their arrival, and a round is only settled once the
+workers have written everything that arrived while it was open. So a backlog in
+the queues delays the reveal a little, but never turns an on-time answer into a
+late one.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=32, help="Threads dispatching incoming answers")
+    parser.add_argument('--questions', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds each question is open")
+    parser.add_argument('--results-time', type=float, default=0.5)
+    parser.add_argument('--tally-interval', type=float, default=0.25)
+    parser.add_argument('--accuracy', type=float, default=0.85, help="Chance a simulated player answers correctly")
+    parser.add_argument('--burst', action='store_true', help="Send every answer at once instead of over the window")
+    parser.add_argument('--no-elimination', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Show settings are read when the app is imported
+    os.environ.update({
+        'SHOW_QUESTION_DURATION': str(args.duration), 'SHOW_RESULTS_TIME': str(args.results_time),
+        'SHOW_TALLY_INTERVAL': str(args.tally_interval), 'SHOW_ELIMINATION': 'false' if args.no_elimination else 'true',
+        'JOURNAL_DIR': '',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+    from backend import app as A
+    from backend.show import REJECT_REASONS
+
+    server = A.socketio.server
+    base_environ = A.app.test_request_context('/socket.io/').request.environ
+    base_environ['flask.app'] = A.app
+
+    started = time.perf_counter()
+    show = A.shows.create(name='load test', starts_in=3600, questions=args.questions)
+    eio_sids, sids = [], []
+    for i in range(args.players):
+        eio_sid = server.eio.generate_id()
+        server.environ[eio_sid] = dict(base_environ, REMOTE_ADDR=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+        sid = server.manager.connect(eio_sid, '/')
+        A.shows.join(show.id, sid, f"player{i}")
+        eio_sids.append(eio_sid)
+        sids.append(sid)
+    join_s = time.perf_counter() - started
+    print(f"{args.players} players connected and joined in {join_s:.2f}s ({args.players / join_s:,.0f}/s)")
+
+    # Time every emit the show makes; ShowManager holds the app's OutboundQueues
+    broadcast_s = defaultdict(list)
+    outbound_emit = A.outbound.emit
+
+    def timed_emit(event, *a, **kw):
+        t = time.perf_counter()
+        try:
+            return outbound_emit(event, *a, **kw)
+        finally:
+            broadcast_s[event].append(time.perf_counter() - t)
+
+    A.outbound.emit = timed_emit
+
+    sent = {}  # question number -> Counter(option -> answers dispatched)
+    dispatch_s = {}  # question number -> sampled _handle_event seconds
+    queue_peak = Counter()  # question number -> deepest sampled answer-queue depth
+    rounds = {}  # question number -> the ShowRound, kept to compare its live tally with the reveal
+    spans = {}  # question number -> [first dispatch, last dispatch]
+    sent_lock = threading.Lock()
+    chunks = [range(i, args.players, args.readers) for i in range(args.readers)]
+    stop = threading.Event()
+    peak_threads = [threading.active_count()]
+
+    def reader(index: int) -> None:
+        rng = random.Random(args.seed * 1000 + index)
+        seen = 0
+        while not stop.is_set():
+            rnd = show.round
+            if rnd is None or not rnd.open or rnd.number == seen:
+                time.sleep(0.001)
+                continue
+            seen = rnd.number
+            alive = show.alive
+            with sent_lock:
+                rounds[seen] = rnd
+            mine = [slot for slot in chunks[index] if alive[slot]]
+            dispatched, samples = Counter(), []
+            window = 0.0 if args.burst else args.duration * 0.8
+            step = window / max(1, len(mine))
+            t0 = time.monotonic()
+            for k, slot in enumerate(mine):
+                if step:
+                    lag = t0 + k * step - time.monotonic()
+                    if lag > 0.002:
+                        time.sleep(lag)
+                option = rnd.correct if rng.random() < args.accuracy else rng.randrange(len(rnd.options))
+                answer = rnd.options[option] if k % 2 else option  # Clients may send the text or the index
+                call_started = time.perf_counter()
+                server._handle_event(eio_sids[slot], '/', None, ['show_answer', {'answer': answer}])
+                if k % 16 == 0:
+                    samples.append(time.perf_counter() - call_started)
+                    peak_threads[0] = max(peak_threads[0], threading.active_count())
+                    depth = A.shows.intake_depth()
+                    with sent_lock:
+                        queue_peak[seen] = max(queue_peak[seen], depth)
+                dispatched[option] += 1
+            done = time.monotonic()
+            with sent_lock:
+                sent.setdefault(seen, Counter()).update(dispatched)
+                dispatch_s.setdefault(seen, []).extend(samples)
+                span = spans.setdefault(seen, [t0, done])
+                span[0], span[1] = min(span[0], t0), max(span[1], done)
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+
+    A.shows.start_now(show.id)
+    run_started = time.perf_counter()
+    while show.state != 'finished':
+        time.sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    run_s = time.perf_counter() - run_started
+    total_sent = sum(sum(c.values()) for c in sent.values())
+
+    failed = False
+    print(f"{'q':>3} {'answered':>9} {'per s':>9} {'disp p50':>9} {'disp p99':>9} {'queue max':>10} "
+          f"{'tallies':>8} {'settle ms':>10} {'still in':>9}")
+    for row in show.history:
+        number = row['question_number']
+        expected = sent.get(number, Counter())
+        counts = row['counts']
+        if [expected.get(i, 0) for i in range(len(counts))] != counts:
+            print(f"MISMATCH on question {number}: revealed {counts}, sent {dict(expected)}")
+            failed = True
+        if number in rounds and rounds[number].tally.totals() != counts:
+            print(f"MISMATCH on question {number}: live tally {rounds[number].tally.totals()}, revealed {counts}")
+            failed = True
+        first, last = spans.get(number, (0.0, 0.0))
+        window = max(1e-9, last - first)
+        disp = [s * 1e6 for s in dispatch_s.get(number, [])]
+        print(f"{number:>3} {row['answered']:>9} {row['answered'] / window:>9,.0f} {percentile(disp, 50):>7.0f}us "
+              f"{percentile(disp, 99):>7.0f}us {queue_peak[number]:>10,} "
+              f"{row['tally_emits']:>8} {row['settle_ms']:>10.2f} {row['survivors']:>9}")
+    print(f"{'broadcast':<14} {'count':>6} {'avg ms':>8} {'max ms':>8}")
+    for event in ('show_question', 'show_tally', 'show_reveal', 'show_over'):
+        times = broadcast_s.get(event, [])
+        if times:
+            print(f"{event:<14} {len(times):>6} {sum(times) / len(times) * 1e3:>8.1f} {max(times) * 1e3:>8.1f}")
+    counted = sum(row['answered'] for row in show.history)
+    refused = dict(zip(REJECT_REASONS, show.rejected.totals()))
+    handled = A.admission.stats()['events'].get('show_answer', {})
+    busy = A.shows.intake_dropped
+    after_show = handled.get('admitted', 0) - counted - sum(refused.values()) - busy
+    print(f"answers sent {total_sent:,}: counted {counted:,}; refused by the show "
+          f"{ {k: v for k, v in refused.items() if v} }; refused by admission "
+          f"{ {k: v for k, v in handled.items() if k != 'admitted' and v} }; refused as busy {busy:,}; "
+          f"arrived after the show ended {after_show:,}")
+    print(f"peak threads sampled: {peak_threads[0]}")
+    print(f"winners: {show.survivors} of {show.players}, top {show.winners[:3]}")
+    print(f"show ran {run_s:.1f}s; peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    print("ok" if not failed else "FAILED")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Soak test: play thousands of short games through the real app and check nothing is left behind.
+
+    python benchmarks/soak.py --games 2000 --clients 120
+    python benchmarks/soak.py --games 500 --churn 0.05 --tracemalloc 10
+
+Socket.IO test clients stand in for players. Games are started with
+`create_game` in both modes, and every client answers each question (sometimes
+after using a help). With --churn, some players disconnect mid-game and are
+replaced by fresh clients. After a warm-up batch the leak detector
+(backend/diagnostics.py) takes its baselines. Once all games are over it has to
+find every finished game collectable, no worker timers queued for finished games,
+no more threads than at the baseline, and the app's per-game registries empty.
+Exits non-zero otherwise.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Fast games, no rate limits in the way, diagnostics on; must be set before the app is imported
+os.environ.update({
+    'QUESTION_DURATION': '1', 'QUESTIONS_PER_GAME': '3', 'GAME_START_DELAY': '0', 'RESULTS_DISPLAY_TIME': '0',
+    'INTERMISSION_TIME': '0', 'BR_END_DELAY': '0', 'MIN_BOTS': '1', 'MAX_BOTS': '3', 'SESSION_GRACE_PERIOD': '1',
+    'RATE_SUBMIT_ANSWER': '1000', 'BURST_SUBMIT_ANSWER': '1000', 'RATE_USE_HELP': '1000', 'BURST_USE_HELP': '1000',
+    'LEAK_DIAGNOSTICS': 'true', 'LEAK_CHECK_INTERVAL': '3600', 'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=60, help="Connected players at any time")
+    parser.add_argument('--players-per-game', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=50, help="Games played before the baselines are taken")
+    parser.add_argument('--churn', type=float, default=0.0, help="Chance a player disconnects during a question")
+    parser.add_argument('--help-rate', type=float, default=0.2, help="Chance a player uses a help on a question")
+    parser.add_argument('--thread-slack', type=int, default=4,
+                        help="Extra threads per name tolerated (fixed-size pools such as the hint workers start lazily)")
+    parser.add_argument('--tracemalloc', type=int, default=0, metavar='FRAMES', help="Trace allocations with this many frames")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    os.environ['LEAK_TRACEMALLOC_FRAMES'] = str(args.tracemalloc)
+    os.environ['LEAK_SNAPSHOT_EVERY'] = str(max(1, args.games // 5))
+
+    from backend import app as A
+    from backend.constants import CLASSIC_MODE, BATTLE_ROYALE_MODE
+    from backend.players import HELP_TYPES
+
+    rng = random.Random(args.seed)
+    diagnostics = A.app.extensions['diagnostics']
+    idle = [A.socketio.test_client(A.app) for _ in range(args.clients)]
+    for client in idle:
+        client.get_received()
+    playing = {}  # client -> number of the game it is in
+    started = disconnects = 0
+    baseline_taken = False
+    deadline = time.monotonic() + args.timeout
+    t0 = time.perf_counter()
+
+    while diagnostics.games_finished < args.games and time.monotonic() < deadline:
+        while started < args.games and len(idle) >= args.players_per_game:
+            group = [idle.pop() for _ in range(args.players_per_game)]
+            players = {A.socketio.server.manager.sid_from_eio_sid(c.eio_sid, '/'): {'username': f"soak{started}_{i}"} for i, c in enumerate(group)}
+            mode = BATTLE_ROYALE_MODE if started % 3 == 2 else CLASSIC_MODE
+            with A.app.app_context():
+                A.create_game(mode, players, 'easy')
+            for client in group:
+                playing[client] = started
+            started += 1
+        for client in list(playing):
+            if not client.is_connected():
+                continue
+            for event in client.get_received():
+                name = event['name']
+                if name == 'new_question':
+                    if rng.random() < args.churn:
+                        client.disconnect()
+                        disconnects += 1
+                        del playing[client]
+                        idle.append(A.socketio.test_client(A.app))
+                        idle[-1].get_received()
+                        break
+                    if rng.random() < args.help_rate:
+                        client.emit('use_help', {'type': rng.choice(HELP_TYPES)})
+                    client.emit('submit_answer', {'answer': rng.choice(event['args'][0]['options'])})
+                elif name == 'game_over':
+                    del playing[client]
+                    idle.append(client)
+                    break
+        if not baseline_taken and diagnostics.games_finished >= min(args.warmup, args.games // 2):
+            diagnostics.reset_baseline()
+            baseline_taken = True
+        time.sleep(0.005)
+
+    # Games whose players all churned away end on their own once their sessions expire
+    while A.games and time.monotonic() < deadline:
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - t0
+    time.sleep(float(os.environ['SESSION_GRACE_PERIOD']) + 0.5)  # Let parked sessions expire
+
+    print(f"{started} games in {elapsed:.1f}s ({started / elapsed:.1f} games/s), {disconnects} mid-game disconnects")
+    leftovers = {'games': len(A.games), 'player_games': len(A.player_games), 'spectators': len(A.spectators),
+                 'lobby_players': len(A.lobby_players)}
+    diagnostics.check(grace=0)
+    stats = diagnostics.stats()
+    print(f"games: {stats['games']}")
+    print(f"threads: {stats['threads']}")
+    print(f"worker timers: {stats.get('worker_timers')}, orphaned: {stats.get('orphaned_timers')}")
+    print(f"app registries: {leftovers}")
+    if 'traced_memory_kb' in stats:
+        print(f"traced memory: {stats['traced_memory_kb']}")
+        for row in stats['allocation_growth']:
+            print(f"  +{row['size_diff_kb']:>8} KiB  {row['count_diff']:>+7}  {row['site']}")
+    failed = False
+    try:
+        diagnostics.assert_clean(thread_slack=args.thread_slack)
+    except AssertionError as e:
+        print(f"LEAK: {e}")
+        failed = True
+    if any(leftovers.values()):
+        print("LEAK: per-game registries not empty")
+        failed = True
+    if started < args.games or A.games:
+        print("Timed out before every game finished")
+        failed = True
+    print("clean" if not failed else "FAILED")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
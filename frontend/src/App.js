@@ -4,19 +4,21 @@ import React, { useState, useCallback } from 'react';
 import Lobby from './components/Lobby';
 import GameScreen from './components/GameScreen';
 import Leaderboard from './components/Leaderboard';
+import SpectatorView from './components/SpectatorView';
 import './App.css';
 import { useGameSocket } from './hooks/useGameSocket';
 
 
 // Centralized config/constants
-import { CLASSIC_MODE, BATTLE_ROYALE_MODE, formatGameMode, LOBBY_DEFAULT_WAIT_TIME, BOT_DIFFICULTY_LEVELS } from './config';
+import { CLASSIC_MODE, BATTLE_ROYALE_MODE, formatGameMode, LOBBY_DEFAULT_WAIT_TIME, BOT_DIFFICULTY_LEVELS, TOPIC_CATEGORIES } from './config';
 
 function App() {
     const [username, setUsername] = useState(''); // Confirmed username
     const [tempUsername, setTempUsername] = useState(''); // For input field
-    const [gameState, setGameState] = useState('username_prompt'); // username_prompt, lobby, game, leaderboard
+    const [gameState, setGameState] = useState('username_prompt'); // username_prompt, lobby, game, spectating, leaderboard
     const [desiredMode, setDesiredMode] = useState(null); // User's chosen mode before joining lobby
     const [botDifficulty, setBotDifficulty] = useState(BOT_DIFFICULTY_LEVELS.EASY); // New state, default to Easy
+    const [topics, setTopics] = useState([]); // Preferred question topics; empty = any
 
     // Tracking some UI-only state
     // const [gameInProgressMode, setGameInProgressMode] = useState(null); // If needed, derive from gameData.mode
@@ -33,8 +35,10 @@ function App() {
       leaderboardData,
       playerHelps,
       chatMessages,
+      spectatorData,
       // actions
       joinLobby,
+      watchGame,
       sendChatMessage,
       sendEmoji,
       // setters (optional use)
@@ -43,15 +47,24 @@ function App() {
       setQuestionData,
       setQuestionResult,
       setLeaderboardData,
+      setSpectatorData,
     } = useGameSocket();
 
     // Derive top-level UI state from hook state
     React.useEffect(() => {
-      if (gameData && gameData.mode && gameState !== 'game') {
+      if (gameData && gameData.mode && !spectatorData && gameState !== 'game') {
         setGameState('game');
         setIsJoining(false);
       }
-    }, [gameData, gameState]);
+    }, [gameData, spectatorData, gameState]);
+
+    React.useEffect(() => {
+      // Outsiders watching, or eliminated Battle Royale players moved to the spectator feed
+      if (spectatorData && !leaderboardData && gameState !== 'spectating') {
+        setGameState('spectating');
+        setIsJoining(false);
+      }
+    }, [spectatorData, leaderboardData, gameState]);
 
     React.useEffect(() => {
       if (leaderboardData && gameState !== 'leaderboard') {
@@ -82,6 +95,7 @@ function App() {
         setQuestionData(null);
         setQuestionResult(null);
         setLeaderboardData(null);
+        setSpectatorData(null);
         setAmIEliminated(false);
         setMyPlace(0);
         setLobbyData({ mode: null, time_remaining: LOBBY_DEFAULT_WAIT_TIME, players: [], is_active: false });
@@ -103,7 +117,7 @@ function App() {
             // This console.log will now show the CURRENT botDifficulty because this function instance is fresh
             console.log(`Attempting to join ${modeToJoin} lobby as ${currentTrimmedUsername} with bot difficulty: ${botDifficulty}`);
 
-            joinLobby({ username: currentTrimmedUsername, mode: modeToJoin, bot_difficulty: botDifficulty });
+            joinLobby({ username: currentTrimmedUsername, mode: modeToJoin, bot_difficulty: botDifficulty, topics });
         } else if (!tempUsername.trim()) {
             setCurrentError("Please enter a username.");
             setIsJoining(false);
@@ -114,6 +128,7 @@ function App() {
         tempUsername,
         isJoining,
         botDifficulty,
+        topics,
         setUsername, setDesiredMode, setIsJoining, setCurrentError
     ]);
 
@@ -149,6 +164,22 @@ function App() {
                 </div>
                 {/* --- END NEW SELECTOR --- */}
 
+                <div className="topic-selector">
+                    <label>Topics (optional): </label>
+                    {Object.entries(TOPIC_CATEGORIES).map(([value, label]) => (
+                        <label key={value} htmlFor={`topic-${value}`}>
+                            <input
+                                type="checkbox"
+                                id={`topic-${value}`}
+                                checked={topics.includes(value)}
+                                onChange={(e) => setTopics((prev) => (e.target.checked ? [...prev, value] : prev.filter((t) => t !== value)))}
+                                disabled={isJoining}
+                            />
+                            {label}
+                        </label>
+                    ))}
+                </div>
+
                 <div className="mode-selection">
                     <button
                         onClick={() => attemptJoinLobby(CLASSIC_MODE)}
@@ -160,6 +191,11 @@ function App() {
                         disabled={isJoining || !isConnected || !!gameInProgressMode}>
                         {isJoining && desiredMode === BATTLE_ROYALE_MODE ? 'Joining BR...' : 'Join Battle Royale'}
                     </button>
+                    <button
+                        onClick={() => watchGame()}
+                        disabled={isJoining || !isConnected}>
+                        Watch Live Game
+                    </button>
                 </div>
                 {!isConnected && <p>Connecting...</p>}
                 {gameInProgressMode && <p className="game-in-progress-notice">A {gameInProgressMode} game is currently in progress. Please wait.</p>}
@@ -203,6 +239,9 @@ function App() {
                         onSendEmoji={sendEmoji}
                     />
                 )}
+                {gameState === 'spectating' && spectatorData && (
+                    <SpectatorView spectatorData={spectatorData} />
+                )}
                 {gameState === 'leaderboard' && leaderboardData && (
                     <Leaderboard
                         leaderboardData={leaderboardData}
@@ -1,9 +1,18 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { formatGameMode, LOBBY_DEFAULT_WAIT_TIME as LOBBY_DEFAULT_WAIT_TIME_DISPLAY } from '../config';
 
 function Lobby({ lobbyData, desiredMode, username, gameInProgressMode }) {
     const { mode: activeLobbyModeFromServer, time_remaining, players, is_active } = lobbyData;
 
+    // Count down locally from the last update; the matchmaker only sends one when its queue changes
+    const [secondsLeft, setSecondsLeft] = useState(time_remaining);
+    useEffect(() => {
+        setSecondsLeft(time_remaining);
+        if (!is_active) return undefined;
+        const timer = setInterval(() => setSecondsLeft((s) => Math.max(0, s - 1)), 1000);
+        return () => clearInterval(timer);
+    }, [lobbyData, time_remaining, is_active]);
+
     let titleText = "Lobby Area";
     let messageText = "";
     let playersToShow = [];
@@ -21,7 +30,7 @@ function Lobby({ lobbyData, desiredMode, username, gameInProgressMode }) {
         titleText = `${formattedActiveLobbyMode} Lobby`;
         if (isMyLobbyCountingDown) { // It's my desired mode's lobby
             messageText = `Game starts in: `;
-            timeToDisplay = time_remaining;
+            timeToDisplay = secondsLeft;
             playersToShow = players; // Server sends players for the active lobby
             showPlayerList = true;
         } else if (desiredMode) { // Another mode's lobby is active, I'm waiting for mine
@@ -0,0 +1,58 @@
+import React from 'react';
+import { BATTLE_ROYALE_MODE, formatGameMode } from '../config';
+
+// Read-only view fed by throttled `spectator_update` events (question, round summary, top standings)
+function SpectatorView({ spectatorData }) {
+    const { mode, phase, question_number, question, round_summary, standings, active_player_count, player_count, spectator_count } = spectatorData;
+    const showSummary = round_summary && round_summary.question_number === question_number;
+
+    return (
+        <div className="game-screen spectating">
+            <div className="elimination-message spectator-view">
+                <p>Watching {formatGameMode(mode)} live ({spectator_count} watching)</p>
+                {mode === BATTLE_ROYALE_MODE && active_player_count !== null && (
+                    <p>{active_player_count} of {player_count} players still standing</p>
+                )}
+            </div>
+            <div className="game-main">
+                {question ? (
+                    <div className="question-container">
+                        <h3>Question {question_number}</h3>
+                        <p>{question.question}</p>
+                        <div className="options-container">
+                            {question.options.map((opt) => (
+                                <button
+                                    key={opt}
+                                    className={`option-button spectator-option ${showSummary && opt === round_summary.correct_answer ? 'correct' : ''}`}
+                                    disabled>
+                                    {opt}
+                                </button>
+                            ))}
+                        </div>
+                    </div>
+                ) : (
+                    <p>{phase === 'starting' ? 'The game is about to start...' : 'Waiting for the next question...'}</p>
+                )}
+                {showSummary && (
+                    <p className="round-summary">
+                        {round_summary.correct} of {round_summary.answered} answered correctly
+                        {round_summary.eliminated ? `, ${round_summary.eliminated} eliminated` : ''}.
+                    </p>
+                )}
+            </div>
+            <div className="scoreboard">
+                <h4>Top Players</h4>
+                <ol>
+                    {standings.map((player, index) => (
+                        <li key={player.username + index}>
+                            {player.username}{player.is_bot ? ' (Bot)' : ''}: {player.score}
+                            {player.is_eliminated ? ' (Out)' : ''}
+                        </li>
+                    ))}
+                </ol>
+            </div>
+        </div>
+    );
+}
+
+export default SpectatorView;
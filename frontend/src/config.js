@@ -23,3 +23,16 @@ export const BOT_DIFFICULTY_LEVELS = {
   EXPERT: 'expert',
 };
 
+
+// Question topics players can pick (backend/categories.py); none selected = any topic
+export const TOPIC_CATEGORIES = {
+  geography: 'Geography',
+  history: 'History',
+  science: 'Science',
+  nature: 'Nature',
+  arts_literature: 'Arts & Literature',
+  entertainment: 'Entertainment',
+  sports: 'Sports',
+  food_drink: 'Food & Drink',
+  math: 'Math',
+};
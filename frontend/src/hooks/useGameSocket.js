@@ -1,5 +1,5 @@
 import { useEffect, useCallback, useState } from 'react';
-import { socket } from '../socket';
+import { socket, setSessionToken } from '../socket';
 import { BATTLE_ROYALE_MODE, LOBBY_DEFAULT_WAIT_TIME } from '../config';
 
 export function useGameSocket() {
@@ -13,6 +13,7 @@ export function useGameSocket() {
   const [leaderboardData, setLeaderboardData] = useState(null);
   const [playerHelps, setPlayerHelps] = useState({ fifty_fifty: true, call_friend: true, double_score: true });
   const [chatMessages, setChatMessages] = useState([]);
+  const [spectatorData, setSpectatorData] = useState(null);
   const [lastError, setLastError] = useState('');
 
   const connect = useCallback(() => {
@@ -24,8 +25,12 @@ export function useGameSocket() {
   }, []);
 
   // Emits
-  const joinLobby = useCallback(({ username, mode, bot_difficulty }) => {
-    socket.emit('join_lobby_request', { username, mode, bot_difficulty });
+  const joinLobby = useCallback(({ username, mode, bot_difficulty, topics }) => {
+    socket.emit('join_lobby_request', { username, mode, bot_difficulty, topics });
+  }, []);
+
+  const watchGame = useCallback((gameId) => {
+    socket.emit('spectate_request', gameId ? { game_id: gameId } : {});
   }, []);
 
   const submitAnswer = useCallback((answer) => {
@@ -55,6 +60,7 @@ export function useGameSocket() {
 
   const handleConnectionAck = useCallback((data) => {
     setMySid(data.sid);
+    setSessionToken(data.session_token);
     setGameInProgressMode(data.game_in_progress_mode || null);
     if (data.lobby_status) setLobbyData(data.lobby_status);
   }, []);
@@ -128,6 +134,32 @@ export function useGameSocket() {
     }
   }, []);
 
+  const handleGameStateSnapshot = useCallback((data) => {
+    // Compact resume snapshot: players are [sid, username, score, is_bot, is_eliminated]
+    const players = data.players.map(([sid, username, score, is_bot, is_eliminated]) => ({ sid, username, score, is_bot, is_eliminated }));
+    setGameData({ game_id: data.game_id, mode: data.mode, players, initial_player_count: data.initial_player_count, is_rejoin: true });
+    setPlayerHelps(data.you.helps);
+    setQuestionResult(null);
+    setQuestionData(data.question ? {
+      ...data.question,
+      question_number: data.question_number,
+      total_questions: data.total_questions,
+      duration: data.time_remaining,
+      active_player_count: data.active_player_count,
+      initial_player_count: data.initial_player_count,
+    } : null);
+  }, []);
+
+  const handlePlayerRejoined = useCallback((data) => {
+    setGameData((prev) => (prev ? { ...prev, players: prev.players.map((p) => (p.sid === data.old_sid ? { ...p, sid: data.sid } : p)) } : prev));
+  }, []);
+
+  // Throttled, reduced view for spectators (outsiders and eliminated battle-royale players)
+  const handleSpectatorUpdate = useCallback((data) => setSpectatorData(data), []);
+
+  // Echo RTT probes straight back so the server can compensate answer timing for network latency
+  const handleLatencyPing = useCallback((data) => socket.emit('latency_pong', { seq: data.seq }), []);
+
   const handleNewChatMessage = useCallback((message) => setChatMessages((prev) => [...prev, message]), []);
 
   const handlePlayerUsedHelp = useCallback((data) => setChatMessages((prev) => [...prev, { type: 'system', text: `${data.username} used ${data.help_type}.` }]), []);
@@ -151,6 +183,10 @@ export function useGameSocket() {
     socket.on('new_chat_message', handleNewChatMessage);
     socket.on('player_used_help', handlePlayerUsedHelp);
     socket.on('player_left', handlePlayerLeft);
+    socket.on('game_state_snapshot', handleGameStateSnapshot);
+    socket.on('player_rejoined', handlePlayerRejoined);
+    socket.on('latency_ping', handleLatencyPing);
+    socket.on('spectator_update', handleSpectatorUpdate);
 
     if (!socket.connected) socket.connect();
 
@@ -168,8 +204,12 @@ export function useGameSocket() {
       socket.off('new_chat_message', handleNewChatMessage);
       socket.off('player_used_help', handlePlayerUsedHelp);
       socket.off('player_left', handlePlayerLeft);
+      socket.off('game_state_snapshot', handleGameStateSnapshot);
+      socket.off('player_rejoined', handlePlayerRejoined);
+      socket.off('latency_ping', handleLatencyPing);
+      socket.off('spectator_update', handleSpectatorUpdate);
     };
-  }, [handleConnect, handleDisconnect, handleConnectionAck, handleLobbyUpdate, handleGameStarting, handleNewQuestion, handleQuestionResult, handleGameOver, handleHelpResult, handleNewChatMessage, handlePlayerUsedHelp, handlePlayerLeft]);
+  }, [handleConnect, handleDisconnect, handleConnectionAck, handleLobbyUpdate, handleGameStarting, handleNewQuestion, handleQuestionResult, handleGameOver, handleHelpResult, handleNewChatMessage, handlePlayerUsedHelp, handlePlayerLeft, handleGameStateSnapshot, handlePlayerRejoined, handleLatencyPing, handleSpectatorUpdate]);
 
   return {
     // connection
@@ -187,9 +227,11 @@ export function useGameSocket() {
     leaderboardData,
     playerHelps,
     chatMessages,
+    spectatorData,
 
     // actions
     joinLobby,
+    watchGame,
     submitAnswer,
     useHelp,
     sendChatMessage,
@@ -203,6 +245,7 @@ export function useGameSocket() {
     setLeaderboardData,
     setPlayerHelps,
     setChatMessages,
+    setSpectatorData,
   };
 }
 
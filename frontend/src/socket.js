@@ -1,6 +1,15 @@
 import { io } from 'socket.io-client';
 import { BACKEND_URL } from './config';
 
+const SESSION_TOKEN_KEY = 'trivia_session_token';
+
+export const getSessionToken = () => sessionStorage.getItem(SESSION_TOKEN_KEY);
+export const setSessionToken = (token) => {
+  if (token) sessionStorage.setItem(SESSION_TOKEN_KEY, token);
+};
+
 export const socket = io(BACKEND_URL, {
   autoConnect: false, // Important: connect manually after username is set
-});
\ No newline at end of file
+  // Sent on every (re)connect so the server can hand back our game slot after a network drop
+  auth: (cb) => cb({ session_token: getSessionToken() }),
+});
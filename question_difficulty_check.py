@@ -1,5 +1,8 @@
 import pandas as pd
 import google.generativeai as genai
+import argparse
+import hashlib
+import json
 import os
 import random
 import time
@@ -8,8 +11,10 @@ from dotenv import load_dotenv
 # --- Configuration ---
 CSV_INPUT_FILE = "trivia_questions.csv"
 CSV_OUTPUT_FILE = "trivia_questions_filtered.csv"
+VERDICT_CACHE_FILE = "question_verdicts.json" # Per-question LLM verdicts, reused across runs
 BATCH_SIZE = 10 # Number of questions to send to the LLM at once
 MODEL_NAME = "gemini-1.5-flash-latest" # Use the specific model ID if "Gemini 2.0 Flash" is different
+BATCH_DELAY = float(os.getenv("GEMINI_BATCH_DELAY", "5")) # Seconds between batches, to respect API rate limits
 
 # Safety settings for the LLM (can be adjusted)
 GENERATION_CONFIG = {
@@ -31,10 +36,21 @@ def load_api_key():
     """Loads Google API key from .env file."""
     load_dotenv()
     api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key and os.getenv("GEMINI_API_ENDPOINT"):
+        return "local" # The local stand-in server does not check keys
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in .env file or environment variables.")
     return api_key
 
+def configure_gemini(api_key):
+    """Configures the SDK, pointing it at GEMINI_API_ENDPOINT (e.g. backend/fake_gemini.py) when set."""
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        print(f"Using Gemini endpoint {endpoint}")
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=api_key)
+
 def format_question_for_llm(index, question_data):
     """
     Formats a single question and its shuffled answers for the LLM.
@@ -63,7 +79,9 @@ def ask_gemini_batch(model, questions_batch_data):
     """
     Sends a batch of formatted questions to Gemini and gets answers.
     questions_batch_data is a list of tuples: (original_index, question_row_data)
-    Returns a list of (original_index, llm_chosen_answer_text, correct_answer_text)
+    Returns a list of (original_index, llm_chosen_answer_text, correct_answer_text).
+    llm_chosen_answer_text is None when no usable reply came back for the batch (API error,
+    answer count mismatch) and "" when the LLM replied with something that is not an option.
     """
     prompt_parts = [
         "You are a trivia answering AI. For each question below, provide only the letter (A, B, C, D, or E) corresponding to your chosen answer. Each answer should be on a new line. Do not add any other text, explanations, or greetings."
@@ -114,8 +132,10 @@ def ask_gemini_batch(model, questions_batch_data):
             if 0 <= option_index < len(shuffled_options):
                 llm_chosen_answer_text = shuffled_options[option_index]
             else:
+                llm_chosen_answer_text = ""
                 print(f"Warning: LLM returned an invalid option letter '{llm_answer_letter}' for question index {original_idx}. Original Q: {q_data['Question']}")
         else:
+            llm_chosen_answer_text = ""
             print(f"Warning: LLM returned an unexpected format '{llm_raw_answers[i]}' for question index {original_idx}. Original Q: {q_data['Question']}")
         
         results.append((original_idx, llm_chosen_answer_text, q_data["Correct Answer"]))
@@ -123,32 +143,54 @@ def ask_gemini_batch(model, questions_batch_data):
     return results
 
 
-# --- Main Script ---
-def main():
-    print("Starting trivia question filtering process...")
+# --- Verdict cache ---
+def question_key(question_data, model_name):
+    """
+    Content hash of a question, its answers and the model that judged it. Editing any of
+    them (or switching models) gives a new key, so only that row is asked again.
+    """
+    wrong = sorted(str(question_data[f"Wrong Answer {n}"]) for n in (1, 2, 3)) # Order is shuffled anyway
+    content = [str(question_data["Question"]), str(question_data["Correct Answer"]), wrong, model_name]
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
 
-    # 1. Load API Key
+def load_verdicts(path):
+    """Cached verdicts: {key: {"correct": bool, "llm_answer": str, "model": str, "checked_at": float}}."""
+    if not os.path.exists(path):
+        return {}
     try:
-        api_key = load_api_key()
-        genai.configure(api_key=api_key)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
     except ValueError as e:
-        print(f"Error: {e}")
-        return
+        print(f"Warning: verdict cache '{path}' is unreadable ({e}); starting empty.")
+        return {}
+
+def save_verdicts(path, verdicts):
+    """Writes the cache atomically so an interrupted run keeps every finished batch."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(verdicts, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, path)
 
-    # 2. Initialize Gemini Model
-    model = genai.GenerativeModel(
-        MODEL_NAME,
-        # safety_settings=SAFETY_SETTINGS, # Passed during generation
-        # generation_config=GENERATION_CONFIG # Passed during generation
-    )
-    print(f"Gemini model '{MODEL_NAME}' initialized.")
 
-    # 3. Load CSV
+# --- Main Script ---
+def main():
+    parser = argparse.ArgumentParser(description="Drop questions the LLM answers incorrectly, asking only about new or edited rows.")
+    parser.add_argument("--input", default=CSV_INPUT_FILE)
+    parser.add_argument("--output", default=CSV_OUTPUT_FILE)
+    parser.add_argument("--cache", default=VERDICT_CACHE_FILE, help="Verdict cache file")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--dry-run", action="store_true", help="Report how many questions and LLM calls a run would need, then exit")
+    parser.add_argument("--recheck", action="store_true", help="Ask about every question in the input again; other cached verdicts are kept")
+    args = parser.parse_args()
+
+    print("Starting trivia question filtering process...")
+
+    # 1. Load CSV
     try:
-        df = pd.read_csv(CSV_INPUT_FILE)
-        print(f"Loaded {len(df)} questions from '{CSV_INPUT_FILE}'.")
+        df = pd.read_csv(args.input)
+        print(f"Loaded {len(df)} questions from '{args.input}'.")
     except FileNotFoundError:
-        print(f"Error: Input CSV file '{CSV_INPUT_FILE}' not found.")
+        print(f"Error: Input CSV file '{args.input}' not found.")
         return
     except Exception as e:
         print(f"Error reading CSV: {e}")
@@ -158,53 +200,76 @@ def main():
         print("Input CSV is empty. Nothing to process.")
         return
 
-    # Make a copy to modify
-    df_filtered = df.copy()
-    indices_to_delete = []
+    # 2. Work out which rows already have a verdict for this exact content and model.
+    # The cache is always loaded, so --recheck only overwrites the entries for this input and model.
+    verdicts = load_verdicts(args.cache)
+    keys = {original_idx: question_key(row, args.model) for original_idx, row in df.iterrows()}
+    pending = [original_idx for original_idx, key in keys.items() if args.recheck or key not in verdicts]
+    num_batches = (len(pending) + BATCH_SIZE - 1) // BATCH_SIZE
+    print(f"{len(df) - len(pending)} questions have cached verdicts; {len(pending)} new or changed questions "
+          f"need {num_batches} LLM call(s) in batches of {BATCH_SIZE}.")
 
-    # 4. Process questions in batches
-    num_batches = (len(df) + BATCH_SIZE - 1) // BATCH_SIZE
-    print(f"Processing in {num_batches} batches of size {BATCH_SIZE}.")
+    if args.dry_run:
+        stale = len(set(verdicts) - set(keys.values()))
+        print(f"Dry run: no LLM calls made. {stale} cached verdicts belong to questions no longer in '{args.input}'.")
+        return
 
-    for i in range(0, len(df), BATCH_SIZE):
-        batch_df = df.iloc[i:i + BATCH_SIZE]
-        
-        # Prepare batch data as list of (original_index, row_data_dict)
-        questions_batch_data = []
-        for original_idx, row in batch_df.iterrows():
-            questions_batch_data.append((original_idx, row.to_dict()))
+    if pending:
+        # 3. Load API key and initialize the Gemini model (only when something needs asking)
+        try:
+            api_key = load_api_key()
+            configure_gemini(api_key)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+
+        model = genai.GenerativeModel(
+            args.model,
+            # safety_settings=SAFETY_SETTINGS, # Passed during generation
+            # generation_config=GENERATION_CONFIG # Passed during generation
+        )
+        print(f"Gemini model '{args.model}' initialized.")
+
+    # 4. Ask about the pending questions, caching each batch's verdicts as they arrive
+    unanswered = 0
+    for batch_number, start in enumerate(range(0, len(pending), BATCH_SIZE), 1):
+        batch_indices = pending[start:start + BATCH_SIZE]
+        questions_batch_data = [(original_idx, df.loc[original_idx].to_dict()) for original_idx in batch_indices]
+
+        print(f"\nProcessing batch {batch_number}/{num_batches} ({len(batch_indices)} questions)...")
 
-        print(f"\nProcessing batch {i // BATCH_SIZE + 1}/{num_batches} (questions {i+1}-{min(i+BATCH_SIZE, len(df))})...")
-        
         batch_results = ask_gemini_batch(model, questions_batch_data)
 
         for original_idx, llm_answer, correct_answer in batch_results:
-            question_text = df.loc[original_idx, "Question"]
-            is_correct = llm_answer is not None and str(llm_answer).strip().lower() == str(correct_answer).strip().lower()
-            
+            if llm_answer is None:
+                # No usable reply: leave it uncached so the next run asks again
+                unanswered += 1
+                print(f"  Q (idx {original_idx}): NO VERDICT. Will be asked again on the next run.")
+                continue
+            is_correct = str(llm_answer).strip().lower() == str(correct_answer).strip().lower()
+            verdicts[keys[original_idx]] = {"correct": is_correct, "llm_answer": llm_answer,
+                                            "model": args.model, "checked_at": round(time.time(), 1)}
             if is_correct:
                 print(f"  Q (idx {original_idx}): CORRECT. LLM answered '{llm_answer}'.")
             else:
+                question_text = df.loc[original_idx, "Question"]
                 print(f"  Q (idx {original_idx}): INCORRECT. LLM answered '{llm_answer}', Correct was '{correct_answer}'. Marking for deletion.")
                 print(f"     Question: {question_text[:80]}...") # Print a snippet of the question
-                indices_to_delete.append(original_idx)
-        
-        if i // BATCH_SIZE + 1 < num_batches: # Avoid sleeping after the last batch
-            print(f"Waiting for 5 seconds before next batch to respect API rate limits...")
-            time.sleep(5) # Add a small delay to avoid hitting rate limits too quickly
-
-    # 5. Delete incorrect questions
-    if indices_to_delete:
-        print(f"\nDeleting {len(indices_to_delete)} questions marked as too hard.")
-        df_filtered.drop(indices_to_delete, inplace=True)
-        df_filtered.reset_index(drop=True, inplace=True) # Good practice after dropping
-    else:
-        print("\nNo questions were marked for deletion.")
+        save_verdicts(args.cache, verdicts)
+
+        if batch_number < num_batches and BATCH_DELAY > 0: # Avoid sleeping after the last batch
+            print(f"Waiting for {BATCH_DELAY:g} seconds before next batch to respect API rate limits...")
+            time.sleep(BATCH_DELAY) # Add a small delay to avoid hitting rate limits too quickly
+
+    # 5. Rebuild the filtered CSV from the verdicts. Questions without one are left out this run.
+    keep = [verdicts.get(keys[original_idx], {}).get("correct", False) for original_idx in df.index]
+    df_filtered = df[keep].reset_index(drop=True)
+    print(f"\n{len(df) - len(df_filtered)} questions left out ({unanswered} of them still without a verdict).")
 
     # 6. Save the filtered CSV
     try:
-        df_filtered.to_csv(CSV_OUTPUT_FILE, index=False)
-        print(f"\nFiltered questions saved to '{CSV_OUTPUT_FILE}'.")
+        df_filtered.to_csv(args.output, index=False)
+        print(f"\nFiltered questions saved to '{args.output}'.")
         print(f"Original questions: {len(df)}, Filtered questions: {len(df_filtered)}.")
     except Exception as e:
         print(f"Error saving filtered CSV: {e}")
@@ -212,4 +277,4 @@ def main():
     print("\nProcess completed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from backend.categories import CATEGORIES, CATEGORY_SEPARATOR, classify, parse_categories
+
+# --- Configuration ---
+CSV_FILE = os.path.join("backend", "trivia_questions_filtered.csv")
+BATCH_SIZE = 20  # Questions per LLM request when enriching
+MODEL_NAME = "gemini-1.5-flash-latest"
+GENERATION_CONFIG = {"temperature": 0.0, "max_output_tokens": 1024}
+
+
+def tag_with_keywords(df):
+    """Keyword classifier for every row; returns a list of category lists."""
+    return [classify(q, a) for q, a in zip(df["Question"].astype(str), df["Correct Answer"].astype(str))]
+
+
+def ask_gemini_categories(model, batch):
+    """
+    Asks Gemini for up to two categories per question.
+    batch is a list of (row_index, question, answer). Returns {row_index: [categories]}.
+    """
+    allowed = ", ".join(CATEGORIES)
+    lines = [
+        f"Classify each trivia question into one or two of these categories: {allowed}.",
+        "Answer with one line per question, in order, containing only the category names separated by '|'.",
+    ]
+    for i, (_, question, answer) in enumerate(batch):
+        lines.append(f"{i + 1}. {question} (Answer: {answer})")
+    try:
+        response = model.generate_content("\n".join(lines), generation_config=GENERATION_CONFIG)
+        answers = [line.strip() for line in response.text.strip().split("\n") if line.strip()]
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        return {}
+    if len(answers) != len(batch):
+        print(f"Warning: got {len(answers)} lines for {len(batch)} questions; keeping keyword tags for this batch.")
+        return {}
+    result = {}
+    for (row_index, _, _), line in zip(batch, answers):
+        # Drop a leading "1." if the model numbered its lines
+        categories = parse_categories(line.split(".", 1)[-1] if line[:1].isdigit() else line)
+        if categories:
+            result[row_index] = categories[:2]
+    return result
+
+
+def enrich_with_llm(df, tags, only_general):
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        print("GOOGLE_API_KEY not set; skipping LLM enrichment.")
+        return 0
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(MODEL_NAME)
+
+    rows = [i for i, cats in enumerate(tags) if not only_general or cats == ["general"]]
+    print(f"Sending {len(rows)} questions to Gemini in batches of {BATCH_SIZE}.")
+    updated = 0
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = [(i, df["Question"].iat[i], df["Correct Answer"].iat[i]) for i in rows[start:start + BATCH_SIZE]]
+        for row_index, categories in ask_gemini_categories(model, batch).items():
+            if categories != tags[row_index]:
+                tags[row_index] = categories
+                updated += 1
+        if start + BATCH_SIZE < len(rows):
+            time.sleep(5)  # Stay under the API rate limit
+    return updated
+
+
+def build_index(tags, difficulties):
+    """(category, difficulty) -> list of row ids; the same index the backend builds on load."""
+    index = {}
+    for row_id, (cats, difficulty) in enumerate(zip(tags, difficulties)):
+        for category in cats:
+            index.setdefault((category, int(difficulty)), []).append(row_id)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign topic categories to the question bank.")
+    parser.add_argument("--input", default=CSV_FILE)
+    parser.add_argument("--output", default=None, help="Defaults to overwriting the input file")
+    parser.add_argument("--llm", action="store_true", help="Ask Gemini to categorize questions the keyword rules could not place")
+    parser.add_argument("--llm-all", action="store_true", help="Ask Gemini about every question, not only uncategorized ones")
+    parser.add_argument("--keep-existing", action="store_true", help="Keep Category values already present in the file")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input, dtype=str, keep_default_na=False)
+    print(f"Loaded {len(df)} questions from '{args.input}'.")
+
+    tags = tag_with_keywords(df)
+    if args.keep_existing and "Category" in df.columns:
+        tags = [parse_categories(existing) or new for existing, new in zip(df["Category"], tags)]
+    print(f"Keyword rules left {sum(cats == ['general'] for cats in tags)} questions as 'general'.")
+
+    if args.llm or args.llm_all:
+        updated = enrich_with_llm(df, tags, only_general=not args.llm_all)
+        print(f"LLM changed the categories of {updated} questions.")
+
+    df["Category"] = [CATEGORY_SEPARATOR.join(cats) for cats in tags]
+    output = args.output or args.input
+    df.to_csv(output, index=False)
+    print(f"Tagged questions saved to '{output}'.")
+
+    difficulties = pd.to_numeric(df["Difficulty"], errors="coerce").fillna(0)
+    index = build_index(tags, difficulties)
+    print("\nQuestions per category:")
+    for category in CATEGORIES:
+        count = sum(len(ids) for (c, _), ids in index.items() if c == category)
+        print(f"  {category:<16} {count}")
+    print(f"Inverted index: {len(index)} (category, difficulty) postings.")
+
+
+if __name__ == "__main__":
+    main()